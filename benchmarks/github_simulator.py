@@ -0,0 +1,196 @@
+
+"""Local stand-in for the GitHub REST API used by benchmarks and load tests
+
+Serves /search/repositories, /search/issues and /repos/{owner}/{name} with
+deterministic synthetic payloads, configurable latency/jitter, payload size,
+pagination (Link headers) and X-RateLimit-* headers.
+
+    python benchmarks/github_simulator.py --port 9000 --latency-ms 80 --jitter-ms 20
+"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+LANGUAGES = ["Python", "Python", "Python", "Jupyter Notebook", "TypeScript", "Rust", "C++", "Go"]
+TOPICS = ["llm", "machine-learning", "deep-learning", "transformers", "agents", "rag", "computer-vision"]
+
+@dataclass
+class SimulatorConfig:
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    total_items: int = 300          # Search results available across all pages
+    description_bytes: int = 200    # Payload size knob
+    rate_limit: int = 5000          # Calls allowed per reset window
+    rate_limit_window: float = 3600.0
+    error_rate: float = 0.0         # Fraction of calls answered with 502
+    seed: int = 42
+    # Items are spaced back in time from here so date-window filters see fresh data
+    anchor: datetime = field(
+        default_factory=lambda: datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    )
+
+def _timestamp(index: int, config: SimulatorConfig) -> str:
+    created = config.anchor - timedelta(minutes=37 * index)
+    return created.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def make_repo(index: int, config: SimulatorConfig) -> Dict:
+    rng = random.Random(config.seed * 1_000_003 + index)
+    owner = f"org{index % 97}"
+    name = f"ai-project-{index}"
+    words = "transformer agent inference fine-tuning dataset benchmark embedding vision".split()
+    description = " ".join(rng.choice(words) for _ in range(config.description_bytes // 8))[:config.description_bytes]
+    return {
+        "id": 10_000 + index,
+        "name": name,
+        "full_name": f"{owner}/{name}",
+        "owner": {"login": owner, "id": index % 97, "type": "Organization"},
+        "html_url": f"https://github.com/{owner}/{name}",
+        "description": description,
+        "stargazers_count": max(1, int(50_000 / (index + 1)) + rng.randint(0, 50)),
+        "forks_count": rng.randint(0, 2_000),
+        "watchers_count": rng.randint(0, 5_000),
+        "open_issues_count": rng.randint(0, 300),
+        "language": rng.choice(LANGUAGES),
+        "topics": rng.sample(TOPICS, 3),
+        "created_at": _timestamp(index, config),
+        "updated_at": _timestamp(index // 2, config),
+        "pushed_at": _timestamp(index // 3, config)
+    }
+
+def make_issue(index: int, config: SimulatorConfig) -> Dict:
+    rng = random.Random(config.seed * 2_000_003 + index)
+    repo = make_repo(index % 50, config)
+    return {
+        "id": 90_000 + index,
+        "number": index + 1,
+        "title": f"Discussion {index}: how should we evaluate {rng.choice(TOPICS)} models?",
+        "body": ("**Context** `code` [link](url) " * (config.description_bytes // 32 + 1))[:config.description_bytes * 2],
+        "html_url": f"{repo['html_url']}/issues/{index + 1}",
+        "repository_url": f"https://api.github.com/repos/{repo['full_name']}",
+        "user": {"login": f"user{index % 211}"},
+        "comments": rng.randint(0, 80),
+        "reactions": {"total_count": max(0, 500 - index)},
+        "created_at": _timestamp(index, config),
+        "updated_at": _timestamp(index // 2, config)
+    }
+
+def create_simulator(config: Optional[SimulatorConfig] = None) -> FastAPI:
+    config = config or SimulatorConfig()
+    app = FastAPI(title="GitHub API simulator")
+    rng = random.Random(config.seed)
+    budget = {"remaining": config.rate_limit, "reset": time.time() + config.rate_limit_window}
+    app.state.config = config
+    app.state.calls = 0
+
+    async def simulate(request: Request) -> Optional[Response]:
+        app.state.calls += 1
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(delay, 0) / 1000)
+
+        if time.time() >= budget["reset"]:
+            budget.update(remaining=config.rate_limit, reset=time.time() + config.rate_limit_window)
+        budget["remaining"] = max(budget["remaining"] - 1, -1)
+        request.state.rate_headers = {
+            "X-RateLimit-Limit": str(config.rate_limit),
+            "X-RateLimit-Remaining": str(max(budget["remaining"], 0)),
+            "X-RateLimit-Reset": str(int(budget["reset"]))
+        }
+
+        if budget["remaining"] < 0:
+            return JSONResponse({"message": "API rate limit exceeded"}, 403, headers=request.state.rate_headers)
+        if config.error_rate and rng.random() < config.error_rate:
+            return JSONResponse({"message": "Server Error"}, 502, headers=request.state.rate_headers)
+        return None
+
+    def paginate(request: Request, factory) -> Response:
+        per_page = min(int(request.query_params.get("per_page", 30)), 100)
+        page = max(int(request.query_params.get("page", 1)), 1)
+        start = (page - 1) * per_page
+        items = [factory(i, config) for i in range(start, min(start + per_page, config.total_items))]
+
+        headers = dict(request.state.rate_headers)
+        last_page = max((config.total_items + per_page - 1) // per_page, 1)
+        if page < last_page:
+            next_url = request.url.include_query_params(page=page + 1)
+            last_url = request.url.include_query_params(page=last_page)
+            headers["Link"] = f'<{next_url}>; rel="next", <{last_url}>; rel="last"'
+
+        return JSONResponse(
+            {"total_count": config.total_items, "incomplete_results": False, "items": items},
+            headers=headers
+        )
+
+    @app.get("/search/repositories")
+    async def search_repositories(request: Request):
+        return await simulate(request) or paginate(request, make_repo)
+
+    @app.get("/search/issues")
+    async def search_issues(request: Request):
+        return await simulate(request) or paginate(request, make_issue)
+
+    @app.get("/repos/{owner}/{name}")
+    async def get_repo(owner: str, name: str, request: Request):
+        error = await simulate(request)
+        if error is not None:
+            return error
+        index = int(name.rsplit("-", 1)[-1]) if name.rsplit("-", 1)[-1].isdigit() else 0
+        return JSONResponse(make_repo(index, config), headers=request.state.rate_headers)
+
+    return app
+
+class SimulatorServer:
+    """Run the simulator with uvicorn on a background thread"""
+
+    def __init__(self, config: Optional[SimulatorConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.app = create_simulator(config)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "SimulatorServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the local GitHub API simulator")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--total-items", type=int, default=300)
+    parser.add_argument("--description-bytes", type=int, default=200)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        total_items=args.total_items,
+        description_bytes=args.description_bytes,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate
+    )
+    uvicorn.run(create_simulator(config), host="127.0.0.1", port=args.port, log_level="warning")
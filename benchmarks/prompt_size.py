@@ -0,0 +1,129 @@
+
+"""Before/after size and cost of the Claude enhancement prompt
+
+    python benchmarks/prompt_size.py                       # JSON report to stdout
+    python benchmarks/prompt_size.py --budget 800 --output prompt_size.json
+
+Builds both the legacy prompt (instructions plus the full basic newsletter,
+max_tokens=4000) and the compact digest prompt for the simulator fixture at
+two sizes, and reports estimated input tokens, the max_tokens sent,
+prompt build time and the worst-case cost per newsletter. Token counts come
+from the local estimator, not the API.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from github_simulator import SimulatorConfig, make_issue, make_repo
+
+# The prompt _enhance_with_claude used to send, kept for comparison
+LEGACY_PROMPT = """You are an expert AI newsletter editor. Please enhance this AI newsletter to make it more engaging, professional, and informative.
+
+Current newsletter:
+{basic_newsletter}
+
+Raw data for context:
+- Found {repos} trending repositories
+- Found {discussions} interesting discussions
+- Weekly stats available: {stats}
+
+Please:
+1. Improve the writing quality and tone (friendly but professional)
+2. Add insights and context where appropriate
+3. Ensure sections flow well together
+4. Keep all repository links and data intact
+5. Add engaging headlines and descriptions
+6. Maintain the existing markdown structure
+
+Return only the enhanced newsletter in markdown format."""
+LEGACY_MAX_TOKENS = 4000
+
+def fixture(config: SimulatorConfig, repos: int, discussions: int) -> Dict:
+    items = [make_repo(i, config) for i in range(repos)]
+    return {
+        "trending_repos": items,
+        "discussions": [make_issue(i, config) for i in range(discussions)],
+        "weekly_stats": {
+            "total_stars": sum(r["stargazers_count"] for r in items),
+            "total_forks": sum(r["forks_count"] for r in items),
+            "languages": sorted({r["language"] for r in items}),
+            "top_repos": [
+                {"name": r["name"], "stars": r["stargazers_count"], "forks": r["forks_count"], "language": r["language"]}
+                for r in items[:3]
+            ]
+        },
+        "generation_timestamp": config.anchor.isoformat()
+    }
+
+def cost(input_tokens: int, output_tokens: int, input_price: float, output_price: float) -> float:
+    return round((input_tokens * input_price + output_tokens * output_price) / 1_000_000, 5)
+
+def measure(data: Dict, builder, input_price: float, output_price: float) -> Dict:
+    from newsletter import NewsletterGenerator
+    from prompts import estimate_tokens, outline_of
+
+    basic = NewsletterGenerator().generate_newsletter(data)
+    legacy = LEGACY_PROMPT.format(
+        basic_newsletter=basic,
+        repos=len(data["trending_repos"]),
+        discussions=len(data["discussions"]),
+        stats=bool(data["weekly_stats"])
+    )
+    legacy_tokens = estimate_tokens(legacy)
+
+    started = time.perf_counter()
+    prompt = builder.build(data, outline_of(basic))
+    build_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "before": {
+            "input_tokens": legacy_tokens,
+            "max_tokens": LEGACY_MAX_TOKENS,
+            "max_cost_usd": cost(legacy_tokens, LEGACY_MAX_TOKENS, input_price, output_price)
+        },
+        "after": {
+            "input_tokens": prompt.input_tokens,
+            "max_tokens": prompt.max_tokens,
+            "max_cost_usd": cost(prompt.input_tokens, prompt.max_tokens, input_price, output_price),
+            "repos": prompt.repos,
+            "discussions": prompt.discussions,
+            "build_ms": round(build_ms, 3)
+        },
+        "input_reduction_pct": round((1 - prompt.input_tokens / legacy_tokens) * 100, 1)
+    }
+
+def main():
+    from prompts import PromptBuilder
+
+    parser = argparse.ArgumentParser(description="Compare legacy and compact Claude prompts")
+    parser.add_argument("--budget", type=int, default=1200, help="Compact prompt input token budget")
+    parser.add_argument("--input-price", type=float, default=3.0, help="USD per million input tokens")
+    parser.add_argument("--output-price", type=float, default=15.0, help="USD per million output tokens")
+    parser.add_argument("--output", type=str, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    config = SimulatorConfig()
+    builder = PromptBuilder(budget=args.budget)
+    sizes = {"small": (3, 2), "default": (15, 10)}
+    results = {
+        name: measure(fixture(config, repos, discussions), builder, args.input_price, args.output_price)
+        for name, (repos, discussions) in sizes.items()
+    }
+
+    document = json.dumps({"budget": args.budget, "fixtures": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+
+"""Reproducible benchmark suite driven by the local GitHub simulator
+
+    python benchmarks/run.py                                   # all scenarios, JSON to stdout
+    python benchmarks/run.py --scenario render_newsletter --output results.json
+    python benchmarks/run.py --baseline benchmarks/baseline.json   # exit 1 on regression
+    python benchmarks/run.py --save-baseline benchmarks/baseline.json
+
+Each scenario reports throughput and p50/p95/p99 latency. A scenario regresses
+when p95 grows or throughput drops by more than --tolerance against the baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from github_simulator import SimulatorConfig, SimulatorServer, make_issue, make_repo
+
+SCENARIOS: Dict[str, Callable] = {}
+
+def scenario(name: str, iterations: int, concurrency: int = 1):
+    """Register a benchmark; the function returns the operation to time"""
+    def decorator(setup):
+        SCENARIOS[name] = {"setup": setup, "iterations": iterations, "concurrency": concurrency}
+        return setup
+    return decorator
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        "iterations": len(latencies),
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3)
+    }
+
+async def measure(operation: Callable[[], Awaitable], iterations: int, concurrency: int) -> Dict:
+    """Run operation `iterations` times with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(iterations))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                await operation()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def sample_newsletter_data(config: SimulatorConfig) -> Dict:
+    repos = [make_repo(i, config) for i in range(15)]
+    return {
+        "trending_repos": repos,
+        "discussions": [make_issue(i, config) for i in range(10)],
+        "weekly_stats": {
+            "total_stars": sum(r["stargazers_count"] for r in repos[:5]),
+            "total_forks": sum(r["forks_count"] for r in repos[:5]),
+            "languages": sorted({r["language"] for r in repos[:5]}),
+            "top_repos": [
+                {"name": r["name"], "stars": r["stargazers_count"], "forks": r["forks_count"], "language": r["language"]}
+                for r in repos[:3]
+            ]
+        },
+        "generation_timestamp": config.anchor.isoformat()
+    }
+
+@scenario("adapter_trending", iterations=30, concurrency=4)
+def adapter_trending(config: SimulatorConfig):
+    from github_adapter import GitHubAdapter
+    from state_backend import MemoryBackend
+
+    adapter = GitHubAdapter(MemoryBackend())
+    return lambda: adapter.get_trending_ai_repos(7)
+
+@scenario("adapter_repo_stats", iterations=100, concurrency=10)
+def adapter_repo_stats(config: SimulatorConfig):
+    from github_adapter import GitHubAdapter
+    from state_backend import MemoryBackend
+
+    adapter = GitHubAdapter(MemoryBackend())
+    return lambda: adapter.get_repo_stats("org1/ai-project-1")
+
+@scenario("endpoint_generate", iterations=60, concurrency=8)
+def endpoint_generate(config: SimulatorConfig):
+    import logging
+    import httpx
+    import server
+
+    logging.getLogger("ai_newsletter").setLevel(logging.WARNING)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench")
+
+    async def call():
+        response = await client.post("/generate-newsletter-data", json={"days": 7, "max_repos": 10})
+        response.raise_for_status()
+
+    return call
+
+@scenario("render_newsletter", iterations=2000)
+def render_newsletter(config: SimulatorConfig):
+    from newsletter import NewsletterGenerator
+
+    generator = NewsletterGenerator()
+    data = sample_newsletter_data(config)
+
+    async def call():
+        generator.generate_newsletter(data)
+
+    return call
+
+@scenario("render_newsletter_records", iterations=2000)
+def render_newsletter_records(config: SimulatorConfig):
+    from models import Discussion, Repo, RepoStats
+    from newsletter import NewsletterGenerator
+
+    generator = NewsletterGenerator()
+    data = sample_newsletter_data(config)
+    # What the server hands over: records parsed once at the adapter boundary
+    data["trending_repos"] = [Repo.from_github(r) for r in data["trending_repos"]]
+    data["discussions"] = [Discussion.from_github(d) for d in data["discussions"]]
+    data["weekly_stats"]["top_repos"] = [RepoStats.from_dict(r) for r in data["weekly_stats"]["top_repos"]]
+
+    async def call():
+        generator.generate_newsletter(data)
+
+    return call
+
+FORMATS = ("markdown", "html", "text", "json")
+
+@scenario("render_formats_rebuild", iterations=1000)
+def render_formats_rebuild(config: SimulatorConfig):
+    from newsletter import NewsletterGenerator
+
+    generator = NewsletterGenerator()
+    data = sample_newsletter_data(config)
+
+    async def call():
+        # Selection and cleaning repeated for every format
+        for format in FORMATS:
+            generator.generate_newsletter(data, format)
+
+    return call
+
+@scenario("render_formats_shared", iterations=1000)
+def render_formats_shared(config: SimulatorConfig):
+    from newsletter import NewsletterGenerator
+
+    generator = NewsletterGenerator()
+    data = sample_newsletter_data(config)
+
+    async def call():
+        generator.generate_formats(data, FORMATS)
+
+    return call
+
+def sample_variants(count: int = 2000) -> List:
+    from variants import Variant
+
+    languages = [(), ("Python",), ("Rust", "Go"), ("TypeScript",)]
+    return [
+        Variant(str(i), languages[i % len(languages)], max_repos=(None, 8, 12)[i % 3], format=("markdown", "html")[i % 2])
+        for i in range(count)
+    ]
+
+@scenario("render_variants_inline", iterations=5)
+def render_variants_inline(config: SimulatorConfig):
+    from variants import VariantRenderer
+
+    renderer = VariantRenderer(sample_newsletter_data(config), workers=1)
+    variants = sample_variants()
+
+    async def call():
+        for _ in renderer.render(variants):
+            pass
+
+    return call
+
+@scenario("render_variants_pool", iterations=5)
+def render_variants_pool(config: SimulatorConfig):
+    from variants import VariantRenderer
+
+    # One warm pool sized to the machine; compare throughput with the inline run
+    renderer = VariantRenderer(sample_newsletter_data(config), workers=max(os.cpu_count() or 1, 2))
+    variants = sample_variants()
+    for _ in renderer.render(variants[:100]):
+        pass
+
+    async def call():
+        for _ in renderer.render(variants):
+            pass
+
+    return call
+
+def sample_filters(count: int = 2000) -> List[Dict]:
+    from github_simulator import LANGUAGES, TOPICS
+
+    return [
+        {"language": (LANGUAGES[i % len(LANGUAGES)],), "topic": (TOPICS[i % len(TOPICS)], TOPICS[(i * 7) % len(TOPICS)])}
+        for i in range(count)
+    ]
+
+@scenario("filter_scan", iterations=10)
+def filter_scan(config: SimulatorConfig):
+    repos = [make_repo(i, config) for i in range(1000)]
+    filters = sample_filters()
+
+    async def call():
+        # One pass over the snapshot per subscriber
+        for f in filters:
+            languages, topics = set(f["language"]), set(f["topic"])
+            [r for r in repos if r["language"] in languages and topics.intersection(r["topics"])]
+
+    return call
+
+@scenario("filter_index", iterations=10)
+def filter_index(config: SimulatorConfig):
+    from repo_index import RepoIndex
+
+    repos = [make_repo(i, config) for i in range(1000)]
+    filters = sample_filters()
+
+    async def call():
+        index = RepoIndex(repos)  # built once per snapshot
+        for f in filters:
+            index.select(repos, **f)
+
+    return call
+
+def sample_descriptions(config: SimulatorConfig, count: int = 5000, distinct: int = 500) -> List[str]:
+    # Repeats mimic the same repos recurring across sections and variants
+    texts = [make_repo(i, config)["description"] + " **bold** `code` [link]" for i in range(distinct)]
+    return [texts[i % distinct] for i in range(count)]
+
+@scenario("clean_per_item", iterations=50)
+def clean_per_item(config: SimulatorConfig):
+    import re
+    from utils import truncate_text
+
+    descriptions = sample_descriptions(config)
+
+    async def call():
+        # The pre-batch path: one regex substitution and truncation per string
+        for description in descriptions:
+            truncate_text(re.sub(r'[#\*\[\]`]', '', description).strip(), 200)
+
+    return call
+
+@scenario("clean_batch", iterations=50)
+def clean_batch(config: SimulatorConfig):
+    from utils import clean_descriptions
+
+    descriptions = sample_descriptions(config)
+
+    async def call():
+        clean_descriptions(descriptions)
+
+    return call
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return human-readable regressions of results against a baseline"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["throughput_per_s"] < previous["throughput_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {previous['throughput_per_s']}/s -> {current['throughput_per_s']}/s"
+            )
+    return regressions
+
+async def run(names: List[str], config: SimulatorConfig, iterations: Optional[int], concurrency: Optional[int]) -> Dict:
+    results = {}
+    for name in names:
+        spec = SCENARIOS[name]
+        operation = spec["setup"](config)
+        await operation()  # warm-up: imports, connection setup, first-call caches
+        results[name] = await measure(
+            operation,
+            iterations or spec["iterations"],
+            concurrency or spec["concurrency"]
+        )
+        print(f"{name}: {results[name]}", file=sys.stderr)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Run newsletter benchmarks against the GitHub simulator")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario(s) to run (default: all)")
+    parser.add_argument("--iterations", type=int, help="Override iterations per scenario")
+    parser.add_argument("--concurrency", type=int, help="Override concurrency per scenario")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated GitHub latency")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="Simulated GitHub latency jitter")
+    parser.add_argument("--description-bytes", type=int, default=200, help="Simulated payload size knob")
+    parser.add_argument("--output", type=str, help="Write JSON results here instead of stdout")
+    parser.add_argument("--baseline", type=str, help="Compare against this results file; exit 1 on regression")
+    parser.add_argument("--save-baseline", type=str, help="Also write results to this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        description_bytes=args.description_bytes,
+        rate_limit=10**9
+    )
+
+    with SimulatorServer(config) as simulator:
+        # Point every adapter at the simulator and measure the uncached path
+        os.environ.update({
+            "GITHUB_API_URL": simulator.url,
+            "GITHUB_REQUEST_INTERVAL": "0",
+            "GITHUB_CACHE_TTL": "0",
+            "STATE_BACKEND_URL": "memory://"
+        })
+        scenarios = asyncio.run(run(args.scenario or list(SCENARIOS), config, args.iterations, args.concurrency))
+
+    simulator_config = asdict(config)
+    simulator_config["anchor"] = config.anchor.isoformat()
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "simulator": simulator_config
+        },
+        "scenarios": scenarios
+    }
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(document + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+
+"""Cold-start benchmark for the CLI client and the server
+
+    python benchmarks/startup.py                       # JSON report to stdout
+    python benchmarks/startup.py --repeat 10 --top 15 --output startup.json
+
+Each target is imported in a fresh interpreter under `python -X importtime`
+(and the CLI is additionally run with --help) so nothing is warm. The report
+gives median wall time per target and the heaviest imports by cumulative
+time, which is where lazy-loading pays off.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+# name -> interpreter arguments, run with src/ as the working directory
+TARGETS = {
+    "import_client": ["-c", "import client"],
+    "import_server": ["-c", "import server"],
+    "import_newsletter": ["-c", "import newsletter"],
+    "cli_help": ["client.py", "--help"]
+}
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of -X importtime output: module, self/cumulative microseconds, depth"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": (len(indent) - 1) // 2
+            })
+    return rows
+
+def run_once(args: List[str]) -> Dict:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        cwd=SRC, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{completed.stderr[-2000:]}")
+    return {"wall_s": elapsed, "imports": parse_importtime(completed.stderr)}
+
+def measure(args: List[str], repeat: int, top: int) -> Dict:
+    runs = [run_once(args) for _ in range(repeat)]
+    walls = sorted(run["wall_s"] for run in runs)
+    # Heaviest imports made directly by the target (or by the interpreter
+    # for script targets), from the median run, by cumulative time
+    median_run = min(runs, key=lambda run: abs(run["wall_s"] - statistics.median(walls)))
+    root = args[1].split()[-1] if args[0] == "-c" else None
+    top_level = [
+        row for row in median_run["imports"]
+        if row["module"] != root and row["depth"] <= (1 if root else 0)
+    ]
+    heaviest = sorted(top_level, key=lambda row: row["cumulative_us"], reverse=True)[:top]
+    return {
+        "repeat": repeat,
+        "wall_median_ms": round(statistics.median(walls) * 1000, 1),
+        "wall_min_ms": round(walls[0] * 1000, 1),
+        "modules_imported": len(median_run["imports"]),
+        "import_total_ms": round(sum(row["self_us"] for row in median_run["imports"]) / 1000, 1),
+        "heaviest_imports": [
+            {"module": row["module"], "cumulative_ms": round(row["cumulative_us"] / 1000, 1)}
+            for row in heaviest
+        ]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the client and server")
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="Target(s) to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=10, help="Heaviest imports to list per target")
+    parser.add_argument("--output", type=str, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.target or list(TARGETS):
+        results[name] = measure(TARGETS[name], args.repeat, args.top)
+        print(f"{name}: {results[name]['wall_median_ms']}ms", file=sys.stderr)
+
+    document = json.dumps({"python": sys.version.split()[0], "targets": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+
+import math
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from batching import window_cutoff
+from models import Repo, RepoStats
+from state_backend import StateBackend
+
+METRICS = ("stars", "forks", "star_growth")
+PERCENTILES = (50, 90, 99)
+
+def week_key(now: Optional[datetime] = None) -> str:
+    year, week, _ = (now or datetime.now(timezone.utc)).isocalendar()
+    return f"{year}-W{week:02d}"
+
+class _LanguageTotals:
+    __slots__ = ("repos", "stars", "forks")
+
+    def __init__(self):
+        self.repos = 0
+        self.stars = 0
+        self.forks = 0
+
+class StatsAggregator:
+    """Running weekly aggregates over the repos of one search window
+
+    Snapshots are upserted as search results arrive. Each upsert applies the
+    delta against the repo's previous snapshot to the totals, the
+    per-language breakdown and three sorted (value, full_name) indexes, so
+    totals, percentiles and top-N never rescan the tracked set. The rendered
+    summary is cached until the next change.
+
+    At the first ingest of a new ISO week the current totals become the
+    "previous week" used for growth, star counts are re-baselined, and repos
+    not seen during the finished week are dropped so the set stays bounded.
+    """
+
+    def __init__(self):
+        self.week = week_key()
+        self.previous: Optional[Dict] = None
+        self._reset()
+
+    def _reset(self):
+        self.total_stars = 0
+        self.total_forks = 0
+        self._repos: Dict[str, Repo] = {}
+        self._baseline: Dict[str, int] = {}
+        self._seen_this_week: set = set()
+        self._languages: Dict[str, _LanguageTotals] = {}
+        self._indexes: Dict[str, List[Tuple[int, str]]] = {metric: [] for metric in METRICS}
+        self._summaries: Dict[int, Dict] = {}
+        self._cutoff: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._repos)
+
+    def _values(self, repo: Repo) -> Dict[str, int]:
+        return {
+            "stars": repo.stars,
+            "forks": repo.forks,
+            "star_growth": repo.stars - self._baseline.get(repo.full_name, repo.stars)
+        }
+
+    def _apply(self, repo: Repo, sign: int):
+        """Add (sign=1) or remove (sign=-1) a snapshot's contribution"""
+        self.total_stars += sign * repo.stars
+        self.total_forks += sign * repo.forks
+        if repo.language:
+            totals = self._languages.get(repo.language)
+            if totals is None:
+                totals = self._languages[repo.language] = _LanguageTotals()
+            totals.repos += sign
+            totals.stars += sign * repo.stars
+            totals.forks += sign * repo.forks
+            if not totals.repos:
+                del self._languages[repo.language]
+
+        for metric, value in self._values(repo).items():
+            index = self._indexes[metric]
+            entry = (value, repo.full_name)
+            if sign > 0:
+                insort(index, entry)
+            else:
+                del index[bisect_left(index, entry)]
+
+    def _rollover(self, week: str):
+        if self._repos:
+            self.previous = {
+                "week": self.week,
+                "total_stars": self.total_stars,
+                "total_forks": self.total_forks,
+                "repos": len(self._repos)
+            }
+        kept = [self._repos[name] for name in self._seen_this_week if name in self._repos]
+        self.week = week
+        self._reset()
+        for repo in kept:
+            self._baseline[repo.full_name] = repo.stars
+            self._repos[repo.full_name] = repo
+            self._apply(repo, 1)
+
+    def ingest(self, repos: Iterable, now: Optional[datetime] = None) -> int:
+        """Upsert repo snapshots (records or GitHub dicts); returns how many changed"""
+        week = week_key(now)
+        if week != self.week:
+            self._rollover(week)
+
+        changed = 0
+        for repo in map(Repo.coerce, repos):
+            name = repo.full_name
+            if not name:
+                continue
+            self._seen_this_week.add(name)
+            old = self._repos.get(name)
+            if old is not None:
+                if (old.stars, old.forks, old.language) == (repo.stars, repo.forks, repo.language):
+                    self._repos[name] = repo
+                    continue
+                self._apply(old, -1)
+            else:
+                self._baseline.setdefault(name, repo.stars)
+            self._repos[name] = repo
+            self._apply(repo, 1)
+            changed += 1
+
+        if changed:
+            self._summaries.clear()
+        return changed
+
+    def retain_window(self, days: int, now: Optional[datetime] = None) -> int:
+        """Drop repos created before a days-long window; returns how many went
+
+        Uses the created:> rule of the searches. Repos only age out when the
+        cutoff date moves, so the tracked set is scanned once a day at most.
+        """
+        cutoff = window_cutoff(days, now)
+        if cutoff == self._cutoff:
+            return 0
+        self._cutoff = cutoff
+
+        expired = [repo for repo in self._repos.values() if repo.created_at and repo.created_at[:10] <= cutoff]
+        for repo in expired:
+            self._apply(repo, -1)
+            del self._repos[repo.full_name]
+            self._seen_this_week.discard(repo.full_name)
+        if expired:
+            self._summaries.clear()
+        return len(expired)
+
+    def percentile(self, metric: str, pct: float) -> int:
+        """Nearest-rank percentile of a metric across tracked repos"""
+        index = self._indexes[metric]
+        if not index:
+            return 0
+        rank = max(math.ceil(pct / 100 * len(index)), 1)
+        return index[min(rank, len(index)) - 1][0]
+
+    def top(self, metric: str, n: int) -> List[Repo]:
+        """n repos with the highest value of a metric, highest first"""
+        return [self._repos[name] for _, name in reversed(self._indexes[metric][-n:])]
+
+    def _growth(self) -> Optional[Dict]:
+        if not self.previous:
+            return None
+        previous_stars = self.previous["total_stars"]
+        return {
+            "week": self.previous["week"],
+            "stars": self.total_stars - previous_stars,
+            "forks": self.total_forks - self.previous["total_forks"],
+            "repos": len(self._repos) - self.previous["repos"],
+            "stars_pct": round((self.total_stars - previous_stars) / previous_stars * 100, 2) if previous_stars else None
+        }
+
+    def summary(self, top_n: int = 3) -> Dict:
+        """weekly_stats payload; cached until the next ingest changes something"""
+        cached = self._summaries.get(top_n)
+        if cached is not None:
+            return cached
+
+        languages = sorted(self._languages.items(), key=lambda item: item[1].stars, reverse=True)
+        as_stats = lambda repo: RepoStats(
+            repo.name, repo.full_name, repo.stars, repo.forks, repo.language,
+            repo.description, repo.html_url, repo.created_at, repo.updated_at
+        ).to_dict()
+
+        value = {
+            "week": self.week,
+            "tracked_repos": len(self._repos),
+            "total_stars": self.total_stars,
+            "total_forks": self.total_forks,
+            "languages": [language for language, _ in languages],
+            "language_breakdown": {
+                language: {"repos": totals.repos, "stars": totals.stars, "forks": totals.forks}
+                for language, totals in languages
+            },
+            "percentiles": {
+                metric: {f"p{pct}": self.percentile(metric, pct) for pct in PERCENTILES}
+                for metric in ("stars", "forks")
+            },
+            "growth": self._growth(),
+            "top_repos": [as_stats(repo) for repo in self.top("stars", top_n)],
+            "top_by": {
+                metric: [{"full_name": repo.full_name, metric: self._values(repo)[metric]} for repo in self.top(metric, top_n)]
+                for metric in METRICS
+            }
+        }
+        self._summaries[top_n] = value
+        return value
+
+    def to_state(self) -> Dict:
+        return {
+            "week": self.week,
+            "previous": self.previous,
+            "repos": [repo.to_dict(extra=False) for repo in self._repos.values()],
+            "baseline": self._baseline,
+            "seen": sorted(self._seen_this_week)
+        }
+
+    def load_state(self, state: Dict):
+        self._reset()
+        self.week = state["week"]
+        self.previous = state.get("previous")
+        self._baseline = dict(state.get("baseline", {}))
+        self._seen_this_week = set(state.get("seen", ()))
+        for repo in map(Repo.from_github, state.get("repos", ())):
+            self._repos[repo.full_name] = repo
+            self._apply(repo, 1)
+
+class WindowedStats:
+    """Weekly aggregates per search window, shared by every worker
+
+    Each `days` window has its own StatsAggregator fed only by fetches of
+    that window, so a summary never mixes in repos from wider searches.
+    The state lives in the shared backend under stats:aggregate:<days>: an
+    ingest takes the window's lock, catches the local copy up if another
+    worker wrote since, applies the deltas and writes the state back with a
+    bumped version. Reads only fetch the small version key and reload the
+    state when it moved, so every worker serves the same numbers.
+    """
+
+    def __init__(self, backend: StateBackend):
+        self.backend = backend
+        self._windows: Dict[int, Tuple[int, StatsAggregator]] = {}
+
+    async def _sync(self, days: int) -> StatsAggregator:
+        key = f"stats:aggregate:{days}"
+        version = int(await self.backend.get(f"{key}:version") or 0)
+        cached = self._windows.get(days)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        aggregator = StatsAggregator()
+        state = await self.backend.get_json(key) if version else None
+        if state:
+            aggregator.load_state(state)
+        self._windows[days] = (version, aggregator)
+        return aggregator
+
+    async def ingest(self, days: int, repos: Iterable, now: Optional[datetime] = None) -> int:
+        """Upsert a days-window fetch into the shared aggregates; returns how many changed"""
+        key = f"stats:aggregate:{days}"
+        async with self.backend.lock(key):
+            aggregator = await self._sync(days)
+            week = aggregator.week
+            changed = aggregator.ingest(repos, now)
+            expired = aggregator.retain_window(days, now)
+            if changed or expired or aggregator.week != week:
+                await self.backend.set_json(key, aggregator.to_state())
+                version = await self.backend.incr(f"{key}:version")
+                self._windows[days] = (version, aggregator)
+        return changed
+
+    async def summary(self, days: int, top_n: int = 3, now: Optional[datetime] = None) -> Dict:
+        """weekly_stats payload for a window, over the repos still inside it"""
+        aggregator = await self._sync(days)
+        aggregator.retain_window(days, now)
+        return aggregator.summary(top_n)
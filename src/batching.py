@@ -0,0 +1,64 @@
+
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from metrics import REGISTRY
+
+BATCH_FETCHES = REGISTRY.counter(
+    "batch_window_fetches_total", "Search windows of batched newsletter requests by how they were served", ["result"]
+)
+
+Window = Tuple[List, List]
+
+def window_cutoff(days: int, now: Optional[datetime] = None) -> str:
+    """The date a days-long search window starts after, as in created:>DATE"""
+    return ((now or datetime.now()) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+def within_window(items: Sequence, days: int, now: Optional[datetime] = None) -> List:
+    """Records created inside the window, keeping order
+
+    Same test as GitHub's created:> qualifier (strictly after the cutoff
+    date); records without a created_at are kept rather than guessed away.
+    """
+    cutoff = window_cutoff(days, now)
+    return [item for item in items if not item.created_at or item.created_at[:10] > cutoff]
+
+class SharedWindows:
+    """Upstream searches shared by the sub-requests of one batch
+
+    Windows should be requested widest first. A narrower window is cut from
+    an already fetched wider one by created_at, as long as what is left
+    still covers what the sub-request returns (`need_repos` repos and
+    `need_discussions` discussions). Searches are ranked and capped
+    upstream, so a thinner cut could be missing items a dedicated search
+    would have found; such windows are fetched on their own, and can in
+    turn serve narrower ones. Incremental and full fetches never share.
+    """
+
+    def __init__(self, fetch: Callable[[int, bool], Awaitable[Window]], now: Optional[datetime] = None):
+        self._fetch = fetch
+        self.now = now or datetime.now()
+        self._fetched: Dict[bool, Dict[int, Window]] = {}
+        self.upstream = 0
+        self.shared = 0
+
+    async def window(self, days: int, incremental: bool, need_repos: float, need_discussions: float) -> Window:
+        fetched = self._fetched.setdefault(incremental, {})
+        for wider in sorted(d for d in fetched if d >= days):
+            repos, discussions = fetched[wider]
+            if wider == days:
+                return self._share(repos, discussions)
+            repos = within_window(repos, days, self.now)
+            discussions = within_window(discussions, days, self.now)
+            if len(repos) >= need_repos and len(discussions) >= need_discussions:
+                return self._share(repos, discussions)
+
+        fetched[days] = await self._fetch(days, incremental)
+        self.upstream += 1
+        BATCH_FETCHES.labels("upstream").inc()
+        return fetched[days]
+
+    def _share(self, repos: List, discussions: List) -> Window:
+        self.shared += 1
+        BATCH_FETCHES.labels("shared").inc()
+        return repos, discussions
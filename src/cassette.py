@@ -0,0 +1,247 @@
+
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+
+from metrics import REGISTRY
+
+CASSETTE_REQUESTS = REGISTRY.counter(
+    "cassette_requests_total", "HTTP calls served by the record/replay cassette", ["mode", "result"]
+)
+
+# Dropped when a response is stored: bodies are kept decoded, and the
+# replayed response gets its length from the stored content
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+MODES = ("record", "replay")
+
+class CassetteMiss(httpx.TransportError):
+    """Replay found no recorded interaction for a request"""
+
+@dataclass(slots=True)
+class Interaction:
+    method: str
+    url: str
+    body: str           # sha1 of the request body
+    status: int
+    headers: List[Tuple[str, str]]
+    content: str
+    encoding: str       # "utf-8", or "base64" for binary bodies
+    elapsed: float      # seconds from sending the request to the last body byte
+
+    def response(self, request: httpx.Request) -> httpx.Response:
+        content = base64.b64decode(self.content) if self.encoding == "base64" else self.content.encode()
+        return httpx.Response(self.status, headers=self.headers, content=content, request=request)
+
+def _normalize_url(url: httpx.URL) -> str:
+    """The URL with its query parameters sorted, so their order doesn't matter"""
+    parts = urlsplit(str(url))
+    return urlunsplit(parts._replace(query=urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))))
+
+def _route(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+def _body_hash(request: httpx.Request) -> str:
+    return hashlib.sha1(request.content).hexdigest()
+
+class Cassette:
+    """Record HTTP interactions to a gzipped JSONL file and replay them offline
+
+    In record mode every request made through one of the cassette's
+    transports goes to the network; the decoded response and how long it
+    took are kept, and the whole cassette is rewritten when a transport
+    closes (and at exit). Request headers are never stored, so tokens and
+    API keys stay out of the file.
+
+    In replay mode nothing goes to the network. A request is matched on
+    method, URL (query order ignored) and a hash of its body; requests
+    repeated in the recording are answered in recorded order, and the last
+    answer is reused once they run out. Requests whose query drifted since
+    recording (GitHub searches carry a created:> date) fall back to the
+    next unused interaction on the same host and path. Each response is
+    delayed by its recorded latency times `latency_scale`: 1.0 keeps the
+    original timing, 0 replays as fast as possible.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.interactions: List[Interaction] = []
+        self._lock = threading.Lock()
+        self._used: List[bool] = []
+        self._exact: Dict[Tuple[str, str, str], List[int]] = defaultdict(list)
+        self._routes: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        if mode == "replay":
+            self.load()
+        else:
+            atexit.register(self.save)
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """The cassette named by HTTP_CASSETTE, shared per path within the process"""
+        path = os.getenv("HTTP_CASSETTE")
+        if not path:
+            return None
+        if path not in _OPEN:
+            _OPEN[path] = cls(
+                path,
+                mode=os.getenv("HTTP_CASSETTE_MODE", "replay"),
+                latency_scale=float(os.getenv("HTTP_CASSETTE_LATENCY_SCALE", "1"))
+            )
+        return _OPEN[path]
+
+    def __len__(self) -> int:
+        return len(self.interactions)
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            interactions = [Interaction(**json.loads(line)) for line in f if line.strip()]
+        with self._lock:
+            self.interactions = interactions
+            self._used = [False] * len(interactions)
+            self._exact.clear()
+            self._routes.clear()
+            for position, interaction in enumerate(interactions):
+                self._exact[(interaction.method, interaction.url, interaction.body)].append(position)
+                self._routes[(interaction.method, _route(interaction.url))].append(position)
+
+    def save(self):
+        if self.mode != "record":
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            lines = [json.dumps(asdict(interaction), ensure_ascii=False) for interaction in self.interactions]
+        # mtime=0 keeps the archive byte-identical for identical traffic
+        with open(self.path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write("".join(line + "\n" for line in lines).encode())
+
+    def record(self, request: httpx.Request, response: httpx.Response, elapsed: float) -> Interaction:
+        content = response.content
+        try:
+            text, encoding = content.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            text, encoding = base64.b64encode(content).decode("ascii"), "base64"
+        interaction = Interaction(
+            method=request.method,
+            url=_normalize_url(request.url),
+            body=_body_hash(request),
+            status=response.status_code,
+            headers=[(name, value) for name, value in response.headers.items() if name.lower() not in DROPPED_HEADERS],
+            content=text,
+            encoding=encoding,
+            elapsed=round(elapsed, 6)
+        )
+        with self._lock:
+            self.interactions.append(interaction)
+        CASSETTE_REQUESTS.labels("record", "stored").inc()
+        return interaction
+
+    def lookup(self, request: httpx.Request) -> Interaction:
+        """The recorded interaction answering this request; CassetteMiss if there is none"""
+        url = _normalize_url(request.url)
+        candidates = (
+            (self._exact, (request.method, url, _body_hash(request)), "hit"),
+            (self._routes, (request.method, _route(url)), "fallback")
+        )
+        with self._lock:
+            for index, key, result in candidates:
+                positions = index.get(key)
+                if not positions:
+                    continue
+                position = next((p for p in positions if not self._used[p]), positions[-1])
+                self._used[position] = True
+                CASSETTE_REQUESTS.labels("replay", result).inc()
+                return self.interactions[position]
+        CASSETTE_REQUESTS.labels("replay", "miss").inc()
+        raise CassetteMiss(f"No recorded interaction for {request.method} {url} in {self.path}", request=request)
+
+    def delay(self, interaction: Interaction) -> float:
+        return max(interaction.elapsed * self.latency_scale, 0.0)
+
+    def async_transport(self, inner: Optional[httpx.AsyncBaseTransport] = None) -> "AsyncCassetteTransport":
+        return AsyncCassetteTransport(self, inner)
+
+    def transport(self, inner: Optional[httpx.BaseTransport] = None) -> "CassetteTransport":
+        return CassetteTransport(self, inner)
+
+_OPEN: Dict[str, Cassette] = {}
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    """httpx.AsyncClient transport that records to or replays from a cassette
+
+    Recorded responses are read in full before they are returned, so
+    streaming endpoints arrive in one piece while recording.
+    """
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner if inner is not None or cassette.mode == "replay" else httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.cassette.mode == "replay":
+            interaction = self.cassette.lookup(request)
+            delay = self.cassette.delay(interaction)
+            if delay:
+                await asyncio.sleep(delay)
+            return interaction.response(request)
+
+        await request.aread()
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        return self.cassette.record(request, response, time.perf_counter() - started).response(request)
+
+    async def aclose(self):
+        if self.inner is not None:
+            await self.inner.aclose()
+        self.cassette.save()
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx.Client transport that records to or replays from a cassette (the Anthropic SDK is synchronous)"""
+
+    def __init__(self, cassette: Cassette, inner: Optional[httpx.BaseTransport] = None):
+        self.cassette = cassette
+        self.inner = inner if inner is not None or cassette.mode == "replay" else httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.cassette.mode == "replay":
+            interaction = self.cassette.lookup(request)
+            delay = self.cassette.delay(interaction)
+            if delay:
+                time.sleep(delay)
+            return interaction.response(request)
+
+        request.read()
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+        return self.cassette.record(request, response, time.perf_counter() - started).response(request)
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+        self.cassette.save()
@@ -0,0 +1,111 @@
+
+import time
+from typing import Dict, List, Optional
+
+from metrics import REGISTRY
+from state_backend import StateBackend
+
+BREAKER_STATE = REGISTRY.gauge(
+    "circuit_breaker_open", "1 while an upstream endpoint's circuit breaker is open or half-open", ["endpoint"]
+)
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    "circuit_breaker_transitions_total", "Circuit breaker state changes by endpoint", ["endpoint", "state"]
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+PROBE = "probe"
+
+class CircuitBreaker:
+    """Fail fast on an upstream endpoint that keeps failing or crawling
+
+    Calls count as failures when they error out or take longer than
+    `slow_call_seconds`. After `failure_threshold` consecutive failures
+    seen by this worker the breaker trips: the time it may be retried is
+    written to the shared backend, so every worker fails fast from then on
+    without paying for timeouts. Once `reset_timeout` has passed the
+    breaker is half-open and exactly one caller across all workers (the
+    holder of a short probe lock) goes upstream; its success closes the
+    breaker, its failure trips it again. Everyone else keeps failing fast
+    meanwhile, so recovery is detected without a thundering herd.
+
+    Usage: admitted = await acquire(); None means don't call. Otherwise
+    make the call and report it with record(admitted, ok, elapsed).
+    """
+
+    def __init__(
+        self,
+        backend: StateBackend,
+        name: str,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 10.0,
+        reset_timeout: float = 30.0,
+        probe_timeout: float = 30.0
+    ):
+        self.backend = backend
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.failures = 0
+        self.key = f"breaker:{name}"
+
+    async def state(self) -> str:
+        retry_at = await self.backend.get(self.key)
+        if retry_at is None:
+            return CLOSED
+        return OPEN if time.time() < float(retry_at) else HALF_OPEN
+
+    async def acquire(self) -> Optional[str]:
+        """CLOSED or PROBE when the call may go upstream, None to fail fast"""
+        state = await self.state()
+        if state == CLOSED:
+            return CLOSED
+        if state == HALF_OPEN and await self.backend.set(f"{self.key}:probe", "1", self.probe_timeout, only_if_missing=True):
+            return PROBE
+        return None
+
+    async def record(self, admitted: str, ok: bool, elapsed: float):
+        """Report the outcome of a call acquire() let through"""
+        failed = not ok or elapsed > self.slow_call_seconds
+        if not failed:
+            self.failures = 0
+            if admitted == PROBE:
+                await self.backend.delete(self.key)
+                await self.backend.delete(f"{self.key}:probe")
+                self._transition(CLOSED)
+            return
+
+        self.failures += 1
+        if admitted == PROBE or self.failures >= self.failure_threshold:
+            await self.trip()
+
+    async def trip(self):
+        self.failures = 0
+        await self.backend.set(self.key, str(time.time() + self.reset_timeout))
+        await self.backend.delete(f"{self.key}:probe")
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        BREAKER_TRANSITIONS.labels(self.name, state).inc()
+        BREAKER_STATE.labels(self.name).set(0 if state == CLOSED else 1)
+
+class CircuitBreakers:
+    """One breaker per upstream endpoint, created on first use with shared settings"""
+
+    def __init__(self, backend: StateBackend, **settings):
+        self.backend = backend
+        self.settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(self.backend, endpoint, **self.settings)
+        return breaker
+
+    async def degraded(self, endpoints: List[str]) -> List[str]:
+        """The given endpoints whose breaker is not closed"""
+        return [endpoint for endpoint in endpoints if await self.get(endpoint).state() != CLOSED]
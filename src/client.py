@@ -1,31 +1,130 @@
 
-import httpx
 import asyncio
-from typing import Dict, Optional
+import json
+import time
+from functools import cached_property
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Optional
 import os
 from dotenv import load_dotenv
-import anthropic
 
-from newsletter import NewsletterGenerator
+from metrics import REGISTRY
 from utils import setup_logging
 
+# anthropic (~2s to import), httpx and the newsletter renderer are imported on
+# first use so `--no-claude` runs, `--help` and Streamlit reruns don't pay for them
+if TYPE_CHECKING:
+    import anthropic
+    import httpx
+    from cassette import Cassette
+    from mcp_rpc import MCPHttpSession
+    from newsletter import NewsletterGenerator
+    from prompts import Prompt, PromptBuilder
+    from state_backend import StateBackend
+
 load_dotenv()
 logger = setup_logging()
 
+LLM_LATENCY = REGISTRY.histogram(
+    "llm_enhancement_duration_seconds", "Latency of Claude enhancement calls", ["model", "outcome"]
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens used by Claude enhancement", ["model", "direction"]
+)
+
 class MCPNewsletterClient:
-    def __init__(self, server_url: str = "http://localhost:8000"):
+    def __init__(
+        self,
+        server_url: str = "http://localhost:8000",
+        cassette: Optional["Cassette"] = None,
+        transport: Optional[str] = None
+    ):
         self.server_url = server_url
-        self.anthropic_client = anthropic.Anthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY")
+        # "rest" posts to /generate-newsletter-data; "mcp" calls the same data as
+        # a tool over one persistent MCP session (POST /mcp)
+        self.transport = transport or os.getenv("MCP_TRANSPORT", "rest")
+        if cassette is not None:
+            self.cassette = cassette
+    
+    @cached_property
+    def cassette(self) -> Optional["Cassette"]:
+        """Record/replay cassette for server and Claude traffic, from HTTP_CASSETTE"""
+        if not os.getenv("HTTP_CASSETTE"):
+            return None
+        from cassette import Cassette
+        
+        return Cassette.from_env()
+    
+    def _http_client(self, **kwargs) -> "httpx.AsyncClient":
+        import httpx
+        
+        if self.cassette is not None:
+            kwargs["transport"] = self.cassette.async_transport()
+        return httpx.AsyncClient(**kwargs)
+    
+    @cached_property
+    def mcp_session(self) -> "MCPHttpSession":
+        import httpx
+        from mcp_rpc import MCPHttpSession
+        
+        return MCPHttpSession(f"{self.server_url}/mcp", self._http_client(timeout=httpx.Timeout(30.0, read=None)))
+    
+    async def close(self):
+        """End the MCP session, if one was opened"""
+        if "mcp_session" in self.__dict__:
+            await self.mcp_session.close()
+    
+    @cached_property
+    def anthropic_client(self) -> "anthropic.Anthropic":
+        import anthropic
+        
+        options = {}
+        if self.cassette is not None:
+            import httpx
+            
+            options["http_client"] = httpx.Client(transport=self.cassette.transport())
+        return anthropic.Anthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            **options
         )
-        self.newsletter_generator = NewsletterGenerator()
     
-    async def generate_newsletter(self, days: int = 7, enhance_with_claude: bool = True) -> str:
-        """Generate complete newsletter using MCP server + Claude enhancement"""
+    @cached_property
+    def newsletter_generator(self) -> "NewsletterGenerator":
+        from newsletter import NewsletterGenerator
+        
+        return NewsletterGenerator()
+    
+    @cached_property
+    def state_backend(self) -> "StateBackend":
+        from state_backend import create_backend
+        
+        return create_backend()
+    
+    async def generate_newsletter(
+        self,
+        days: int = 7,
+        enhance_with_claude: bool = True,
+        format: str = "markdown",
+        edition: Optional[str] = None
+    ) -> str:
+        """Generate complete newsletter using MCP server + Claude enhancement
+        
+        Claude edits markdown, so other formats (html, text, json) are
+        emitted straight from the generated document without enhancement.
+        With an `edition` name the newsletter is diffed against the previous
+        run of that edition and only new or changed items are rendered and
+        enhanced (see generate_edition).
+        """
         try:
             # Step 1: Get data from MCP server
             logger.info("Fetching data from MCP server...")
-            raw_data = await self._fetch_newsletter_data(days)
+            raw_data = await self.fetch_newsletter_data(days)
+            
+            if format != "markdown":
+                logger.info(f"Rendering {format} newsletter...")
+                return self.newsletter_generator.generate_newsletter(raw_data, format)
+            
+            if edition:
+                return await self.generate_edition(raw_data, edition, enhance_with_claude)
             
             # Step 2: Generate basic newsletter
             logger.info("Generating newsletter structure...")
@@ -43,9 +142,60 @@ class MCPNewsletterClient:
             logger.error(f"Error generating newsletter: {e}")
             raise
     
-    async def _fetch_newsletter_data(self, days: int) -> Dict:
+    async def generate_via_job(
+        self,
+        days: int = 7,
+        enhance_with_claude: bool = True,
+        format: str = "markdown",
+        on_event: Optional[Callable[[str, Dict], None]] = None
+    ) -> str:
+        """Generate on the server as a background job, following its progress
+        
+        on_event receives every (event, data) pair of the job's SSE stream:
+        progress per stage, render with the basic newsletter, token for each
+        piece of enhanced text, and the final result.
+        """
+        import httpx
+        from jobs import parse_sse
+        
+        async with self._http_client(timeout=httpx.Timeout(30.0, read=None)) as client:
+            response = await client.post(
+                f"{self.server_url}/jobs",
+                json={
+                    "days": days,
+                    "include_stats": True,
+                    "max_repos": 15,
+                    "enhance": enhance_with_claude,
+                    "format": format
+                }
+            )
+            if response.status_code != 202:
+                raise Exception(f"MCP server error: {response.status_code} - {response.text}")
+            
+            job = response.json()
+            async with client.stream("GET", f"{self.server_url}{job['events']}") as events:
+                if events.status_code != 200:
+                    await events.aread()
+                    raise Exception(f"MCP server error: {events.status_code} - {events.text}")
+                async for event, data in parse_sse(events.aiter_lines()):
+                    if on_event is not None:
+                        on_event(event, data)
+                    if event == "result":
+                        return data["text"]
+                    if event == "error":
+                        raise Exception(f"Newsletter job failed: {data['message']}")
+        
+        raise Exception(f"Newsletter job {job['job_id']} stream ended without a result")
+    
+    async def fetch_newsletter_data(self, days: int) -> Dict:
         """Fetch data from MCP server"""
-        async with httpx.AsyncClient() as client:
+        if self.transport == "mcp":
+            return await self.mcp_session.call_tool(
+                "generate_newsletter_data",
+                {"days": days, "include_stats": True, "max_repos": 15}
+            )
+        
+        async with self._http_client() as client:
             response = await client.post(
                 f"{self.server_url}/generate-newsletter-data",
                 json={
@@ -60,65 +210,230 @@ class MCPNewsletterClient:
             else:
                 raise Exception(f"MCP server error: {response.status_code} - {response.text}")
     
-    async def _enhance_with_claude(self, basic_newsletter: str, raw_data: Dict) -> str:
-        """Use Claude to enhance and polish the newsletter"""
-        
-        prompt = f"""You are an expert AI newsletter editor. Please enhance this AI newsletter to make it more engaging, professional, and informative.
+    async def stream_items(self, path: str, **params) -> AsyncIterator[Dict]:
+        """Yield items from an NDJSON endpoint as lines arrive
 
-Current newsletter:
-{basic_newsletter}
+        Nothing is buffered beyond the current line; the server only
+        paginates further as this generator is consumed.
+        """
+        import httpx
 
-Raw data for context:
-- Found {len(raw_data.get('trending_repos', []))} trending repositories
-- Found {len(raw_data.get('discussions', []))} interesting discussions
-- Weekly stats available: {bool(raw_data.get('weekly_stats'))}
+        async with self._http_client(timeout=httpx.Timeout(30.0, read=None)) as client:
+            async with client.stream("GET", f"{self.server_url}{path}", params=params) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise Exception(f"MCP server error: {response.status_code} - {response.text}")
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line)
 
-Please:
-1. Improve the writing quality and tone (friendly but professional)
-2. Add insights and context where appropriate
-3. Ensure sections flow well together
-4. Keep all repository links and data intact
-5. Add engaging headlines and descriptions
-6. Maintain the existing markdown structure
-
-Return only the enhanced newsletter in markdown format."""
+    def stream_trending_repos(self, days: int = 7, limit: int = 1000) -> AsyncIterator[Dict]:
+        return self.stream_items("/trending-repos/stream", days=days, limit=limit)
 
+    def stream_discussions(self, days: int = 7, limit: int = 1000) -> AsyncIterator[Dict]:
+        return self.stream_items("/ai-discussions/stream", days=days, limit=limit)
+    
+    @cached_property
+    def prompt_builder(self) -> "PromptBuilder":
+        from prompts import PromptBuilder
+        
+        return PromptBuilder(
+            budget=int(os.getenv("CLAUDE_PROMPT_BUDGET", "1200")),
+            max_output_tokens=int(os.getenv("CLAUDE_MAX_OUTPUT_TOKENS", "4000"))
+        )
+    
+    async def generate_edition(self, raw_data: Dict, edition: str = "default", enhance_with_claude: bool = True) -> str:
+        """Render (and enhance) only what changed since the last run of this edition
+        
+        Items are enhanced one fragment each, so unchanged repos and
+        discussions keep their previous enhanced text verbatim and only the
+        stale ones go to Claude, in a single call. Header, stats and footer
+        are always rendered fresh.
+        """
+        from editions import EditionStore, assemble, diff_edition
+        
+        store = EditionStore(self.state_backend, edition)
+        document = self.newsletter_generator.build_document(raw_data)
+        diff = diff_edition(document, await store.load(), enhance=enhance_with_claude)
+        logger.info(
+            f"Edition {edition}: {diff.reused} item(s) reused ({diff.updated} with new counts), "
+            f"{len(diff.fragments) - diff.reused} rendered, "
+            f"{len(diff.stale)} to enhance, {diff.removed} dropped"
+        )
+        
+        if diff.stale:
+            diff.enhanced.update(await self._enhance_fragments({key: diff.fragments[key] for key in diff.stale}))
+        
+        await store.save(diff)
+        return assemble(document, diff, enhanced=enhance_with_claude)
+    
+    async def _create_message(self, prompt: "Prompt", on_text: Optional[Callable[[str], None]] = None):
+        """Send a prompt to Claude, recording latency and token usage
+        
+        With on_text the response is streamed and each text delta is passed
+        to on_text on the event loop as it arrives.
+        """
+        model = "claude-3-sonnet-20240229"
+        request = {
+            "model": model,
+            "max_tokens": prompt.max_tokens,
+            "messages": [{"role": "user", "content": prompt.text}]
+        }
+        started = time.perf_counter()
         try:
-            message = self.anthropic_client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=4000,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            return message.content[0].text
+            # The SDK calls are synchronous; keep them off the event loop
+            if on_text is None:
+                message = await asyncio.to_thread(self.anthropic_client.messages.create, **request)
+            else:
+                loop = asyncio.get_running_loop()
+                
+                def stream():
+                    with self.anthropic_client.messages.stream(**request) as events:
+                        for text in events.text_stream:
+                            loop.call_soon_threadsafe(on_text, text)
+                        return events.get_final_message()
+                
+                message = await asyncio.to_thread(stream)
+        except Exception:
+            LLM_LATENCY.labels(model, "error").observe(time.perf_counter() - started)
+            raise
+        
+        LLM_LATENCY.labels(model, "success").observe(time.perf_counter() - started)
+        usage = getattr(message, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.labels(model, "input").inc(int(usage.input_tokens))
+            LLM_TOKENS.labels(model, "output").inc(int(usage.output_tokens))
+        
+        if getattr(message, "stop_reason", None) == "max_tokens":
+            raise Exception(f"output hit max_tokens={prompt.max_tokens}")
+        return message
+    
+    async def _enhance_fragments(self, fragments: Dict[str, str]) -> Dict[str, str]:
+        """Enhanced text per fragment id; fragments Claude didn't return keep their basic text"""
+        from prompts import build_fragment_prompt, parse_fragments
+        
+        prompt = build_fragment_prompt(fragments, self.prompt_builder.max_output_tokens)
+        try:
+            message = await self._create_message(prompt)
+        except Exception as e:
+            logger.warning(f"Claude fragment enhancement failed: {e}. Keeping basic fragments.")
+            return {}
+        return parse_fragments(message.content[0].text, fragments)
+    
+    async def _enhance_with_claude(
+        self,
+        basic_newsletter: str,
+        raw_data: Dict,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Use Claude to enhance and polish the newsletter
+        
+        Claude gets a token-budgeted digest of raw_data plus the section
+        outline of the basic newsletter, not the full markdown; the basic
+        newsletter is the fallback if the call fails or is cut short.
+        on_text, if given, receives the enhanced text as it streams in.
+        """
+        try:
+            return await self.request_enhancement(basic_newsletter, raw_data, on_text)
             
         except Exception as e:
             logger.warning(f"Claude enhancement failed: {e}. Returning basic newsletter.")
             return basic_newsletter
 
+    async def request_enhancement(
+        self,
+        basic_newsletter: str,
+        raw_data: Dict,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """The Claude-enhanced newsletter; unlike _enhance_with_claude, failures raise"""
+        from prompts import outline_of
+        
+        prompt = self.prompt_builder.build(raw_data, outline_of(basic_newsletter))
+        message = await self._create_message(prompt, on_text)
+        return message.content[0].text
+
+def report_progress(event: str, data: Dict):
+    """CLI progress on stderr, so stdout stays the newsletter"""
+    import sys
+    
+    if event == "progress":
+        # "enhanced" follows a line of token dots
+        prefix = "\n" if data["stage"] == "enhanced" else ""
+        print(f"{prefix}[{data['done']}/{data['total']}] {data['stage']}", file=sys.stderr)
+    elif event == "token":
+        print(".", end="", file=sys.stderr, flush=True)
+
 # CLI interface
 async def main():
     import argparse
+    import sys
     
+    # `client.py loadtest ...` drives the server instead of generating a newsletter
+    if len(sys.argv) > 1 and sys.argv[1] == "loadtest":
+        import loadtest
+        await loadtest.main(sys.argv[2:])
+        return
+
+    # `client.py pipeline ...` queues and runs scheduled newsletter jobs
+    if len(sys.argv) > 1 and sys.argv[1] == "pipeline":
+        import pipeline
+        await pipeline.main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description="Generate AI Newsletter")
     parser.add_argument("--days", type=int, default=7, help="Days to look back")
     parser.add_argument("--no-claude", action="store_true", help="Skip Claude enhancement")
     parser.add_argument("--output", type=str, help="Output file path")
+    parser.add_argument("--edition", type=str,
+                        help="Diff against the previous run of this edition; only changed items are re-rendered and re-enhanced")
+    parser.add_argument("--format", choices=["markdown", "html", "text", "json"], default="markdown",
+                        help="Output format (only markdown is enhanced with Claude)")
+    parser.add_argument("--progress", action="store_true",
+                        help="Generate as a server-side job and report progress on stderr as it streams in")
+    parser.add_argument("--metrics-file", type=str,
+                        help="Write Prometheus metrics here after the run (node_exporter textfile format)")
     
     args = parser.parse_args()
     
+    import aiofiles
+    from loop_watchdog import LoopWatchdog
+    
+    watchdog = LoopWatchdog.from_env()
+    if watchdog is not None:
+        watchdog.start()
+    
     client = MCPNewsletterClient()
-    newsletter = await client.generate_newsletter(
-        days=args.days,
-        enhance_with_claude=not args.no_claude
-    )
-    
-    if args.output:
-        with open(args.output, 'w') as f:
-            f.write(newsletter)
-        print(f"Newsletter saved to {args.output}")
-    else:
-        print(newsletter)
+    try:
+        if args.progress:
+            newsletter = await client.generate_via_job(
+                days=args.days,
+                enhance_with_claude=not args.no_claude,
+                format=args.format,
+                on_event=report_progress
+            )
+        else:
+            newsletter = await client.generate_newsletter(
+                days=args.days,
+                enhance_with_claude=not args.no_claude,
+                format=args.format,
+                edition=args.edition
+            )
+        
+        if args.output:
+            async with aiofiles.open(args.output, 'w') as f:
+                await f.write(newsletter)
+            print(f"Newsletter saved to {args.output}")
+        else:
+            print(newsletter)
+    finally:
+        await client.close()
+        if watchdog is not None:
+            await watchdog.stop()
+    
+    if args.metrics_file:
+        async with aiofiles.open(args.metrics_file, 'w') as f:
+            await f.write(REGISTRY.render())
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,302 @@
+
+import html
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("ai_newsletter")
+
+# Format-neutral newsletter model. NewsletterGenerator selects, truncates and
+# cleans content once into a Document; emitters only serialize it.
+
+@dataclass(slots=True)
+class Link:
+    text: str
+    url: str
+
+@dataclass(slots=True)
+class Item:
+    """One listed entry: a highlighted repo, a tool or a discussion"""
+    title: str
+    text: str
+    link: Link
+    byline: Optional[str] = None
+    stars: Optional[int] = None
+    language: Optional[str] = None
+    source: Optional[str] = None
+
+@dataclass(slots=True)
+class FactList:
+    title: str
+    facts: List[Tuple[str, Any]]
+
+@dataclass(slots=True)
+class BulletList:
+    title: str
+    entries: List[str]
+
+@dataclass(slots=True)
+class Table:
+    title: str
+    columns: Tuple[str, ...]
+    rows: List[Tuple]
+
+@dataclass(slots=True)
+class Section:
+    key: str
+    title: str
+    subtitle: Optional[str] = None
+    empty: Optional[str] = None
+    items: List[Item] = field(default_factory=list)
+    facts: Optional[FactList] = None
+    table: Optional[Table] = None
+    bullets: Optional[BulletList] = None
+    outro: Optional[str] = None
+    notes: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.empty is not None
+
+@dataclass(slots=True)
+class Document:
+    sections: List[Section]
+    generation_timestamp: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+def _number(value) -> str:
+    return f"{value:,}" if isinstance(value, (int, float)) and not isinstance(value, bool) else str(value)
+
+class Emitter:
+    """Serialize a Document; each section is emitted independently
+
+    A section that fails to serialize (e.g. malformed upstream data) is
+    logged and left out, like a failing section generator always was.
+    """
+
+    separator = "\n\n"
+
+    def emit(self, document: Document) -> str:
+        parts = []
+        for section in document.sections:
+            try:
+                content = self.section(section)
+            except Exception as e:
+                logger.error(f"Error emitting {section.key}: {e}")
+                continue
+            if content:
+                parts.append(content)
+        return self.wrap(self.separator.join(parts), document)
+
+    def wrap(self, body: str, document: Document) -> str:
+        return body
+
+    def section(self, section: Section) -> str:
+        raise NotImplementedError
+
+class MarkdownEmitter(Emitter):
+    """The newsletter's original markdown layout, byte for byte"""
+
+    separator = "\n\n---\n\n"
+
+    def section(self, section: Section) -> str:
+        if section.key == "header":
+            return f"# {section.title}\n*{section.subtitle}*"
+        if section.is_empty:
+            return f"## {section.title}\n\n*{section.empty}*"
+        render = getattr(self, f"_{section.key}", None)
+        return render(section) if render else self._generic(section)
+
+    def item(self, key: str, item: Item) -> str:
+        """Markdown fragment for one item of an item section"""
+        if key == "highlights":
+            return f"""### 🚀 **{item.title} by {item.byline}**
+{item.text}... 
+
+⭐ **{item.stars:,} stars** | **Repository:** [{item.link.text}]({item.link.url})"""
+        if key == "tools":
+            return f"""### **{item.title}**
+{item.text}
+
+- **Language:** {item.language}
+- **Repository:** [{item.link.text}]({item.link.url})"""
+        if key == "discussions":
+            return f"""### **{item.title}**
+{item.text}...
+
+**Repository:** {item.source} | [{item.link.text}]({item.link.url})"""
+        return f"- [{item.title}]({item.link.url})"
+
+    def items_section(self, section: Section, fragments: List[str]) -> str:
+        return "\n\n".join([f"## {section.title}\n"] + fragments)
+
+    def _items(self, section: Section) -> str:
+        return self.items_section(section, [self.item(section.key, item) for item in section.items])
+
+    _highlights = _tools = _discussions = _items
+
+    def _stats(self, section: Section) -> str:
+        (stars_label, stars), (forks_label, forks), (languages_label, languages) = section.facts.facts
+        parts = [f"""## {section.title}
+
+### 🌟 **{section.facts.title}**
+- **{stars_label}:** {stars:,}
+- **{forks_label}:** {forks:,}
+- **{languages_label}:** {languages}"""]
+        if section.table is not None:
+            parts.append(f"### 📈 **{section.table.title}**")
+            parts.append(self._table(section.table))
+        return "\n\n".join(parts)
+
+    def _table(self, table: Table) -> str:
+        lines = [
+            "| " + " | ".join(table.columns) + " |",
+            "|" + "|".join("-" * (len(column) + 2) for column in table.columns) + "|"
+        ]
+        for name, *values in table.rows:
+            lines.append(f"| **{name}** | " + " | ".join(_number(value) for value in values) + " |")
+        return "\n".join(lines)
+
+    def _footer(self, section: Section) -> str:
+        bullets = "\n".join(f"- {entry}" for entry in section.bullets.entries)
+        notes = "\n".join(f"**{lead}** {rest}" for lead, rest in section.notes)
+        return f"""## {section.title}
+
+### **{section.bullets.title}**
+{bullets}
+
+---
+
+*{section.outro}*
+
+{notes}"""
+
+    def _generic(self, section: Section) -> str:
+        parts = [f"## {section.title}"]
+        parts.extend(f"- [{item.title}]({item.link.url})" for item in section.items)
+        return "\n\n".join(parts)
+
+class HTMLEmitter(Emitter):
+    """Self-contained HTML suitable for an email body"""
+
+    separator = "\n<hr>\n"
+
+    def wrap(self, body: str, document: Document) -> str:
+        title = next((s.title for s in document.sections if s.key == "header"), "Newsletter")
+        return (
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{html.escape(title)}</title>\n</head>\n<body>\n{body}\n</body>\n</html>\n"
+        )
+
+    def section(self, section: Section) -> str:
+        e = html.escape
+        if section.key == "header":
+            return f"<header>\n<h1>{e(section.title)}</h1>\n<p><em>{e(section.subtitle or '')}</em></p>\n</header>"
+
+        parts = [f"<section id=\"{e(section.key)}\">", f"<h2>{e(section.title)}</h2>"]
+        if section.is_empty:
+            parts.append(f"<p><em>{e(section.empty)}</em></p>")
+        for item in section.items:
+            parts.append(self._item(item))
+        if section.facts is not None:
+            parts.append(f"<h3>{e(section.facts.title)}</h3>")
+            parts.append("<ul>" + "".join(
+                f"<li><strong>{e(label)}:</strong> {e(_number(value))}</li>" for label, value in section.facts.facts
+            ) + "</ul>")
+        if section.table is not None:
+            parts.append(f"<h3>{e(section.table.title)}</h3>")
+            parts.append(self._table(section.table))
+        if section.bullets is not None:
+            parts.append(f"<h3>{e(section.bullets.title)}</h3>")
+            parts.append("<ul>" + "".join(f"<li>{e(entry)}</li>" for entry in section.bullets.entries) + "</ul>")
+        if section.outro:
+            parts.append(f"<p><em>{e(section.outro)}</em></p>")
+        for lead, rest in section.notes:
+            parts.append(f"<p><strong>{e(lead)}</strong> {e(rest)}</p>")
+        parts.append("</section>")
+        return "\n".join(parts)
+
+    def _item(self, item: Item) -> str:
+        e = html.escape
+        meta = []
+        if item.byline:
+            meta.append(f"by {e(item.byline)}")
+        if item.stars is not None:
+            meta.append(f"⭐ {e(_number(item.stars))} stars")
+        if item.language:
+            meta.append(e(item.language))
+        if item.source:
+            meta.append(f"Repository: {e(item.source)}")
+        return (
+            f"<article>\n<h3><a href=\"{e(item.link.url)}\">{e(item.title)}</a></h3>\n"
+            f"<p>{e(item.text)}</p>\n"
+            + (f"<p><small>{' | '.join(meta)}</small></p>\n" if meta else "")
+            + f"<p><a href=\"{e(item.link.url)}\">{e(item.link.text)}</a></p>\n</article>"
+        )
+
+    def _table(self, table: Table) -> str:
+        e = html.escape
+        head = "".join(f"<th>{e(column)}</th>" for column in table.columns)
+        rows = "".join(
+            "<tr>" + "".join(f"<td>{e(_number(value))}</td>" for value in row) + "</tr>"
+            for row in table.rows
+        )
+        return f"<table>\n<thead><tr>{head}</tr></thead>\n<tbody>{rows}</tbody>\n</table>"
+
+class PlainTextEmitter(Emitter):
+    """Markup-free text, e.g. for the text/plain part of an email"""
+
+    separator = "\n\n"
+
+    def section(self, section: Section) -> str:
+        if section.key == "header":
+            return f"{section.title}\n{section.subtitle or ''}"
+
+        lines = [section.title.upper()]
+        if section.is_empty:
+            lines.append(section.empty)
+        for item in section.items:
+            details = ", ".join(filter(None, [
+                f"by {item.byline}" if item.byline else None,
+                f"{_number(item.stars)} stars" if item.stars is not None else None,
+                item.language,
+                item.source
+            ]))
+            lines.append(f"- {item.title}" + (f" ({details})" if details else ""))
+            if item.text:
+                lines.append(f"  {item.text}")
+            lines.append(f"  {item.link.url}")
+        if section.facts is not None:
+            lines.extend(f"- {label}: {_number(value)}" for label, value in section.facts.facts)
+        if section.table is not None:
+            lines.append(" | ".join(section.table.columns))
+            lines.extend(" | ".join(_number(value) for value in row) for row in section.table.rows)
+        if section.bullets is not None:
+            lines.extend(f"- {entry}" for entry in section.bullets.entries)
+        if section.outro:
+            lines.append(section.outro)
+        lines.extend(f"{lead} {rest}" for lead, rest in section.notes)
+        return "\n".join(lines)
+
+class JSONEmitter(Emitter):
+    """JSON feed: the document model as-is"""
+
+    def emit(self, document: Document) -> str:
+        return json.dumps(document.to_dict(), ensure_ascii=False, default=str)
+
+EMITTERS: Dict[str, Emitter] = {
+    "markdown": MarkdownEmitter(),
+    "html": HTMLEmitter(),
+    "text": PlainTextEmitter(),
+    "json": JSONEmitter()
+}
+
+def emit(document: Document, format: str = "markdown") -> str:
+    try:
+        emitter = EMITTERS[format]
+    except KeyError:
+        raise ValueError(f"Unknown newsletter format: {format}") from None
+    return emitter.emit(document)
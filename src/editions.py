@@ -0,0 +1,146 @@
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from document import Document, Item, MarkdownEmitter, Section
+from metrics import REGISTRY
+from state_backend import StateBackend
+
+ITEM_SECTIONS = ("highlights", "tools", "discussions")
+
+EDITION_ITEMS = REGISTRY.counter(
+    "edition_items_total", "Newsletter items per edition by whether they were reused from the previous one", ["status"]
+)
+
+def item_hash(key: str, item: Item) -> str:
+    """Hash of an item's identity and content, leaving out its star count
+
+    Stars move between almost every pair of editions; a count change is an
+    update of the same item (see diff_edition), not a new one.
+    """
+    payload = json.dumps(
+        [key, item.title, item.text, item.link.text, item.link.url, item.byline, item.language, item.source],
+        ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+def _update_count(text: str, old: Optional[int], new: Optional[int]) -> Optional[str]:
+    """Carry a new star count into a fragment written for the old one
+
+    None when the old count can't be found (Claude wrote it some other way,
+    e.g. "1.2k"), so the item is re-enhanced rather than keep a stale number.
+    """
+    if old is None or new is None or old == new:
+        return text
+    for before, after in ((f"{old:,}", f"{new:,}"), (str(old), str(new))):
+        # Whole numbers only, so 400 doesn't match inside 4,000 or repo-4000
+        updated, count = re.subn(rf"(?<![\d,]){re.escape(before)}(?![\d,])", after, text)
+        if count:
+            return updated
+    return None
+
+@dataclass(slots=True)
+class EditionDiff:
+    """Items of the new document against the previous edition's fragments
+
+    `fragments` maps every current item hash to its markdown (reused or
+    freshly rendered) and `stars` to its current star count; `stale` lists
+    the hashes whose enhanced fragment has to be produced. `updated` counts
+    reused items whose star count changed.
+    """
+    fragments: Dict[str, str]
+    enhanced: Dict[str, str]
+    stars: Dict[str, Optional[int]] = field(default_factory=dict)
+    stale: List[str] = field(default_factory=list)
+    reused: int = 0
+    updated: int = 0
+    removed: int = 0
+
+class EditionStore:
+    """Persist the last edition's per-item fragments in the state backend
+
+    Stored as {hash: {"markdown": ..., "enhanced": ..., "stars": ...}} under
+    edition:<name>; each save replaces the previous edition, so items that
+    dropped out are forgotten.
+    """
+
+    def __init__(self, backend: StateBackend, name: str = "default"):
+        self.backend = backend
+        self.key = f"edition:{name}"
+
+    async def load(self) -> Dict[str, Dict]:
+        return await self.backend.get_json(self.key) or {}
+
+    async def save(self, diff: EditionDiff):
+        await self.backend.set_json(self.key, {
+            digest: {
+                "markdown": markdown,
+                "stars": diff.stars.get(digest),
+                **({"enhanced": diff.enhanced[digest]} if digest in diff.enhanced else {})
+            }
+            for digest, markdown in diff.fragments.items()
+        })
+
+def _items(document: Document):
+    for section in document.sections:
+        if section.key in ITEM_SECTIONS:
+            for item in section.items:
+                yield section, item
+
+def diff_edition(document: Document, previous: Dict[str, Dict], enhance: bool = True) -> EditionDiff:
+    """Reuse fragments of unchanged items; render only new or changed ones
+
+    An item whose only change is its star count keeps its enhanced
+    fragment with the count swapped in, and its markdown is re-rendered
+    locally; neither needs another Claude call.
+    """
+    emitter = MarkdownEmitter()
+    diff = EditionDiff({}, {})
+    for section, item in _items(document):
+        digest = item_hash(section.key, item)
+        if digest in diff.fragments:
+            continue
+        diff.stars[digest] = item.stars
+        stored = previous.get(digest)
+        if stored is not None:
+            old_stars = stored.get("stars")
+            if old_stars == item.stars:
+                diff.fragments[digest] = stored["markdown"]
+            else:
+                diff.fragments[digest] = emitter.item(section.key, item)
+                diff.updated += 1
+            enhanced = _update_count(stored["enhanced"], old_stars, item.stars) if "enhanced" in stored else None
+            if enhanced is not None:
+                diff.enhanced[digest] = enhanced
+            diff.reused += 1
+        else:
+            diff.fragments[digest] = emitter.item(section.key, item)
+        if enhance and digest not in diff.enhanced:
+            diff.stale.append(digest)
+    diff.removed = len(previous.keys() - diff.fragments.keys())
+    EDITION_ITEMS.labels("reused").inc(diff.reused - diff.updated)
+    EDITION_ITEMS.labels("updated").inc(diff.updated)
+    EDITION_ITEMS.labels("rendered").inc(len(diff.fragments) - diff.reused)
+    return diff
+
+class FragmentEmitter(MarkdownEmitter):
+    """Markdown emitter that takes item fragments from an edition diff"""
+
+    def __init__(self, fragments: Dict[str, str]):
+        self.fragments = fragments
+
+    def _items(self, section: Section) -> str:
+        return self.items_section(section, [
+            self.fragments.get(item_hash(section.key, item)) or self.item(section.key, item)
+            for item in section.items
+        ])
+
+    _highlights = _tools = _discussions = _items
+
+def assemble(document: Document, diff: EditionDiff, enhanced: bool = True) -> str:
+    """The edition's markdown: enhanced fragments where available, basic ones elsewhere"""
+    fragments = {**diff.fragments, **diff.enhanced} if enhanced else diff.fragments
+    return FragmentEmitter(fragments).emit(document)
@@ -1,24 +1,104 @@
 
 import httpx
 import asyncio
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+import hashlib
+import json
+import time
+from typing import AsyncIterator, Callable, List, Dict, Optional
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
 
+from cassette import Cassette
+from circuit_breaker import OPEN, CircuitBreakers
+from metrics import REGISTRY
+from models import Discussion, Repo, RepoStats
+from state_backend import StateBackend, create_backend
+from tracing import span, traced
+from watermarks import WatermarkStore, merge_window, needs_full_scan
+
 load_dotenv()
 
+GITHUB_LATENCY = REGISTRY.histogram(
+    "github_request_duration_seconds", "Latency of GitHub API calls", ["endpoint"]
+)
+GITHUB_REQUESTS = REGISTRY.counter(
+    "github_requests_total", "GitHub API calls by endpoint and status", ["endpoint", "status"]
+)
+GITHUB_RATE_LIMIT = REGISTRY.gauge(
+    "github_rate_limit_remaining", "Remaining GitHub API budget", ["resource"]
+)
+GITHUB_CACHE = REGISTRY.counter(
+    "github_cache_requests_total", "Shared response cache lookups", ["result"]
+)
+CACHE_HIT = GITHUB_CACHE.labels("hit")
+CACHE_MISS = GITHUB_CACHE.labels("miss")
+REGISTRY.gauge(
+    "github_cache_hit_ratio", "Share of GitHub lookups served from the shared cache",
+    function=lambda: CACHE_HIT.value / ((CACHE_HIT.value + CACHE_MISS.value) or 1)
+)
+
+def _endpoint_label(url: str) -> str:
+    """Collapse a GitHub URL to a low-cardinality endpoint name"""
+    path = url.split("://", 1)[-1].split("/", 1)[-1]
+    if path.startswith("search/"):
+        return path
+    return path.split("/", 1)[0]
+
+def _repo_sort_key(repo: Dict) -> int:
+    return repo.get("stargazers_count", 0) or 0
+
+def _issue_sort_key(issue: Dict) -> int:
+    return (issue.get("reactions") or {}).get("total_count", 0) or 0
+
 class GitHubAdapter:
-    def __init__(self):
+    def __init__(self, backend: Optional[StateBackend] = None, cassette: Optional[Cassette] = None):
+        # Shared across workers: response cache, rate-limit budget, locks, watermarks
+        self.backend = backend or create_backend()
+        # Record/replay GitHub traffic (HTTP_CASSETTE) instead of always calling out live
+        self.cassette = cassette or Cassette.from_env()
+        self.watermarks = WatermarkStore(self.backend)
+        # Per-endpoint breakers; their open state is shared through the backend
+        slow_call_seconds = float(os.getenv("GITHUB_BREAKER_SLOW_CALL", "10"))
+        self.breakers = CircuitBreakers(
+            self.backend,
+            failure_threshold=int(os.getenv("GITHUB_BREAKER_FAILURES", "5")),
+            slow_call_seconds=slow_call_seconds,
+            reset_timeout=float(os.getenv("GITHUB_BREAKER_RESET", "30"))
+        )
+        # Must exceed the slow-call threshold, or slow calls end as timeouts before they can count as slow
+        self.timeout = float(os.getenv("GITHUB_TIMEOUT", str(2 * slow_call_seconds)))
+        self.cache_ttl = float(os.getenv("GITHUB_CACHE_TTL", "300"))
+        # Incremental windows are re-scanned this often so stored counts stay fresh
+        self.counts_ttl = float(os.getenv("GITHUB_COUNTS_TTL", "3600"))
         self.token = os.getenv("GITHUB_TOKEN")
-        self.base_url = "https://api.github.com"
+        self.base_url = os.getenv("GITHUB_API_URL", "https://api.github.com")
+        # Pause between consecutive search calls (GitHub allows 30 searches/min)
+        self.request_interval = float(os.getenv("GITHUB_REQUEST_INTERVAL", "1"))
         self.headers = {
             "Authorization": f"token {self.token}",
             "Accept": "application/vnd.github.v3+json"
         }
     
-    async def get_trending_ai_repos(self, days: int = 7) -> List[Dict]:
-        """Fetch trending AI repositories from the last N days"""
+    def _client(self) -> httpx.AsyncClient:
+        if self.cassette is not None:
+            return httpx.AsyncClient(transport=self.cassette.async_transport(), timeout=self.timeout)
+        return httpx.AsyncClient(timeout=self.timeout)
+    
+    @traced()
+    async def get_trending_ai_repos(
+        self,
+        days: int = 7,
+        incremental: bool = False,
+        on_batch: Optional[Callable[[List[Dict]], None]] = None
+    ) -> List[Dict]:
+        """Fetch trending AI repositories from the last N days
+
+        With incremental=True only repos created since the last stored
+        watermark are requested and merged into the persisted window.
+        on_batch, if given, receives each search's items as soon as they
+        arrive so callers can rank while the remaining searches run.
+        """
         date_filter = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
         
         # Search for AI-related repos with recent activity
@@ -33,32 +113,59 @@ class GitHubAdapter:
         ]
         
         repos = []
-        async with httpx.AsyncClient() as client:
-            for term in query_terms[:3]:  # Limit API calls
+        async with self._client() as client:
+            for i, term in enumerate(query_terms[:3]):  # Limit API calls
                 url = f"{self.base_url}/search/repositories"
-                params = {
-                    "q": f'"{term}" created:>{date_filter} language:Python',
-                    "sort": "stars",
-                    "order": "desc",
-                    "per_page": 10
-                }
-                
-                response = await client.get(url, headers=self.headers, params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    repos.extend(data.get("items", [])[:5])
+                if i > 0:
+                    # Rate limiting
+                    await self._pace(url)
+
+                if incremental:
+                    items = await self._fetch_incremental(
+                        client, url,
+                        query=f'"{term}" language:Python',
+                        days=days,
+                        sort="stars",
+                        sort_key=_repo_sort_key,
+                        per_page=10
+                    )
+                    batch = items[:5]
+                else:
+                    params = {
+                        "q": f'"{term}" created:>{date_filter} language:Python',
+                        "sort": "stars",
+                        "order": "desc",
+                        "per_page": 10
+                    }
+                    
+                    data = await self._get_json(client, url, params)
+                    batch = data.get("items", [])[:5] if data is not None else []
                 
-                # Rate limiting
-                await asyncio.sleep(1)
+                repos.extend(batch)
+                if on_batch is not None and batch:
+                    on_batch(batch)
         
         return self._deduplicate_repos(repos)
     
-    async def get_ai_discussions(self, days: int = 7) -> List[Dict]:
+    @traced()
+    async def get_ai_discussions(self, days: int = 7, incremental: bool = False) -> List[Dict]:
         """Fetch interesting AI-related issues and discussions"""
         date_filter = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
         
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/search/issues"
+
+            if incremental:
+                items = await self._fetch_incremental(
+                    client, url,
+                    query="AI OR ML OR 'machine learning' type:issue",
+                    days=days,
+                    sort="reactions",
+                    sort_key=_issue_sort_key,
+                    per_page=20
+                )
+                return items[:20]
+
             params = {
                 "q": f"AI OR ML OR 'machine learning' created:>{date_filter} type:issue",
                 "sort": "reactions",
@@ -66,42 +173,298 @@ class GitHubAdapter:
                 "per_page": 20
             }
             
-            response = await client.get(url, headers=self.headers, params=params)
-            if response.status_code == 200:
-                return response.json().get("items", [])
+            data = await self._get_json(client, url, params)
+            if data is not None:
+                return data.get("items", [])
         
         return []
     
+    async def iter_trending_repos(self, days: int = 7, max_items: int = 1000) -> AsyncIterator[Dict]:
+        """Yield trending AI repos one at a time, paginating deep into each search
+
+        Pages are requested only as the consumer pulls items, so a slow reader
+        holds at most one page in memory. Repos already yielded by an earlier
+        search term are skipped.
+        """
+        date_filter = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        seen = set()
+        async with self._client() as client:
+            for term in ["artificial intelligence", "machine learning", "deep learning"]:
+                params = {
+                    "q": f'"{term}" created:>{date_filter} language:Python',
+                    "sort": "stars",
+                    "order": "desc"
+                }
+                async for repo in self._paginate(client, f"{self.base_url}/search/repositories", params, max_items):
+                    if repo.get("full_name") in seen:
+                        continue
+                    seen.add(repo.get("full_name"))
+                    yield repo
+                    if len(seen) >= max_items:
+                        return
+
+    async def iter_ai_discussions(self, days: int = 7, max_items: int = 1000) -> AsyncIterator[Dict]:
+        """Yield AI-related issues one at a time, paginating on demand"""
+        date_filter = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        params = {
+            "q": f"AI OR ML OR 'machine learning' created:>{date_filter} type:issue",
+            "sort": "reactions",
+            "order": "desc"
+        }
+        async with self._client() as client:
+            async for item in self._paginate(client, f"{self.base_url}/search/issues", params, max_items):
+                yield item
+
+    async def _paginate(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Dict,
+        max_items: int,
+        per_page: int = 100
+    ) -> AsyncIterator[Dict]:
+        """Walk search result pages lazily (GitHub serves at most 1000 results per query)"""
+        yielded = 0
+        for page in range(1, 1000 // per_page + 1):
+            if page > 1:
+                await self._pace(url)
+            data = await self._get_json(client, url, {**params, "per_page": per_page, "page": page})
+            if data is None:
+                return
+            items = data.get("items", [])
+            for item in items:
+                yield item
+                yielded += 1
+                if yielded >= max_items:
+                    return
+            if len(items) < per_page or page * per_page >= data.get("total_count", 0):
+                return
+
+    @traced()
     async def get_repo_stats(self, repo_full_name: str) -> Dict:
         """Get detailed stats for a specific repository"""
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             url = f"{self.base_url}/repos/{repo_full_name}"
-            response = await client.get(url, headers=self.headers)
+            data = await self._get_json(client, url)
             
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "name": data["name"],
-                    "full_name": data["full_name"],
-                    "stars": data["stargazers_count"],
-                    "forks": data["forks_count"],
-                    "language": data["language"],
-                    "description": data["description"],
-                    "url": data["html_url"],
-                    "created_at": data["created_at"],
-                    "updated_at": data["updated_at"]
-                }
+            if data is not None:
+                return RepoStats.from_github(data).to_dict()
         
         return {}
+
+    async def trending_repos(
+        self,
+        days: int = 7,
+        incremental: bool = False,
+        on_batch: Optional[Callable[[List[Repo]], None]] = None
+    ) -> List[Repo]:
+        """get_trending_ai_repos parsed into Repo records"""
+        if on_batch is None:
+            repos = await self.get_trending_ai_repos(days, incremental)
+        else:
+            repos = await self.get_trending_ai_repos(
+                days, incremental, on_batch=lambda batch: on_batch([Repo.from_github(r) for r in batch])
+            )
+        return [Repo.from_github(repo) for repo in repos]
+
+    async def discussions(self, days: int = 7, incremental: bool = False) -> List[Discussion]:
+        """get_ai_discussions parsed into Discussion records"""
+        return [Discussion.from_github(item) for item in await self.get_ai_discussions(days, incremental)]
+
+    async def repo_stats(self, repo_full_name: str) -> Optional[RepoStats]:
+        """get_repo_stats as a RepoStats record, None when the lookup failed"""
+        return RepoStats.coerce(await self.get_repo_stats(repo_full_name))
+    
+    async def _pace(self, url: str):
+        """Wait request_interval before the next search call, unless its open breaker will short-circuit it"""
+        if await self.breakers.get(_endpoint_label(url)).state() != OPEN:
+            await asyncio.sleep(self.request_interval)
+
+    async def _get_json(self, client: httpx.AsyncClient, url: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """GET a GitHub URL through the shared cache, rate-limit budget and single-flight lock
+
+        Returns the decoded body for 200 responses and None otherwise.
+        """
+        endpoint = _endpoint_label(url)
+        if self.cache_ttl <= 0:
+            return await self._fetch_json(client, url, params, endpoint)
+
+        key = hashlib.sha1(f"{url}?{json.dumps(params, sort_keys=True)}".encode()).hexdigest()
+
+        with span("github.cache_lookup", endpoint=endpoint):
+            cached = await self.backend.get_json(f"cache:{key}")
+        if cached is not None:
+            CACHE_HIT.inc()
+            return cached
+        CACHE_MISS.inc()
+
+        # Only one worker fetches a given URL; the others wait and read its result
+        async with self.backend.lock(f"fetch:{key}"):
+            cached = await self.backend.get_json(f"cache:{key}")
+            if cached is not None:
+                return cached
+
+            data = await self._fetch_json(client, url, params, endpoint)
+            if data is not None:
+                await self.backend.set_json(f"cache:{key}", data, self.cache_ttl)
+
+            return data
+
+    async def _fetch_json(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict],
+        endpoint: str
+    ) -> Optional[Dict]:
+        """Call GitHub if the shared budget and the endpoint's breaker allow it, recording metrics and rate limits
+
+        Transport errors, 5xx answers and calls slower than the breaker's
+        threshold count against the breaker; an open breaker returns None
+        at once instead of waiting on a degraded GitHub.
+        """
+        resource = "search" if "/search/" in url else "core"
+        if not await self._take_budget(resource):
+            GITHUB_REQUESTS.labels(endpoint, "budget_exhausted").inc()
+            return None
+
+        breaker = self.breakers.get(endpoint)
+        admitted = await breaker.acquire()
+        if admitted is None:
+            GITHUB_REQUESTS.labels(endpoint, "circuit_open").inc()
+            return None
+
+        started = time.perf_counter()
+        try:
+            with span("github.request", endpoint=endpoint):
+                response = await client.get(url, headers=self.headers, params=params)
+        except httpx.TransportError:
+            elapsed = time.perf_counter() - started
+            GITHUB_LATENCY.labels(endpoint).observe(elapsed)
+            GITHUB_REQUESTS.labels(endpoint, "transport_error").inc()
+            await breaker.record(admitted, False, elapsed)
+            return None
+        elapsed = time.perf_counter() - started
+        GITHUB_LATENCY.labels(endpoint).observe(elapsed)
+        GITHUB_REQUESTS.labels(endpoint, str(response.status_code)).inc()
+        await breaker.record(admitted, response.status_code < 500, elapsed)
+
+        await self._record_rate_limit(resource, response)
+
+        if response.status_code != 200:
+            return None
+
+        return response.json()
+
+    async def _take_budget(self, resource: str) -> bool:
+        """Spend one call from the shared GitHub budget; False once it is exhausted"""
+        key = f"ratelimit:{resource}"
+        if await self.backend.get(key) is None:
+            return True  # Budget unknown until GitHub tells us
+
+        if await self.backend.incr(key, -1) >= 0:
+            return True
+
+        # The budget key may have expired between get and incr; without the
+        # reset marker the negative counter is stale and must not block forever
+        if await self.backend.get(f"{key}:reset") is None:
+            await self.backend.delete(key)
+            return True
+
+        return False
+
+    async def _record_rate_limit(self, resource: str, response: httpx.Response):
+        """Publish GitHub's remaining budget so every worker sees it"""
+        try:
+            remaining = int(response.headers.get("X-RateLimit-Remaining"))
+            reset = int(response.headers.get("X-RateLimit-Reset"))
+        except (TypeError, ValueError):
+            return
+
+        GITHUB_RATE_LIMIT.labels(resource).set(remaining)
+        ttl = max(reset - time.time(), 1)
+        await self.backend.set(f"ratelimit:{resource}", str(remaining), ttl)
+        await self.backend.set(f"ratelimit:{resource}:reset", str(reset), ttl)
+
+    async def _fetch_incremental(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        query: str,
+        days: int,
+        sort: str,
+        sort_key: Callable[[Dict], int],
+        per_page: int
+    ) -> List[Dict]:
+        """Fetch only items created since the last run and merge them into the stored window
+
+        The watermark is the start time of the previous query, so a top-up
+        asks for everything created since then, newest first, and pages
+        until the results run out. Every `counts_ttl` seconds the window is
+        re-scanned by `sort` instead, which refreshes the star/reaction
+        counts the ranking depends on.
+        """
+        # One stored window per size: a wider window can't be topped up from a narrower one
+        key = f"{url}?q={query}&sort={sort}&days={days}"
+        state = await self.watermarks.get(key)
+        now = datetime.now(timezone.utc)
+        now_str = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+        window_start = now - timedelta(days=days)
+
+        if needs_full_scan(state, window_start, timedelta(seconds=self.counts_ttl)):
+            # The top page by current counts replaces the stored window
+            stored = []
+            data = await self._get_json(client, url, {
+                "q": f"{query} created:>{window_start.strftime('%Y-%m-%d')}",
+                "sort": sort,
+                "order": "desc",
+                "per_page": per_page
+            })
+            fresh = data.get("items", []) if data is not None else None
+            scanned_at = now_str
+        else:
+            stored = state.get("items", [])
+            # >= so items created in the watermark second are not lost; merge dedupes
+            fresh = await self._fetch_created_since(client, url, f"{query} created:>={state['watermark']}")
+            scanned_at = state["scanned_at"]
+
+        if fresh is None:
+            # Serve what we already have and keep the watermark for the next try
+            return merge_window(stored, [], window_start, sort_key)
+
+        items = merge_window(stored, fresh, window_start, sort_key)
+        await self.watermarks.put(key, {
+            "watermark": now_str,
+            "scanned_at": scanned_at,
+            "items": items
+        })
+
+        return items
+
+    async def _fetch_created_since(self, client: httpx.AsyncClient, url: str, q: str) -> Optional[List[Dict]]:
+        """Every item a created-since query matches, or None if a page failed"""
+        params = {"q": q, "sort": "created", "order": "desc", "per_page": 100}
+        items = []
+        for page in range(1, 1000 // params["per_page"] + 1):
+            if page > 1:
+                await self._pace(url)
+            data = await self._get_json(client, url, {**params, "page": page})
+            if data is None:
+                return None
+            batch = data.get("items", [])
+            items.extend(batch)
+            if len(batch) < params["per_page"] or len(items) >= data.get("total_count", 0):
+                return items
+        return items
     
     def _deduplicate_repos(self, repos: List[Dict]) -> List[Dict]:
         """Remove duplicate repositories based on full_name"""
         seen = set()
         unique_repos = []
-        
+
         for repo in repos:
             if repo["full_name"] not in seen:
                 seen.add(repo["full_name"])
                 unique_repos.append(repo)
-        
+
         return unique_repos[:15]  # Limit to top 15
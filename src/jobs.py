@@ -0,0 +1,174 @@
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+JOBS = REGISTRY.counter(
+    "progress_jobs_total", "Server-side newsletter jobs by final status", ["status"]
+)
+
+TERMINAL_EVENTS = ("result", "error")
+
+def sse_format(event: Optional[Dict]) -> str:
+    """One SSE frame for a job event; a comment line for a heartbeat (None)"""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+
+async def parse_sse(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """(event, data) pairs from the lines of an SSE stream; comments are skipped"""
+    event, data = "message", []
+    async for line in lines:
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+    if data:
+        yield event, json.loads("\n".join(data))
+
+class ProgressJob:
+    """A running job and the ordered log of events it has published
+
+    Events are kept for the job's lifetime, so subscribers can join late or
+    reconnect with the last id they saw (SSE Last-Event-ID) and miss
+    nothing. The log ends with exactly one result or error event.
+    publish() is synchronous so callbacks can emit in order without
+    scheduling tasks; it must run on the job's event loop.
+    """
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def publish(self, event: str, data: Any):
+        self.events.append({"id": len(self.events) + 1, "event": event, "data": data})
+        self._wake()
+
+    def _wake(self):
+        # Waiters hold the old event; the next wait gets a fresh one
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def subscribe(self, after: int = 0, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict]]:
+        """Events with id > after as they are published, until the terminal one
+
+        With a heartbeat interval, None is yielded whenever that long passes
+        without an event, so the caller can keep an idle connection alive.
+        """
+        position = after
+        while True:
+            if position >= len(self.events):
+                if self.done:
+                    return
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                continue
+            event = self.events[position]
+            position += 1
+            yield event
+            if event["event"] in TERMINAL_EVENTS:
+                return
+
+    def _finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+        JOBS.labels(status).inc()
+        self._wake()
+
+    def snapshot(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "events": len(self.events),
+            "result": self.result,
+            "error": self.error
+        }
+
+class JobManager:
+    """Run jobs in the background of this process and keep them for a while
+
+    Jobs live in this worker's memory (their events are a live stream, not
+    state worth a backend round trip per token), so with several workers a
+    subscriber has to reach the worker that accepted the job. Finished jobs
+    are dropped `ttl` seconds after they end.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_running: int = 8):
+        self.ttl = ttl
+        self.max_running = max_running
+        self.jobs: Dict[str, ProgressJob] = {}
+
+    def running(self) -> int:
+        return sum(not job.done for job in self.jobs.values())
+
+    def submit(self, kind: str, work: Callable[[ProgressJob], Awaitable[Any]]) -> ProgressJob:
+        """Start work(job) in the background; its return value is the job's result"""
+        self._prune()
+        if self.running() >= self.max_running:
+            raise RuntimeError(f"Too many running jobs (limit {self.max_running})")
+        job = ProgressJob(kind)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, work))
+        return job
+
+    async def _run(self, job: ProgressJob, work: Callable[[ProgressJob], Awaitable[Any]]):
+        job.status = "running"
+        try:
+            job.result = await work(job)
+        except asyncio.CancelledError:
+            job.error = "cancelled"
+            job.publish("error", {"message": "cancelled"})
+            job._finish("cancelled")
+            return
+        except Exception as e:
+            job.error = str(e)
+            job.publish("error", {"message": str(e)})
+            job._finish("failed")
+            return
+        job.publish("result", job.result)
+        job._finish("done")
+
+    def get(self, job_id: str) -> Optional[ProgressJob]:
+        self._prune()
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.done or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self.jobs.values() if j.done and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def close(self):
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.done]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,262 @@
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from utils import setup_logging
+
+logger = setup_logging()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRIC_LINE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Parse unlabelled samples (and label sets verbatim) from a /metrics page"""
+    samples = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            samples[name + (labels or "")] = float(value)
+    return samples
+
+class LoadGenerator:
+    """Drive /generate-newsletter-data at stepped load levels and find saturation"""
+
+    def __init__(
+        self,
+        server_url: str,
+        days_mix: List[int],
+        max_repos_mix: List[int],
+        slo_p95_ms: float,
+        max_error_rate: float,
+        timeout: float,
+        seed: int = 7
+    ):
+        self.server_url = server_url
+        self.days_mix = days_mix
+        self.max_repos_mix = max_repos_mix
+        self.slo_p95_ms = slo_p95_ms
+        self.max_error_rate = max_error_rate
+        self.rng = random.Random(seed)
+        self.client = httpx.AsyncClient(
+            base_url=server_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=200)
+        )
+
+    async def _one_request(self, latencies: List[float], errors: List[str]):
+        payload = {"days": self.rng.choice(self.days_mix), "max_repos": self.rng.choice(self.max_repos_mix)}
+        started = time.perf_counter()
+        try:
+            response = await self.client.post("/generate-newsletter-data", json=payload)
+            if response.status_code != 200:
+                errors.append(str(response.status_code))
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+    async def _measure_loop_lag(self, samples: List[float], stop: asyncio.Event, interval: float = 0.05):
+        """Our own loop lag; if it grows, the generator (not the server) is the bottleneck"""
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            samples.append(max(loop.time() - expected, 0.0))
+
+    async def scrape_metrics(self) -> Dict[str, float]:
+        try:
+            response = await self.client.get("/metrics")
+            return parse_metrics(response.text) if response.status_code == 200 else {}
+        except httpx.HTTPError:
+            return {}
+
+    async def run_step(self, mode: str, level: int, duration: float) -> Dict:
+        """Run one load level: open-loop at `level` RPS or closed-loop with `level` workers"""
+        latencies: List[float] = []
+        errors: List[str] = []
+        lag_samples: List[float] = []
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(self._measure_loop_lag(lag_samples, stop))
+        before = await self.scrape_metrics()
+
+        started = time.perf_counter()
+        deadline = started + duration
+        if mode == "rps":
+            # Open loop: arrivals follow the schedule whether or not responses came back
+            in_flight = set()
+            for n in range(int(level * duration)):
+                delay = started + n / level - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(self._one_request(latencies, errors))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            if in_flight:
+                await asyncio.wait(in_flight)
+        else:
+            async def worker():
+                while time.perf_counter() < deadline:
+                    await self._one_request(latencies, errors)
+
+            await asyncio.gather(*(worker() for _ in range(level)))
+
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+        after = await self.scrape_metrics()
+
+        ordered = sorted(latencies)
+        sent = len(latencies)
+        lag = sorted(lag_samples)
+        memory_key = "process_resident_memory_bytes"
+        return {
+            "mode": mode,
+            "level": level,
+            "requests": sent,
+            "throughput_per_s": round(sent / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(len(errors) / sent, 4) if sent else 0.0,
+            "errors": {code: errors.count(code) for code in set(errors)},
+            "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+            "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+            "generator_loop_lag_p99_ms": round(percentile(lag, 99) * 1000, 2),
+            "server_loop_lag": {k: v for k, v in after.items() if k.startswith("event_loop_lag")},
+            "server_memory_bytes": after.get(memory_key),
+            "server_memory_growth_bytes": (
+                after[memory_key] - before[memory_key] if memory_key in after and memory_key in before else None
+            )
+        }
+
+    def is_saturated(self, step: Dict) -> bool:
+        # Past saturation open-loop arrivals queue up, which shows as p95 growth
+        return step["error_rate"] > self.max_error_rate or step["p95_ms"] > self.slo_p95_ms
+
+    async def ramp(self, mode: str, levels: List[int], step_duration: float) -> Dict:
+        start_metrics = await self.scrape_metrics()
+        steps = []
+        saturation = None
+        for level in levels:
+            step = await self.run_step(mode, level, step_duration)
+            steps.append(step)
+            logger.info(
+                f"{mode}={level}: {step['throughput_per_s']}/s p95={step['p95_ms']}ms errors={step['error_rate']:.1%}"
+            )
+            if self.is_saturated(step):
+                saturation = {"level": level, "last_healthy_level": steps[-2]["level"] if len(steps) > 1 else None}
+                break
+
+        await self.client.aclose()
+        memory_key = "process_resident_memory_bytes"
+        end_memory = steps[-1]["server_memory_bytes"] if steps else None
+        return {
+            "server_url": self.server_url,
+            "mode": mode,
+            "slo_p95_ms": self.slo_p95_ms,
+            "max_error_rate": self.max_error_rate,
+            "saturation": saturation,
+            "total_memory_growth_bytes": (
+                end_memory - start_metrics[memory_key] if end_memory and memory_key in start_metrics else None
+            ),
+            "steps": steps
+        }
+
+def _free_port() -> int:
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _spawn(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    # Children log to stdout; keep it free for the JSON report
+    return subprocess.Popen(
+        [sys.executable] + args, env={**os.environ, **env}, cwd=ROOT, stdout=subprocess.DEVNULL
+    )
+
+def _wait_for(url: str, timeout: float = 20.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="client.py loadtest", description="Load-test the MCP server")
+    parser.add_argument("--server-url", type=str, default=os.getenv("MCP_SERVER_URL", "http://localhost:8000"))
+    parser.add_argument("--mode", choices=["rps", "concurrency"], default="rps")
+    parser.add_argument("--levels", type=str, default="1,2,4,8,16,32",
+                        help="Comma-separated RPS or concurrency levels to step through")
+    parser.add_argument("--step-duration", type=float, default=15.0, help="Seconds per level")
+    parser.add_argument("--days-mix", type=str, default="1,7,30")
+    parser.add_argument("--max-repos-mix", type=str, default="5,10,15")
+    parser.add_argument("--slo-p95-ms", type=float, default=2000.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--with-simulator", action="store_true",
+                        help="Start a GitHub simulator and a server pointed at it, then test that server")
+    parser.add_argument("--simulator-latency-ms", type=float, default=50.0)
+    parser.add_argument("--output", type=str, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    processes = []
+    server_url = args.server_url
+    if args.with_simulator:
+        sim_port, server_port = _free_port(), _free_port()
+        processes.append(_spawn(
+            ["benchmarks/github_simulator.py", "--port", str(sim_port),
+             "--latency-ms", str(args.simulator_latency_ms), "--rate-limit", str(10**9)],
+            {}
+        ))
+        processes.append(_spawn(["src/server.py"], {
+            "PORT": str(server_port),
+            "GITHUB_API_URL": f"http://127.0.0.1:{sim_port}",
+            "GITHUB_REQUEST_INTERVAL": "0",
+            "STATE_BACKEND_URL": "memory://"
+        }))
+        server_url = f"http://127.0.0.1:{server_port}"
+        _wait_for(f"http://127.0.0.1:{sim_port}/docs")
+        _wait_for(f"{server_url}/health")
+
+    try:
+        generator = LoadGenerator(
+            server_url,
+            days_mix=[int(d) for d in args.days_mix.split(",")],
+            max_repos_mix=[int(m) for m in args.max_repos_mix.split(",")],
+            slo_p95_ms=args.slo_p95_ms,
+            max_error_rate=args.max_error_rate,
+            timeout=args.timeout
+        )
+        report = await generator.ramp(args.mode, [int(l) for l in args.levels.split(",")], args.step_duration)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
@@ -0,0 +1,129 @@
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger("ai_newsletter")
+
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "Delay between when the loop should wake a timer and when it did",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+LOOP_LAG_QUANTILES = REGISTRY.gauge(
+    "event_loop_lag_quantile_seconds", "Event-loop lag percentiles over the recent window", ["quantile"]
+)
+BLOCKED_CALLBACKS = REGISTRY.counter(
+    "event_loop_blocked_total", "Callbacks that blocked the event loop longer than the threshold"
+)
+
+class LoopWatchdog:
+    """Measures event-loop lag and captures the stack of callbacks that block it
+
+    A heartbeat coroutine records how late each timer fires. A monitor thread
+    watches the heartbeat; when it stalls past `threshold` seconds it grabs the
+    loop thread's current Python stack (the code doing the blocking) and the
+    running task. It is opt-in: reports carry stack traces, so only turn it
+    on where they may be read.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, window: int = 1200, max_reports: int = 20):
+        self.threshold = threshold
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.reports: Deque[Dict] = deque(maxlen=max_reports)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> Optional["LoopWatchdog"]:
+        """Build from LOOP_WATCHDOG_THRESHOLD_MS when LOOP_WATCHDOG=1, else None"""
+        if os.getenv("LOOP_WATCHDOG", "0") != "1":
+            return None
+        return cls(threshold=float(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", "100")) / 1000)
+
+    def start(self):
+        """Start watching the running loop (call from inside it)"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = self._loop.create_task(self._beat())
+        self._monitor = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._monitor.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+        if self._monitor is not None:
+            self._monitor.join()
+
+    async def _beat(self):
+        loop = asyncio.get_running_loop()
+        beats = 0
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self._last_beat = time.monotonic()
+
+            LOOP_LAG.observe(lag)
+            self.samples.append(lag)
+            beats += 1
+            if beats % 20 == 0:  # refresh percentile gauges about once a second
+                self._publish_quantiles()
+
+    def _publish_quantiles(self):
+        ordered = sorted(self.samples)
+        for quantile in ("0.5", "0.9", "0.99"):
+            index = min(int(float(quantile) * len(ordered)), len(ordered) - 1)
+            LOOP_LAG_QUANTILES.labels(quantile).set(ordered[index])
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval / 2):
+            stalled_for = time.monotonic() - self._last_beat - self.interval
+            # One report per stall: wait for a new heartbeat before reporting again
+            if stalled_for > self.threshold and reported_beat != self._last_beat:
+                reported_beat = self._last_beat
+                self._report(stalled_for)
+
+    def _current_task_name(self) -> Optional[str]:
+        # Peek at the loop's task from this thread; good enough for a diagnostic label
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return None
+        coro = task.get_coro()
+        return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+    def _report(self, stalled_for: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack: List[str] = traceback.format_stack(frame) if frame is not None else []
+        report = {
+            "blocked_for_ms": round(stalled_for * 1000, 1),
+            "task": self._current_task_name(),
+            "stack": stack,
+            "timestamp": time.time()
+        }
+        self.reports.append(report)
+        BLOCKED_CALLBACKS.inc()
+        logger.warning(
+            f"Event loop blocked for {report['blocked_for_ms']}ms in task {report['task']}:\n"
+            + "".join(stack[-8:])
+        )
@@ -0,0 +1,402 @@
+
+import asyncio
+import itertools
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import httpx
+
+from metrics import REGISTRY
+from utils import setup_logging
+
+logger = setup_logging()
+
+# Newest first; initialize answers with the client's version when we support it
+PROTOCOL_VERSIONS = ("2025-03-26", "2024-11-05")
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+JSON_TYPES = {
+    "integer": int,
+    "number": (int, float),
+    "string": str,
+    "boolean": bool,
+    "object": dict,
+    "array": list
+}
+
+MCP_REQUESTS = REGISTRY.counter(
+    "mcp_requests_total", "MCP JSON-RPC messages by method and outcome", ["method", "outcome"]
+)
+MCP_TOOL_LATENCY = REGISTRY.histogram(
+    "mcp_tool_duration_seconds", "Latency of MCP tool calls", ["tool", "outcome"]
+)
+
+Message = Dict[str, Any]
+Notify = Callable[[Message], Awaitable[None]]
+Progress = Callable[..., Awaitable[None]]
+
+class RPCError(Exception):
+    """A JSON-RPC error, sent back as the response's error member"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self) -> Dict:
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+class SessionExpired(Exception):
+    """The server no longer knows the Mcp-Session-Id a request was sent with"""
+
+def error_response(id: Any, code: int, message: str) -> Message:
+    return {"jsonrpc": "2.0", "id": id, "error": {"code": code, "message": message}}
+
+def sse_event(message: Union[Message, List[Message]]) -> str:
+    return f"event: message\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+def progress_token(message: Any) -> Any:
+    if isinstance(message, dict) and isinstance(message.get("params"), dict):
+        return (message["params"].get("_meta") or {}).get("progressToken")
+    return None
+
+@dataclass(slots=True)
+class Tool:
+    name: str
+    description: str
+    input_schema: Dict
+    handler: Callable[..., Awaitable[Any]]
+
+    def describe(self) -> Dict:
+        return {"name": self.name, "description": self.description, "inputSchema": self.input_schema}
+
+def _check_arguments(schema: Dict, arguments: Dict):
+    """Required arguments present, none unknown, and of the declared JSON type"""
+    properties = schema.get("properties", {})
+    missing = [name for name in schema.get("required", []) if name not in arguments]
+    if missing:
+        raise RPCError(INVALID_PARAMS, f"Missing argument(s): {', '.join(missing)}")
+    for name, value in arguments.items():
+        if name not in properties:
+            raise RPCError(INVALID_PARAMS, f"Unknown argument: {name}")
+        expected = JSON_TYPES.get(properties[name].get("type"))
+        # bool is an int in Python but not in JSON
+        if expected is not None and value is not None and (
+            not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool)
+        ):
+            raise RPCError(INVALID_PARAMS, f"Argument {name} must be {properties[name]['type']}")
+        if "enum" in properties[name] and value not in properties[name]["enum"]:
+            raise RPCError(INVALID_PARAMS, f"Argument {name} must be one of {', '.join(map(str, properties[name]['enum']))}")
+
+class MCPServer:
+    """Transport-independent MCP JSON-RPC dispatcher
+
+    Handles initialize, ping, tools/list and tools/call plus notifications,
+    for single messages and batches (whose members run concurrently and
+    answer in order). Tool handlers are coroutines taking a `progress`
+    callable and the call's arguments as keywords; when the caller sent a
+    progressToken, progress(done, total, message) emits a
+    notifications/progress through the transport's `notify`, otherwise it
+    does nothing. A tool that raises answers with isError rather than a
+    JSON-RPC error, as MCP expects.
+    """
+
+    def __init__(self, name: str, version: str):
+        self.name = name
+        self.version = version
+        self.tools: Dict[str, Tool] = {}
+
+    def tool(self, name: str, description: str, properties: Optional[Dict] = None, required: Iterable[str] = ()):
+        """Register the decorated coroutine as a tool"""
+        schema = {"type": "object", "properties": properties or {}, "required": list(required)}
+
+        def decorator(handler):
+            self.tools[name] = Tool(name, description, schema, handler)
+            return handler
+        return decorator
+
+    async def handle(self, payload: Any, notify: Optional[Notify] = None) -> Optional[Union[Message, List[Message]]]:
+        """Response(s) for a message or batch; None when there is nothing to answer"""
+        if isinstance(payload, list):
+            if not payload:
+                return error_response(None, INVALID_REQUEST, "Empty batch")
+            responses = await asyncio.gather(*(self._handle_one(message, notify) for message in payload))
+            return [response for response in responses if response is not None] or None
+        return await self._handle_one(payload, notify)
+
+    async def _handle_one(self, message: Any, notify: Optional[Notify]) -> Optional[Message]:
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or not isinstance(message.get("method"), str):
+            MCP_REQUESTS.labels("invalid", "error").inc()
+            return error_response(message.get("id") if isinstance(message, dict) else None, INVALID_REQUEST, "Invalid Request")
+
+        method = message["method"]
+        if "id" not in message:
+            # Notifications (initialized, cancelled, ...) need no answer
+            MCP_REQUESTS.labels("notification", "ok").inc()
+            return None
+
+        handlers = {
+            "initialize": self._initialize,
+            "ping": self._ping,
+            "tools/list": self._list_tools,
+            "tools/call": self._call_tool
+        }
+        id = message["id"]
+        params = message.get("params") or {}
+        try:
+            if method not in handlers:
+                raise RPCError(METHOD_NOT_FOUND, f"Method not found: {method}")
+            if not isinstance(params, dict):
+                raise RPCError(INVALID_PARAMS, "params must be an object")
+            result = await handlers[method](params, notify)
+        except RPCError as e:
+            MCP_REQUESTS.labels(method if method in handlers else "unknown", "error").inc()
+            return {"jsonrpc": "2.0", "id": id, "error": e.to_dict()}
+        except Exception as e:
+            logger.error(f"MCP {method} failed: {e}")
+            MCP_REQUESTS.labels(method, "error").inc()
+            return error_response(id, INTERNAL_ERROR, str(e))
+        MCP_REQUESTS.labels(method, "ok").inc()
+        return {"jsonrpc": "2.0", "id": id, "result": result}
+
+    async def _initialize(self, params: Dict, notify: Optional[Notify]) -> Dict:
+        requested = params.get("protocolVersion")
+        return {
+            "protocolVersion": requested if requested in PROTOCOL_VERSIONS else PROTOCOL_VERSIONS[0],
+            "capabilities": {"tools": {"listChanged": False}},
+            "serverInfo": {"name": self.name, "version": self.version}
+        }
+
+    async def _ping(self, params: Dict, notify: Optional[Notify]) -> Dict:
+        return {}
+
+    async def _list_tools(self, params: Dict, notify: Optional[Notify]) -> Dict:
+        return {"tools": [tool.describe() for tool in self.tools.values()]}
+
+    async def _call_tool(self, params: Dict, notify: Optional[Notify]) -> Dict:
+        tool = self.tools.get(params.get("name"))
+        if tool is None:
+            raise RPCError(INVALID_PARAMS, f"Unknown tool: {params.get('name')}")
+        arguments = params.get("arguments") or {}
+        if not isinstance(arguments, dict):
+            raise RPCError(INVALID_PARAMS, "arguments must be an object")
+        _check_arguments(tool.input_schema, arguments)
+
+        token = (params.get("_meta") or {}).get("progressToken")
+
+        async def progress(done: float, total: Optional[float] = None, message: Optional[str] = None):
+            if token is None or notify is None:
+                return
+            update = {"progressToken": token, "progress": done}
+            if total is not None:
+                update["total"] = total
+            if message is not None:
+                update["message"] = message
+            await notify({"jsonrpc": "2.0", "method": "notifications/progress", "params": update})
+
+        started = time.perf_counter()
+        try:
+            result = await tool.handler(progress, **arguments)
+        except Exception as e:
+            MCP_TOOL_LATENCY.labels(tool.name, "error").observe(time.perf_counter() - started)
+            logger.warning(f"MCP tool {tool.name} failed: {e}")
+            return {"content": [{"type": "text", "text": str(e)}], "isError": True}
+        MCP_TOOL_LATENCY.labels(tool.name, "success").observe(time.perf_counter() - started)
+
+        if isinstance(result, str):
+            return {"content": [{"type": "text", "text": result}], "isError": False}
+        structured = result if isinstance(result, dict) else {"items": result}
+        return {
+            "content": [{"type": "text", "text": json.dumps(result, separators=(",", ":"), default=str)}],
+            "structuredContent": structured,
+            "isError": False
+        }
+
+async def serve_stream(server: MCPServer, reader: asyncio.StreamReader, write: Callable[[bytes], Awaitable[None]]):
+    """Serve newline-delimited JSON-RPC until the reader hits EOF
+
+    Each incoming line is handled as its own task, so a slow tool call
+    doesn't hold up the pings and calls behind it; outgoing lines
+    (responses and progress notifications) are written one at a time.
+    """
+    lock = asyncio.Lock()
+    tasks = set()
+
+    async def send(message):
+        data = json.dumps(message, separators=(",", ":"), default=str).encode() + b"\n"
+        async with lock:
+            await write(data)
+
+    async def process(line: bytes):
+        try:
+            payload = json.loads(line)
+        except ValueError:
+            await send(error_response(None, PARSE_ERROR, "Parse error"))
+            return
+        response = await server.handle(payload, send)
+        if response is not None:
+            await send(response)
+
+    while line := await reader.readline():
+        if not line.strip():
+            continue
+        task = asyncio.create_task(process(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+
+async def serve_stdio(server: MCPServer):
+    """Serve MCP over this process's stdin/stdout; logs go to stderr"""
+    for handler in logger.handlers:
+        if getattr(handler, "stream", None) is sys.stdout:
+            handler.setStream(sys.stderr)
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    async def write(data: bytes):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+
+    await serve_stream(server, reader, write)
+
+class MCPHttpSession:
+    """Client side of the streamable HTTP transport
+
+    One keep-alive connection pool and one MCP session (initialize runs on
+    first use) are reused across calls, and call_tools sends several tool
+    calls as a single JSON-RPC batch. A failed handshake is retried by the
+    next call, and a session the server expired (MCP_SESSION_TTL) or
+    forgot is re-initialized and the request sent again once.
+    """
+
+    def __init__(self, url: str, http_client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.http = http_client or httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=None))
+        self.session_id: Optional[str] = None
+        self._ids = itertools.count(1)
+        self._initializing: Optional[asyncio.Task] = None
+
+    async def _post(self, payload: Any, on_progress: Optional[Callable[[Dict], None]] = None) -> Any:
+        headers = {"Accept": "application/json, text/event-stream"}
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+        async with self.http.stream("POST", self.url, json=payload, headers=headers) as response:
+            if response.status_code == 202:
+                return None
+            if response.status_code != 200:
+                await response.aread()
+                if response.status_code == 404 and "Mcp-Session-Id" in headers:
+                    raise SessionExpired(response.text)
+                raise Exception(f"MCP server error: {response.status_code} - {response.text}")
+            self.session_id = response.headers.get("Mcp-Session-Id", self.session_id)
+
+            if not response.headers.get("content-type", "").startswith("text/event-stream"):
+                return json.loads(await response.aread())
+
+            result = None
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                message = json.loads(line[5:])
+                if isinstance(message, dict) and message.get("method") == "notifications/progress":
+                    if on_progress is not None:
+                        on_progress(message["params"])
+                else:
+                    result = message
+            return result
+
+    async def initialize(self):
+        if self._initializing is None:
+            self._initializing = asyncio.create_task(self._initialize())
+        initializing = self._initializing
+        try:
+            await initializing
+        except Exception:
+            self._reset(initializing)
+            raise
+
+    def _reset(self, initializing: Optional[asyncio.Task]):
+        """Forget the session, unless a concurrent call already opened a new one"""
+        if self._initializing is initializing:
+            self._initializing = None
+            self.session_id = None
+
+    async def _request(self, payload: Any, on_progress: Optional[Callable[[Dict], None]] = None) -> Any:
+        await self.initialize()
+        initializing = self._initializing
+        try:
+            return await self._post(payload, on_progress)
+        except SessionExpired:
+            # The server rejected the request before running it, so resending is safe
+            logger.info("MCP session expired; re-initializing")
+            self._reset(initializing)
+            await self.initialize()
+            return await self._post(payload, on_progress)
+
+    async def _initialize(self):
+        response = await self._post({
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": "initialize",
+            "params": {
+                "protocolVersion": PROTOCOL_VERSIONS[0],
+                "capabilities": {},
+                "clientInfo": {"name": "ai-newsletter-client", "version": "1.0.0"}
+            }
+        })
+        if "error" in response:
+            raise RPCError(**response["error"])
+        await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _call(self, name: str, arguments: Dict, progress: bool) -> Message:
+        id = next(self._ids)
+        params = {"name": name, "arguments": arguments}
+        if progress:
+            params["_meta"] = {"progressToken": id}
+        return {"jsonrpc": "2.0", "id": id, "method": "tools/call", "params": params}
+
+    @staticmethod
+    def _result(name: str, response: Message) -> Any:
+        if "error" in response:
+            raise RPCError(**response["error"])
+        result = response["result"]
+        text = result["content"][0]["text"] if result.get("content") else ""
+        if result.get("isError"):
+            raise Exception(f"MCP tool {name} failed: {text}")
+        # The text of a structured result is its JSON, lists included
+        return json.loads(text) if "structuredContent" in result else text
+
+    async def call_tool(self, name: str, arguments: Optional[Dict] = None, on_progress: Optional[Callable[[Dict], None]] = None) -> Any:
+        """A tool's result: its structured content, or its text"""
+        response = await self._request(self._call(name, arguments or {}, on_progress is not None), on_progress)
+        return self._result(name, response)
+
+    async def call_tools(self, calls: List[Tuple[str, Dict]]) -> List[Any]:
+        """Several tool calls in one batch round trip; results in call order"""
+        batch = [self._call(name, arguments, False) for name, arguments in calls]
+        responses = {response.get("id"): response for response in await self._request(batch)}
+        return [self._result(name, responses[message["id"]]) for (name, _), message in zip(calls, batch)]
+
+    async def close(self):
+        """End the server-side session and release the connection pool"""
+        try:
+            if self.session_id:
+                await self.http.delete(self.url, headers={"Mcp-Session-Id": self.session_id})
+        finally:
+            await self.http.aclose()
@@ -0,0 +1,184 @@
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Slotted records parsed once from GitHub JSON. Defaults that the renderer
+# used to re-apply with .get() chains on every access are resolved here.
+# Repo and Discussion keep a reference to the GitHub dict they came from, so
+# to_dict() still returns the fields they don't model (watchers_count,
+# pushed_at, user, number, reactions, ...) to API consumers.
+
+@dataclass(slots=True)
+class Repo:
+    name: str
+    full_name: str
+    owner: str
+    html_url: str
+    description: str
+    stars: int
+    forks: int
+    language: Optional[str]
+    topics: Tuple[str, ...]
+    created_at: str
+    updated_at: str
+    id: Optional[int] = None
+    raw: Dict = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def from_github(cls, data: Dict) -> "Repo":
+        """Build from a /search/repositories item (or a to_dict() result)"""
+        owner = data.get("owner") or {}
+        description = data.get("description")
+        return cls(
+            data.get("name", "Unknown"),
+            data.get("full_name", ""),
+            owner.get("login", "Unknown"),
+            data.get("html_url", "#"),
+            "No description available" if description is None else description,
+            data.get("stargazers_count") or 0,
+            data.get("forks_count") or 0,
+            data.get("language"),
+            tuple(data.get("topics") or ()),
+            data.get("created_at", ""),
+            data.get("updated_at", ""),
+            data.get("id"),
+            data
+        )
+
+    @classmethod
+    def coerce(cls, value) -> "Repo":
+        return cls.from_github(value) if isinstance(value, dict) else value
+
+    def to_dict(self, extra: bool = True) -> Dict:
+        """GitHub-shaped dict for JSON responses and dict-based consumers
+
+        Modeled fields (possibly updated, e.g. enriched counts) over the
+        original GitHub item; extra=False leaves the unmodeled fields out.
+        """
+        raw = self.raw if extra else {}
+        owner = raw.get("owner")
+        return {
+            **raw,
+            "id": self.id,
+            "name": self.name,
+            "full_name": self.full_name,
+            "owner": {**(owner if isinstance(owner, dict) else {}), "login": self.owner},
+            "html_url": self.html_url,
+            "description": self.description,
+            "stargazers_count": self.stars,
+            "forks_count": self.forks,
+            "language": self.language,
+            "topics": list(self.topics),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+@dataclass(slots=True)
+class Discussion:
+    title: str
+    body: str
+    html_url: str
+    repository_url: str
+    repo_name: str
+    comments: int
+    created_at: str
+    id: Optional[int] = None
+    raw: Dict = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def from_github(cls, data: Dict) -> "Discussion":
+        """Build from a /search/issues item (or a to_dict() result)"""
+        body = data.get("body")
+        repository_url = data.get("repository_url") or ""
+        return cls(
+            data.get("title", "Untitled"),
+            "No description" if body is None else body,
+            data.get("html_url", "#"),
+            repository_url,
+            repository_url.split("/")[-1] if repository_url else "Unknown",
+            data.get("comments") or 0,
+            data.get("created_at", ""),
+            data.get("id"),
+            data
+        )
+
+    @classmethod
+    def coerce(cls, value) -> "Discussion":
+        return cls.from_github(value) if isinstance(value, dict) else value
+
+    def to_dict(self) -> Dict:
+        return {
+            **self.raw,
+            "id": self.id,
+            "title": self.title,
+            "body": self.body,
+            "html_url": self.html_url,
+            "repository_url": self.repository_url,
+            "comments": self.comments,
+            "created_at": self.created_at
+        }
+
+@dataclass(slots=True)
+class RepoStats:
+    name: str
+    full_name: str
+    stars: int
+    forks: int
+    language: Optional[str]
+    description: Optional[str]
+    url: str
+    created_at: str
+    updated_at: str
+
+    @classmethod
+    def from_github(cls, data: Dict) -> "RepoStats":
+        """Build from a /repos/{owner}/{name} response"""
+        return cls(
+            data["name"],
+            data["full_name"],
+            data["stargazers_count"],
+            data["forks_count"],
+            data["language"],
+            data["description"],
+            data["html_url"],
+            data["created_at"],
+            data["updated_at"]
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RepoStats":
+        """Build from a to_dict() result, tolerating missing keys"""
+        return cls(
+            data.get("name", "Unknown"),
+            data.get("full_name", ""),
+            data.get("stars") or 0,
+            data.get("forks") or 0,
+            data.get("language"),
+            data.get("description"),
+            data.get("url", ""),
+            data.get("created_at", ""),
+            data.get("updated_at", "")
+        )
+
+    @classmethod
+    def coerce(cls, value) -> Optional["RepoStats"]:
+        """Records pass through; empty dicts (failed lookups) become None"""
+        if not value:
+            return None
+        return cls.from_dict(value) if isinstance(value, dict) else value
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "full_name": self.full_name,
+            "stars": self.stars,
+            "forks": self.forks,
+            "language": self.language,
+            "description": self.description,
+            "url": self.url,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+def to_dicts(records: Iterable) -> List[Dict]:
+    return [record.to_dict() if record is not None else {} for record in records]
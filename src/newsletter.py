@@ -1,161 +1,209 @@
 
-from typing import Dict, List
+from typing import Dict, Iterable, List
 from datetime import datetime
-import re
+import logging
+import time
+
+from document import BulletList, Document, FactList, Item, Link, Section, Table, emit
+from metrics import REGISTRY
+from models import Discussion, Repo, RepoStats
+from utils import strip_markdown_batch
+
+logger = logging.getLogger("ai_newsletter")
+
+SECTION_RENDER_TIME = REGISTRY.histogram(
+    "newsletter_section_render_seconds", "Time spent rendering each newsletter section", ["section"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+)
+EMIT_TIME = REGISTRY.histogram(
+    "newsletter_emit_seconds", "Time spent serializing a built newsletter", ["format"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+)
 
 class NewsletterGenerator:
+    """Build a newsletter Document from server data and emit it in any format
+
+    Selection, truncation and cleaning happen once in the `_build_*`
+    section builders; the `_generate_*` methods are their markdown views.
+    """
+
     def __init__(self):
         self.template_sections = {
-            "header": self._generate_header,
-            "highlights": self._generate_highlights,
-            "tools": self._generate_tools_section,
-            "discussions": self._generate_discussions,
-            "stats": self._generate_stats,
-            "footer": self._generate_footer
+            "header": self._build_header,
+            "highlights": self._build_highlights,
+            "tools": self._build_tools_section,
+            "discussions": self._build_discussions,
+            "stats": self._build_stats,
+            "footer": self._build_footer
         }
     
-    def generate_newsletter(self, data: Dict) -> str:
+    def generate_newsletter(self, data: Dict, format: str = "markdown") -> str:
         """Generate complete newsletter from data"""
+        return self.render(self.build_document(data), format)
+    
+    def generate_formats(self, data: Dict, formats: Iterable[str]) -> Dict[str, str]:
+        """Build once, then emit each requested format"""
+        document = self.build_document(data)
+        return {format: self.render(document, format) for format in formats}
+    
+    def build_document(self, data: Dict) -> Document:
+        data = self._parse(data)
         sections = []
         
-        for section_name, generator_func in self.template_sections.items():
+        for section_name, builder in self.template_sections.items():
+            started = time.perf_counter()
             try:
-                section_content = generator_func(data)
-                if section_content:
-                    sections.append(section_content)
+                section = builder(data)
+                if section is not None:
+                    sections.append(section)
             except Exception as e:
-                print(f"Error generating {section_name}: {e}")
+                logger.error(f"Error generating {section_name}: {e}")
+            SECTION_RENDER_TIME.labels(section_name).observe(time.perf_counter() - started)
         
-        return "\n\n---\n\n".join(sections)
+        return Document(sections, data.get("generation_timestamp"))
+    
+    def render(self, document: Document, format: str = "markdown") -> str:
+        started = time.perf_counter()
+        content = emit(document, format)
+        EMIT_TIME.labels(format).observe(time.perf_counter() - started)
+        return content
+    
+    def _parse(self, data: Dict) -> Dict:
+        """Convert dict items to records once so every section reads attributes"""
+        parsed = dict(data)
+        parsed["trending_repos"] = [Repo.coerce(r) for r in data.get("trending_repos", [])]
+        parsed["discussions"] = [Discussion.coerce(d) for d in data.get("discussions", [])]
+        stats = data.get("weekly_stats", {})
+        if stats and stats.get("top_repos"):
+            parsed["weekly_stats"] = {**stats, "top_repos": [RepoStats.coerce(r) for r in stats["top_repos"]]}
+        return parsed
+    
+    def _markdown(self, section: Section) -> str:
+        return emit(Document([section]), "markdown")
     
     def _generate_header(self, data: Dict) -> str:
+        return self._markdown(self._build_header(data))
+    
+    def _generate_highlights(self, data: Dict) -> str:
+        return self._markdown(self._build_highlights(data))
+    
+    def _generate_tools_section(self, data: Dict) -> str:
+        return self._markdown(self._build_tools_section(data))
+    
+    def _generate_discussions(self, data: Dict) -> str:
+        return self._markdown(self._build_discussions(data))
+    
+    def _generate_stats(self, data: Dict) -> str:
+        return self._markdown(self._build_stats(data))
+    
+    def _generate_footer(self, data: Dict) -> str:
+        return self._markdown(self._build_footer(data))
+    
+    def _build_header(self, data: Dict) -> Section:
         timestamp = data.get("generation_timestamp", datetime.now().isoformat())
         date_str = datetime.fromisoformat(timestamp.replace('Z', '')).strftime("%B %d, %Y")
         week_num = datetime.now().isocalendar()[1]
         
-        return f"""# 🤖 AI Weekly Newsletter
-*{date_str} | Week {week_num}*"""
+        return Section("header", "🤖 AI Weekly Newsletter", subtitle=f"{date_str} | Week {week_num}")
     
-    def _generate_highlights(self, data: Dict) -> str:
+    def _build_highlights(self, data: Dict) -> Section:
         repos = data.get("trending_repos", [])[:3]
+        section = Section("highlights", "📰 Top 3 AI Highlights")
         
         if not repos:
-            return "## 📰 Top 3 AI Highlights\n\n*No trending repositories found this week.*"
-        
-        highlights = ["## 📰 Top 3 AI Highlights\n"]
-        
-        for i, repo in enumerate(repos, 1):
-            name = repo.get("name", "Unknown")
-            description = repo.get("description", "No description available")[:200]
-            url = repo.get("html_url", "#")
-            owner = repo.get("owner", {}).get("login", "Unknown")
-            stars = repo.get("stargazers_count", 0)
-            
-            highlight = f"""### 🚀 **{name} by {owner}**
-{description}... 
-
-⭐ **{stars:,} stars** | **Repository:** [{owner}/{name}]({url})"""
-            
-            highlights.append(highlight)
-        
-        return "\n\n".join(highlights)
+            section.empty = "No trending repositories found this week."
+            return section
+        
+        for repo in map(Repo.coerce, repos):
+            section.items.append(Item(
+                repo.name,
+                repo.description[:200],
+                Link(f"{repo.owner}/{repo.name}", repo.html_url),
+                byline=repo.owner,
+                stars=repo.stars
+            ))
+        
+        return section
     
-    def _generate_tools_section(self, data: Dict) -> str:
+    def _build_tools_section(self, data: Dict) -> Section:
         repos = data.get("trending_repos", [])[3:8]  # Next 5 repos as tools
+        section = Section("tools", "🛠️ New AI Tools & Libraries")
         
         if not repos:
-            return "## 🛠️ New AI Tools & Libraries\n\n*No new tools discovered this week.*"
-        
-        tools = ["## 🛠️ New AI Tools & Libraries\n"]
-        
-        for repo in repos:
-            name = repo.get("name", "Unknown")
-            description = repo.get("description", "No description available")[:150]
-            url = repo.get("html_url", "#")
-            owner = repo.get("owner", {}).get("login", "Unknown")
-            language = repo.get("language", "Unknown")
-            
-            tool = f"""### **{name}**
-{description}
-
-- **Language:** {language}
-- **Repository:** [{owner}/{name}]({url})"""
-            
-            tools.append(tool)
-        
-        return "\n\n".join(tools)
+            section.empty = "No new tools discovered this week."
+            return section
+        
+        for repo in map(Repo.coerce, repos):
+            section.items.append(Item(
+                repo.name,
+                repo.description[:150],
+                Link(f"{repo.owner}/{repo.name}", repo.html_url),
+                language=repo.language or "Unknown"
+            ))
+        
+        return section
     
-    def _generate_discussions(self, data: Dict) -> str:
+    def _build_discussions(self, data: Dict) -> Section:
         discussions = data.get("discussions", [])[:5]
+        section = Section("discussions", "🧩 Interesting Discussions & Issues")
         
         if not discussions:
-            return "## 🧩 Interesting Discussions & Issues\n\n*No notable discussions found this week.*"
-        
-        disc_section = ["## 🧩 Interesting Discussions & Issues\n"]
-        
-        for discussion in discussions:
-            title = discussion.get("title", "Untitled")[:100]
-            body = discussion.get("body", "No description")[:200]
-            url = discussion.get("html_url", "#")
-            repo_name = discussion.get("repository_url", "").split("/")[-1] if discussion.get("repository_url") else "Unknown"
-            
-            # Clean up body text
-            body = re.sub(r'[#\*\[\]`]', '', body).strip()[:150]
-            
-            disc = f"""### **{title}**
-{body}...
-
-**Repository:** {repo_name} | [View Discussion]({url})"""
-            
-            disc_section.append(disc)
+            section.empty = "No notable discussions found this week."
+            return section
         
-        return "\n\n".join(disc_section)
+        discussions = [Discussion.coerce(d) for d in discussions]
+        
+        # Clean up body text for all discussions in one pass
+        bodies = strip_markdown_batch(d.body[:200] for d in discussions)
+        
+        for discussion, body in zip(discussions, bodies):
+            section.items.append(Item(
+                discussion.title[:100],
+                body[:150],
+                Link("View Discussion", discussion.html_url),
+                source=discussion.repo_name
+            ))
+        
+        return section
     
-    def _generate_stats(self, data: Dict) -> str:
+    def _build_stats(self, data: Dict) -> Section:
         stats = data.get("weekly_stats", {})
+        section = Section("stats", "📊 Weekly Stats")
         
         if not stats:
-            return "## 📊 Weekly Stats\n\n*Stats unavailable this week.*"
+            section.empty = "Stats unavailable this week."
+            return section
         
-        total_stars = stats.get("total_stars", 0)
-        total_forks = stats.get("total_forks", 0)
         languages = stats.get("languages", [])
         top_repos = stats.get("top_repos", [])
         
-        stats_content = [f"""## 📊 Weekly Stats
-
-### 🌟 **Community Growth**
-- **Total Stars Tracked:** {total_stars:,}
-- **Total Forks:** {total_forks:,}
-- **Active Languages:** {', '.join(languages[:5])}"""]
+        section.facts = FactList("Community Growth", [
+            ("Total Stars Tracked", stats.get("total_stars", 0)),
+            ("Total Forks", stats.get("total_forks", 0)),
+            ("Active Languages", ", ".join(languages[:5]))
+        ])
         
         if top_repos:
-            stats_content.append("### 📈 **Top Performing Repositories**")
-            table_rows = ["| Repository | Stars | Forks | Language |", "|------------|-------|-------|----------|"]
-            
-            for repo in top_repos[:3]:
+            rows = []
+            for repo in map(RepoStats.coerce, top_repos[:3]):
                 if repo:  # Check if repo data exists
-                    name = repo.get("name", "Unknown")[:20]
-                    stars = repo.get("stars", 0)
-                    forks = repo.get("forks", 0)
-                    language = repo.get("language", "N/A") or "N/A"
-                    table_rows.append(f"| **{name}** | {stars:,} | {forks:,} | {language} |")
-            
-            stats_content.append("\n".join(table_rows))
+                    rows.append((repo.name[:20], repo.stars, repo.forks, repo.language or "N/A"))
+            section.table = Table("Top Performing Repositories", ("Repository", "Stars", "Forks", "Language"), rows)
         
-        return "\n\n".join(stats_content)
+        return section
     
-    def _generate_footer(self, data: Dict) -> str:
-        return """## 🔮 Looking Ahead
-
-### **What to Watch:**
-- Keep an eye on emerging AI frameworks and tools
-- Monitor community discussions for breakthrough insights
-- Watch for new model releases and research developments
-
----
-
-*That's a wrap for this week! Stay tuned for more AI developments next Monday.*
-
-**📧 Questions or suggestions?** Open an issue on our repository.
-**🔄 Share this newsletter** with your AI-enthusiastic colleagues!"""
+    def _build_footer(self, data: Dict) -> Section:
+        return Section(
+            "footer",
+            "🔮 Looking Ahead",
+            bullets=BulletList("What to Watch:", [
+                "Keep an eye on emerging AI frameworks and tools",
+                "Monitor community discussions for breakthrough insights",
+                "Watch for new model releases and research developments"
+            ]),
+            outro="That's a wrap for this week! Stay tuned for more AI developments next Monday.",
+            notes=[
+                ("📧 Questions or suggestions?", "Open an issue on our repository."),
+                ("🔄 Share this newsletter", "with your AI-enthusiastic colleagues!")
+            ]
+        )
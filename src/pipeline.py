@@ -0,0 +1,482 @@
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import REGISTRY
+from utils import setup_logging
+
+logger = setup_logging()
+
+DEFAULT_PIPELINE_DB = ".newsletter_state/pipeline.db"
+STAGES = ("fetch", "render", "enhance")
+DEFAULT_STAGE_LIMITS = {"fetch": 2, "render": 4, "enhance": 1}
+
+JOBS = REGISTRY.counter(
+    "pipeline_jobs_total", "Newsletter jobs finished by the pipeline daemon", ["outcome"]
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each pipeline stage", ["stage", "outcome"]
+)
+STAGE_RESUMES = REGISTRY.counter(
+    "pipeline_stage_resumed_total", "Stages skipped because a checkpointed artifact existed", ["stage"]
+)
+
+@dataclass(slots=True)
+class JobSpec:
+    """One newsletter variant: what to fetch, whether to enhance, where to write it
+
+    `output` may contain {name} and {date} placeholders. With an `interval`
+    (seconds) the job re-enqueues itself that long after each scheduled run.
+    """
+    name: str
+    days: int = 7
+    enhance: bool = True
+    output: Optional[str] = None
+    interval: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "JobSpec":
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+@dataclass(slots=True)
+class Job:
+    id: int
+    spec: JobSpec
+    run_at: float
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    result: Optional[str] = None
+
+class JobQueue:
+    """Persistent newsletter job queue with per-stage artifact checkpoints
+
+    Jobs and artifacts live in one SQLite file, so a checkpoint and the job
+    row it belongs to survive a crash together. Other daemons sharing the
+    file can hold the write lock for up to `busy_timeout` seconds, so, as in
+    SQLiteBackend, every statement runs on one dedicated thread instead of
+    on the event loop the workers and heartbeats share. A running job's
+    updated_at is its lease, renewed by heartbeat() while a daemon works on it.
+    """
+
+    def __init__(self, path: str = DEFAULT_PIPELINE_DB, busy_timeout: float = 10.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=busy_timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   spec TEXT NOT NULL,
+                   run_at REAL NOT NULL,
+                   status TEXT NOT NULL DEFAULT 'queued',
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   error TEXT,
+                   result TEXT,
+                   updated_at REAL NOT NULL
+               )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at)")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS artifacts (
+                   job_id INTEGER NOT NULL,
+                   stage TEXT NOT NULL,
+                   value TEXT NOT NULL,
+                   PRIMARY KEY (job_id, stage)
+               )"""
+        )
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-queue")
+
+    async def _run(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def close(self):
+        await self._run(self.conn.close)
+        self._executor.shutdown()
+
+    async def enqueue(self, spec: JobSpec, run_at: Optional[float] = None) -> int:
+        return await self._run(self._enqueue, spec, run_at)
+
+    async def get(self, job_id: int) -> Optional[Job]:
+        return await self._run(self._get, job_id)
+
+    async def list(self, status: Optional[str] = None) -> List[Job]:
+        return await self._run(self._list, status)
+
+    async def claim(self, now: Optional[float] = None) -> Optional[Job]:
+        """Atomically take the earliest due job and mark it running"""
+        return await self._run(self._claim, now)
+
+    async def next_due(self) -> Optional[float]:
+        return await self._run(self._next_due)
+
+    async def heartbeat(self, job: Job):
+        """Renew the lease on a job this daemon is still running"""
+        await self._run(
+            self.conn.execute,
+            "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'", (time.time(), job.id)
+        )
+
+    async def recover(self, lease: float = 0.0) -> int:
+        """Requeue running jobs whose lease expired; their artifacts are kept
+
+        Only jobs without a heartbeat in the last `lease` seconds are taken
+        back, so jobs of other live daemons sharing the file are left alone.
+        """
+        return await self._run(self._recover, lease)
+
+    async def complete(self, job: Job, result: Optional[str] = None):
+        await self._run(self._complete, job, result)
+
+    async def fail(self, job: Job, error: str, retry_at: Optional[float] = None):
+        """Requeue for retry_at, or mark failed when no retry is given"""
+        await self._run(self._fail, job, error, retry_at)
+
+    async def artifact(self, job_id: int, stage: str) -> Any:
+        return await self._run(self._artifact, job_id, stage)
+
+    async def save_artifact(self, job_id: int, stage: str, value: Any):
+        await self._run(
+            self.conn.execute,
+            "INSERT OR REPLACE INTO artifacts (job_id, stage, value) VALUES (?, ?, ?)",
+            (job_id, stage, json.dumps(value))
+        )
+
+    def _job(self, row) -> Job:
+        job_id, spec, run_at, status, attempts, error, result = row
+        return Job(job_id, JobSpec.from_dict(json.loads(spec)), run_at, status, attempts, error, result)
+
+    def _enqueue(self, spec: JobSpec, run_at: Optional[float]) -> int:
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (spec, run_at, updated_at) VALUES (?, ?, ?)",
+            (json.dumps(spec.to_dict()), now if run_at is None else run_at, now)
+        )
+        return cursor.lastrowid
+
+    def _get(self, job_id: int) -> Optional[Job]:
+        row = self.conn.execute(
+            "SELECT id, spec, run_at, status, attempts, error, result FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._job(row) if row else None
+
+    def _list(self, status: Optional[str]) -> List[Job]:
+        query = "SELECT id, spec, run_at, status, attempts, error, result FROM jobs"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        return [self._job(row) for row in self.conn.execute(query + " ORDER BY run_at, id", params)]
+
+    def _claim(self, now: Optional[float]) -> Optional[Job]:
+        now = time.time() if now is None else now
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                """SELECT id FROM jobs WHERE status = 'queued' AND run_at <= ?
+                   ORDER BY run_at, id LIMIT 1""",
+                (now,)
+            ).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (now, row[0])
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return self._get(row[0]) if row else None
+
+    def _next_due(self) -> Optional[float]:
+        row = self.conn.execute("SELECT MIN(run_at) FROM jobs WHERE status = 'queued'").fetchone()
+        return row[0]
+
+    def _recover(self, lease: float) -> int:
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running' AND updated_at <= ?",
+            (now, now - lease)
+        )
+        return cursor.rowcount
+
+    def _complete(self, job: Job, result: Optional[str]):
+        self.conn.execute(
+            "UPDATE jobs SET status = 'done', error = NULL, result = ?, updated_at = ? WHERE id = ?",
+            (result, time.time(), job.id)
+        )
+        self.conn.execute("DELETE FROM artifacts WHERE job_id = ?", (job.id,))
+
+    def _fail(self, job: Job, error: str, retry_at: Optional[float]):
+        if retry_at is None:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                (error, time.time(), job.id)
+            )
+        else:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, run_at = ?, updated_at = ? WHERE id = ?",
+                (error, retry_at, time.time(), job.id)
+            )
+
+    def _artifact(self, job_id: int, stage: str) -> Any:
+        row = self.conn.execute(
+            "SELECT value FROM artifacts WHERE job_id = ? AND stage = ?", (job_id, stage)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+class PipelineDaemon:
+    """Run queued newsletter jobs on a pool of async workers
+
+    Each job goes fetch -> render -> enhance, the same steps as
+    MCPNewsletterClient.generate_newsletter. Every stage is bounded by its
+    own semaphore (so e.g. one Claude call at a time while several fetches
+    proceed) and its output is checkpointed before the next stage starts; a
+    job resumed after a crash skips straight past the stages it finished.
+    Failed jobs are retried with exponential backoff up to max_attempts;
+    Claude enhancement only falls back to the basic newsletter on the last
+    attempt. Running jobs are heartbeated so daemons sharing the queue only
+    take over jobs whose `lease` ran out.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        client=None,
+        workers: int = 4,
+        limits: Optional[Dict[str, int]] = None,
+        poll_interval: float = 5.0,
+        max_attempts: int = 3,
+        retry_delay: float = 30.0,
+        lease: float = 120.0
+    ):
+        if client is None:
+            from client import MCPNewsletterClient
+            client = MCPNewsletterClient(os.getenv("MCP_SERVER_URL", "http://localhost:8000"))
+        self.queue = queue
+        self.client = client
+        self.workers = workers
+        self.limits = {**DEFAULT_STAGE_LIMITS, **(limits or {})}
+        self._semaphores = {stage: asyncio.Semaphore(self.limits[stage]) for stage in STAGES}
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self._stopping = asyncio.Event()
+        self._wake = asyncio.Event()
+
+    async def _stage(self, job: Job, stage: str, produce: Callable[[], Awaitable]) -> Any:
+        value = await self.queue.artifact(job.id, stage)
+        if value is not None:
+            STAGE_RESUMES.labels(stage).inc()
+            return value
+
+        async with self._semaphores[stage]:
+            started = time.perf_counter()
+            try:
+                value = await produce()
+            except Exception:
+                STAGE_LATENCY.labels(stage, "error").observe(time.perf_counter() - started)
+                raise
+            STAGE_LATENCY.labels(stage, "success").observe(time.perf_counter() - started)
+
+        await self.queue.save_artifact(job.id, stage, value)
+        return value
+
+    async def run_job(self, job: Job) -> str:
+        spec = job.spec
+        raw_data = await self._stage(job, "fetch", lambda: self.client.fetch_newsletter_data(spec.days))
+        # Rendering is synchronous; keep it off the loop so fetches keep flowing
+        newsletter = await self._stage(
+            job, "render", lambda: asyncio.to_thread(self.client.newsletter_generator.generate_newsletter, raw_data)
+        )
+        if spec.enhance:
+            newsletter = await self._stage(job, "enhance", lambda: self._enhance(job, newsletter, raw_data))
+
+        if not spec.output:
+            return newsletter
+        path = spec.output.format(name=spec.name, date=datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+        await asyncio.to_thread(_write_atomic, path, newsletter)
+        return path
+
+    async def _enhance(self, job: Job, newsletter: str, raw_data: Dict) -> str:
+        """Claude's version; failures are retried and the basic newsletter is only used on the last attempt"""
+        try:
+            return await self.client.request_enhancement(newsletter, raw_data)
+        except Exception as e:
+            if job.attempts < self.max_attempts:
+                raise
+            logger.warning(f"Pipeline job {job.id}: Claude enhancement failed on the last attempt ({e}); using the basic newsletter")
+            return newsletter
+
+    async def _heartbeat(self, job: Job):
+        while True:
+            await asyncio.sleep(self.lease / 4)
+            await self.queue.heartbeat(job)
+
+    async def _process(self, job: Job):
+        logger.info(f"Pipeline job {job.id} ({job.spec.name}) attempt {job.attempts}")
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            result = await self.run_job(job)
+        except Exception as e:
+            if job.attempts < self.max_attempts:
+                retry_at = time.time() + self.retry_delay * 2 ** (job.attempts - 1)
+                await self.queue.fail(job, str(e), retry_at)
+                JOBS.labels("retried").inc()
+                logger.warning(f"Pipeline job {job.id} failed: {e}; retrying")
+            else:
+                await self.queue.fail(job, str(e))
+                JOBS.labels("failed").inc()
+                logger.error(f"Pipeline job {job.id} failed permanently: {e}")
+            return
+        finally:
+            heartbeat.cancel()
+
+        await self.queue.complete(job, result if job.spec.output else None)
+        JOBS.labels("done").inc()
+        if job.spec.interval:
+            # Next occurrence follows the schedule, skipping any runs missed while down
+            next_run = job.run_at + job.spec.interval
+            if next_run <= time.time():
+                next_run = time.time() + job.spec.interval
+            await self.queue.enqueue(job.spec, next_run)
+
+    async def _worker(self):
+        while not self._stopping.is_set():
+            job = await self.queue.claim()
+            if job is not None:
+                await self._process(job)
+                continue
+
+            # Take over jobs of daemons that died while this one idles
+            if await self.queue.recover(self.lease):
+                continue
+
+            timeout = self.poll_interval
+            next_due = await self.queue.next_due()
+            if next_due is not None:
+                timeout = min(timeout, max(next_due - time.time(), 0))
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self, until_idle: bool = False):
+        """Work the queue until stop() (or, with until_idle, until nothing is due)"""
+        recovered = await self.queue.recover(self.lease)
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted pipeline job(s)")
+
+        if until_idle:
+            async def drain():
+                while (job := await self.queue.claim()) is not None:
+                    await self._process(job)
+            await asyncio.gather(*(drain() for _ in range(self.workers)))
+            return
+
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def stop(self):
+        """Let workers finish their current job, then return from run()"""
+        self._stopping.set()
+        self._wake.set()
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="client.py pipeline", description="Scheduled newsletter pipeline")
+    parser.add_argument("--db", type=str, default=os.getenv("PIPELINE_DB", DEFAULT_PIPELINE_DB))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Queue a newsletter job")
+    enqueue.add_argument("name", help="Variant name")
+    enqueue.add_argument("--days", type=int, default=7, help="Days to look back")
+    enqueue.add_argument("--no-claude", action="store_true", help="Skip Claude enhancement")
+    enqueue.add_argument("--output", type=str, help="Output path; {name} and {date} are substituted")
+    enqueue.add_argument("--at", type=str, help="ISO time to run at (UTC unless an offset is given)")
+    enqueue.add_argument("--every", type=float, help="Repeat every N seconds after each scheduled run")
+
+    run = commands.add_parser("run", help="Work the queue")
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--fetch-limit", type=int, default=DEFAULT_STAGE_LIMITS["fetch"])
+    run.add_argument("--render-limit", type=int, default=DEFAULT_STAGE_LIMITS["render"])
+    run.add_argument("--enhance-limit", type=int, default=DEFAULT_STAGE_LIMITS["enhance"])
+    run.add_argument("--poll-interval", type=float, default=5.0)
+    run.add_argument("--max-attempts", type=int, default=3)
+    run.add_argument("--lease", type=float, default=120.0,
+                     help="Seconds without a heartbeat before another daemon takes over a running job")
+    run.add_argument("--once", action="store_true", help="Exit once no job is due instead of waiting")
+
+    status = commands.add_parser("status", help="List jobs")
+    status.add_argument("--status", choices=["queued", "running", "done", "failed"])
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db)
+
+    try:
+        if args.command == "enqueue":
+            spec = JobSpec(args.name, args.days, not args.no_claude, args.output, args.every)
+            print(await queue.enqueue(spec, _parse_time(args.at)))
+        elif args.command == "status":
+            for job in await queue.list(args.status):
+                run_at = datetime.fromtimestamp(job.run_at, timezone.utc).isoformat(timespec="seconds")
+                print(json.dumps({
+                    "id": job.id, "status": job.status, "run_at": run_at, "attempts": job.attempts,
+                    "error": job.error, "result": job.result, "spec": job.spec.to_dict()
+                }))
+        else:
+            daemon = PipelineDaemon(
+                queue,
+                workers=args.workers,
+                limits={"fetch": args.fetch_limit, "render": args.render_limit, "enhance": args.enhance_limit},
+                poll_interval=args.poll_interval,
+                max_attempts=args.max_attempts,
+                lease=args.lease
+            )
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, daemon.stop)
+            await daemon.run(until_idle=args.once)
+    finally:
+        await queue.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
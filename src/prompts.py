@@ -0,0 +1,208 @@
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from models import Discussion, Repo, RepoStats
+from utils import strip_markdown_batch
+
+WORD = re.compile(r"[A-Za-z]+|\d+|\S")
+ISSUE_URL = re.compile(r"^https://github\.com/([^/]+/[^/]+)/(?:issues|pull)/(\d+)$")
+
+# Rough output size of each part of the finished newsletter, in tokens
+OUTPUT_TOKENS_BASE = 350
+OUTPUT_TOKENS_PER_REPO = 90
+OUTPUT_TOKENS_PER_DISCUSSION = 70
+OUTPUT_TOKENS_STATS = 120
+OUTPUT_HEADROOM = 1.3
+MIN_OUTPUT_TOKENS = 512
+
+REPOS_LABEL = "Repos (owner/name | stars | language | description; first 3 are highlights):"
+DISCUSSIONS_LABEL = "Discussions (ref | title | summary):"
+STATS_LABEL = "Stats:"
+
+INSTRUCTIONS = """You are an expert AI newsletter editor. Write this week's AI newsletter in markdown from the digest below.
+
+Keep exactly these sections, in order:
+{outline}
+
+Rules:
+- Friendly but professional tone; add insight and context, keep it concise.
+- Use only facts from the digest; keep star counts and names as given.
+- Link repos as https://github.com/<owner/name>; link discussions given as owner/repo#N as https://github.com/owner/repo/issues/N.
+- Return only the newsletter."""
+
+def estimate_tokens(text: str) -> int:
+    """Local approximation of the Claude token count
+
+    Letter runs cost about one token per four characters, digit runs one
+    per three, and each punctuation mark, symbol or emoji one. It runs
+    slightly high on English prose, which is the safe side for a budget.
+    """
+    tokens = 0
+    for piece in WORD.findall(text):
+        if piece[0].isalpha() and piece.isascii():
+            tokens += (len(piece) + 3) // 4
+        elif piece.isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+def _compact(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+def _discussion_ref(url: str) -> str:
+    match = ISSUE_URL.match(url or "")
+    return f"{match.group(1)}#{match.group(2)}" if match else url
+
+@dataclass(slots=True)
+class Prompt:
+    text: str
+    input_tokens: int
+    max_tokens: int
+    repos: int = 0
+    discussions: int = 0
+
+class PromptBuilder:
+    """Pack a compact digest of the newsletter data under a token budget
+
+    Instead of the rendered markdown (links, emoji and boilerplate
+    included), the prompt carries one line per repo and discussion with
+    deduplicated, cleaned and trimmed fields, plus the section outline of
+    the basic newsletter so the structure is kept. Lines are added in
+    newsletter order (highlights, discussions, tools, stats) until the
+    budget is reached. max_tokens follows from what actually went in.
+    """
+
+    def __init__(
+        self,
+        budget: int = 1200,
+        max_output_tokens: int = 4000,
+        max_repos: int = 8,
+        max_discussions: int = 5,
+        description_chars: int = 140,
+        body_chars: int = 100
+    ):
+        self.budget = budget
+        self.max_output_tokens = max_output_tokens
+        self.max_repos = max_repos
+        self.max_discussions = max_discussions
+        self.description_chars = description_chars
+        self.body_chars = body_chars
+
+    def _repo_lines(self, repos: Iterable) -> List[str]:
+        lines, seen = [], set()
+        for repo in map(Repo.coerce, repos):
+            key = repo.full_name or f"{repo.owner}/{repo.name}"
+            if key in seen:
+                continue
+            seen.add(key)
+            description = _compact(repo.description, self.description_chars)
+            lines.append(f"{key} | {repo.stars}★ | {repo.language or '-'} | {description}")
+            if len(lines) == self.max_repos:
+                break
+        return lines
+
+    def _discussion_lines(self, discussions: Iterable) -> List[str]:
+        selected, seen = [], set()
+        for discussion in map(Discussion.coerce, discussions):
+            key = discussion.html_url if discussion.html_url != "#" else discussion.title.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+            selected.append(discussion)
+            if len(selected) == self.max_discussions:
+                break
+        titles = strip_markdown_batch(d.title[:200] for d in selected)
+        bodies = strip_markdown_batch(d.body[:self.body_chars * 2] for d in selected)
+        return [
+            f"{_discussion_ref(d.html_url)} | {_compact(title, 100)} | {_compact(body, self.body_chars)}"
+            for d, title, body in zip(selected, titles, bodies)
+        ]
+
+    def _stats_line(self, stats: Optional[Dict]) -> Optional[str]:
+        if not stats:
+            return None
+        parts = [f"stars={stats.get('total_stars', 0)}", f"forks={stats.get('total_forks', 0)}"]
+        languages = stats.get("languages") or []
+        if languages:
+            parts.append("languages=" + ",".join(languages[:5]))
+        top = [repo for repo in map(RepoStats.coerce, (stats.get("top_repos") or [])[:3]) if repo]
+        if top:
+            parts.append("top=" + ",".join(f"{repo.name}({repo.stars}★/{repo.forks}f)" for repo in top))
+        return " ".join(parts)
+
+    def build(self, raw_data: Dict, outline: Iterable[str] = ()) -> Prompt:
+        header = INSTRUCTIONS.format(outline="\n".join(outline) or "(free-form)")
+        if raw_data.get("generation_timestamp"):
+            header += f"\n\nDate: {raw_data['generation_timestamp'][:10]}"
+        # Labels are counted up front whether or not their block ends up used
+        used = estimate_tokens(header) + estimate_tokens(f"DIGEST {REPOS_LABEL} {DISCUSSIONS_LABEL} {STATS_LABEL}")
+
+        repo_lines = self._repo_lines(raw_data.get("trending_repos") or [])
+        discussion_lines = self._discussion_lines(raw_data.get("discussions") or [])
+        stats_line = self._stats_line(raw_data.get("weekly_stats"))
+
+        # Newsletter order doubles as priority: what doesn't fit is what the
+        # reader would see last
+        candidates = (
+            [("repos", line) for line in repo_lines[:3]]
+            + [("discussions", line) for line in discussion_lines]
+            + [("repos", line) for line in repo_lines[3:]]
+            + ([("stats", stats_line)] if stats_line else [])
+        )
+        kept: Dict[str, List[str]] = {"repos": [], "discussions": [], "stats": []}
+        for group, line in candidates:
+            cost = estimate_tokens(line) + 1
+            if used + cost > self.budget:
+                continue
+            kept[group].append(line)
+            used += cost
+
+        blocks = [header, "DIGEST"]
+        if kept["repos"]:
+            blocks.append(REPOS_LABEL + "\n" + "\n".join(kept["repos"]))
+        if kept["discussions"]:
+            blocks.append(DISCUSSIONS_LABEL + "\n" + "\n".join(kept["discussions"]))
+        if kept["stats"]:
+            blocks.append(f"{STATS_LABEL} {kept['stats'][0]}")
+        text = "\n\n".join(blocks)
+
+        expected = (
+            OUTPUT_TOKENS_BASE
+            + OUTPUT_TOKENS_PER_REPO * len(kept["repos"])
+            + OUTPUT_TOKENS_PER_DISCUSSION * len(kept["discussions"])
+            + (OUTPUT_TOKENS_STATS if kept["stats"] else 0)
+        )
+        max_tokens = min(max(math.ceil(expected * OUTPUT_HEADROOM), MIN_OUTPUT_TOKENS), self.max_output_tokens)
+        return Prompt(text, estimate_tokens(text), max_tokens, len(kept["repos"]), len(kept["discussions"]))
+
+def outline_of(markdown: str) -> List[str]:
+    """The top-level headings of a rendered newsletter"""
+    return [line for line in markdown.splitlines() if line.startswith("# ") or line.startswith("## ")]
+
+FRAGMENT_INSTRUCTIONS = """You are an expert AI newsletter editor. Rewrite each newsletter entry below to be more engaging and informative, friendly but professional.
+
+Rules:
+- Keep each entry's markdown structure, links, names and numbers intact.
+- Do not merge, reorder or drop entries.
+- Return every entry as <entry id="ID">rewritten markdown</entry> and nothing else."""
+
+ENTRY = re.compile(r'<entry id="([^"]+)">\s*(.*?)\s*</entry>', re.S)
+
+def build_fragment_prompt(fragments: Dict[str, str], max_output_tokens: int = 4000) -> Prompt:
+    """Prompt to enhance individual item fragments, e.g. only the changed ones"""
+    entries = "\n\n".join(f'<entry id="{key}">\n{fragment}\n</entry>' for key, fragment in fragments.items())
+    text = f"{FRAGMENT_INSTRUCTIONS}\n\n{entries}"
+    # Rewrites come out somewhat longer than they went in
+    expected = sum(estimate_tokens(fragment) for fragment in fragments.values()) * 1.6 + 20 * len(fragments)
+    max_tokens = min(max(math.ceil(expected * OUTPUT_HEADROOM), MIN_OUTPUT_TOKENS), max_output_tokens)
+    return Prompt(text, estimate_tokens(text), max_tokens)
+
+def parse_fragments(text: str, keys: Iterable[str]) -> Dict[str, str]:
+    """Rewritten fragments by id; ids missing from the response are left out"""
+    wanted = set(keys)
+    return {key: body for key, body in ENTRY.findall(text) if key in wanted and body}
@@ -0,0 +1,120 @@
+
+import asyncio
+import heapq
+import itertools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from metrics import REGISTRY
+
+ENRICHMENTS = REGISTRY.counter(
+    "ranking_enrichments_total", "Detail enrichments started by the ranking stage", ["outcome"]
+)
+
+class TopK:
+    """Keep the best k items of a stream in a bounded min-heap
+
+    Items are offered as they arrive; the heap root is the weakest member,
+    so each offer costs O(log k) and memory stays O(k) however long the
+    stream is. Ties on the score keep the earlier item, like a stable sort.
+    Repeated identities are ignored (the first offer wins).
+
+    With an `enrich` coroutine function each admitted item gets a detail
+    lookup scheduled right away, overlapping the rest of the stream; when an
+    item is evicted its lookup is cancelled. With speculative=False the
+    lookups only start in results(), for the final members.
+    """
+
+    def __init__(
+        self,
+        k: int,
+        key: Callable[[Any], float],
+        identity: Callable[[Any], Hashable] = id,
+        enrich: Optional[Callable[[Any], Awaitable]] = None,
+        speculative: bool = True
+    ):
+        self.k = k
+        self.key = key
+        self.identity = identity
+        self.enrich = enrich
+        self.speculative = speculative
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._members: Dict[Hashable, Any] = {}
+        self._seen: set = set()
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._order = itertools.count()
+        self.offered = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _start(self, ident: Hashable, item: Any):
+        ENRICHMENTS.labels("started").inc()
+        self._tasks[ident] = asyncio.ensure_future(self.enrich(item))
+
+    def offer(self, item: Any) -> bool:
+        """Consider one item; returns whether it is currently in the top k"""
+        ident = self.identity(item)
+        if ident in self._seen or self.k <= 0:
+            return False
+        self._seen.add(ident)
+        self.offered += 1
+
+        # Negated arrival order: among equal scores the earlier item ranks higher
+        entry = (self.key(item), -next(self._order), ident)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            _, _, evicted = heapq.heapreplace(self._heap, entry)
+            self._evict(evicted)
+        else:
+            return False
+
+        self._members[ident] = item
+        if self.enrich is not None and self.speculative:
+            self._start(ident, item)
+        return True
+
+    def extend(self, items: Iterable[Any]):
+        for item in items:
+            self.offer(item)
+
+    def _evict(self, ident: Hashable):
+        self.evicted += 1
+        self._members.pop(ident, None)
+        task = self._tasks.pop(ident, None)
+        if task is not None and not task.done():
+            task.cancel()
+            ENRICHMENTS.labels("cancelled").inc()
+
+    def items(self) -> List[Any]:
+        """Current members, best first"""
+        return [self._members[ident] for _, _, ident in sorted(self._heap, reverse=True)]
+
+    async def results(self) -> List[Tuple[Any, Any]]:
+        """Final members best first, each paired with its enrichment (None if absent or failed)"""
+        members = self.items()
+        if self.enrich is None:
+            return [(item, None) for item in members]
+
+        for item in members:
+            ident = self.identity(item)
+            if ident not in self._tasks:
+                self._start(ident, item)
+        details = await asyncio.gather(
+            *(self._tasks[self.identity(item)] for item in members), return_exceptions=True
+        )
+        failed = sum(isinstance(detail, BaseException) for detail in details)
+        if failed:
+            ENRICHMENTS.labels("failed").inc(failed)
+        return [
+            (item, None if isinstance(detail, BaseException) else detail)
+            for item, detail in zip(members, details)
+        ]
+
+    def cancel(self):
+        """Cancel outstanding enrichments (e.g. when the request is abandoned)"""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+        self._tasks.clear()
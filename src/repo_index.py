@@ -0,0 +1,101 @@
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from models import Repo
+
+TOKEN = re.compile(r"[a-z0-9]+")
+FIELDS = ("language", "topic", "owner", "keyword")
+
+Terms = Union[str, Iterable[str], None]
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+def _terms(value: Terms) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [term.strip() for term in value if term and term.strip()]
+
+class RepoIndex:
+    """Inverted index over one snapshot of repos
+
+    Each (field, term) maps to a posting list stored as an int bitset, with
+    bit i set when the i-th repo of the snapshot matches, so a filter is a
+    handful of big-int ORs and ANDs instead of a scan per subscriber.
+    Indexed fields are language, GitHub topics, owner login and keyword
+    tokens from the name and description; all matching is case-insensitive.
+
+    Within a field the terms are alternatives (topic=agents,llm matches
+    either); across fields they must all hold. A multi-word keyword needs
+    every one of its tokens. Matches come back in snapshot order, which
+    keeps the upstream ranking.
+    """
+
+    def __init__(self, repos: Iterable):
+        self._postings: Dict[str, Dict[str, int]] = {field: {} for field in FIELDS}
+        self.size = 0
+        for position, repo in enumerate(map(Repo.coerce, repos)):
+            bit = 1 << position
+            self._add("language", repo.language, bit)
+            self._add("owner", repo.owner, bit)
+            for topic in repo.topics:
+                self._add("topic", topic, bit)
+            for token in set(tokenize(repo.name or "") + tokenize(repo.description or "")):
+                self._add("keyword", token, bit)
+            self.size = position + 1
+        self.all = (1 << self.size) - 1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _add(self, field: str, term: Optional[str], bit: int):
+        if term:
+            postings = self._postings[field]
+            key = term.casefold()
+            postings[key] = postings.get(key, 0) | bit
+
+    def _field(self, field: str, terms: List[str]) -> int:
+        postings = self._postings[field]
+        bits = 0
+        for term in terms:
+            if field == "keyword":
+                # Every token of the keyword must appear
+                tokens = tokenize(term)
+                matched = self.all if tokens else 0
+                for token in tokens:
+                    matched &= postings.get(token, 0)
+            else:
+                matched = postings.get(term.casefold(), 0)
+            bits |= matched
+        return bits
+
+    def match(self, language: Terms = None, topic: Terms = None, owner: Terms = None, keyword: Terms = None) -> int:
+        """Bitset of the repos passing every given filter"""
+        bits = self.all
+        for field, value in zip(FIELDS, (language, topic, owner, keyword)):
+            terms = _terms(value)
+            if terms:
+                bits &= self._field(field, terms)
+                if not bits:
+                    break
+        return bits
+
+    @staticmethod
+    def positions(bits: int, limit: Optional[int] = None) -> List[int]:
+        """Set bit positions in ascending order, stopping after limit"""
+        # Scanning the binary string is cheaper than peeling the lowest
+        # bit off a wide int, which copies the whole int every step
+        digits = bin(bits)[:1:-1]
+        found = []
+        position = digits.find("1")
+        while position != -1 and (limit is None or len(found) < limit):
+            found.append(position)
+            position = digits.find("1", position + 1)
+        return found
+
+    def select(self, items: Sequence, limit: Optional[int] = None, **filters: Terms) -> List:
+        """The items (the same sequence the index was built from) passing the filters"""
+        return [items[position] for position in self.positions(self.match(**filters), limit)]
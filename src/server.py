@@ -1,37 +1,331 @@
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Dict, Literal, Optional
 import asyncio
+import json
+import os
+import secrets
+import time
+import uuid
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import replace
 from datetime import datetime
 
+from aggregates import WindowedStats
+from batching import SharedWindows, Window
 from github_adapter import GitHubAdapter
+from jobs import JobManager, ProgressJob, sse_format
+from metrics import REGISTRY
+from models import Repo, to_dicts
+from ranking import TopK
+from repo_index import RepoIndex
+from tracing import SamplingProfiler, span, start_trace
 from utils import setup_logging
+from loop_watchdog import LoopWatchdog
+from mcp_rpc import INVALID_REQUEST, PARSE_ERROR, MCPServer, Progress, error_response, progress_token, sse_event, serve_stdio
 
 logger = setup_logging()
 
+loop_watchdog = LoopWatchdog.from_env()
+# /debug endpoints answer only requests carrying this token in X-Debug-Token
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if loop_watchdog is not None:
+        loop_watchdog.start()
+    yield
+    await job_manager.close()
+    if loop_watchdog is not None:
+        await loop_watchdog.stop()
+
 app = FastAPI(
     title="AI Newsletter MCP Server",
     description="MCP server for AI newsletter generation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 github_adapter = GitHubAdapter()
 
+# Running weekly aggregates per search window, kept in the shared state backend
+stats_aggregator = WindowedStats(github_adapter.backend)
+
+# Background newsletter jobs whose progress is streamed over SSE (/jobs)
+job_manager = JobManager(
+    ttl=float(os.getenv("JOB_TTL", "600")),
+    max_running=int(os.getenv("JOB_MAX_RUNNING", "8"))
+)
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latency of server endpoints", ["method", "endpoint", "status"]
+)
+
 class NewsletterRequest(BaseModel):
-    days: Optional[int] = 7
+    # Not Optional: windows are grouped and compared by days (batch requests)
+    days: int = Field(7, ge=1)
     include_stats: Optional[bool] = True
     max_repos: Optional[int] = 10
+    incremental: Optional[bool] = False
+    enrich: Optional[bool] = False
 
 class NewsletterData(BaseModel):
     trending_repos: List[Dict]
     discussions: List[Dict]
     weekly_stats: Dict
     generation_timestamp: str
+    # Set when GitHub was degraded and this is the last known good response
+    stale: bool = False
+    snapshot_at: Optional[str] = None
+
+MAX_BATCH_REQUESTS = 20
+
+class NewsletterBatchRequest(BaseModel):
+    requests: List[NewsletterRequest] = Field(..., min_length=1, max_length=MAX_BATCH_REQUESTS)
+
+class NewsletterBatchData(BaseModel):
+    results: List[NewsletterData]
+    upstream_fetches: int
+    shared_fetches: int
+
+# Discussions per newsletter
+NEWSLETTER_DISCUSSIONS = 10
+
+# Endpoints a newsletter can't be built without
+SEARCH_ENDPOINTS = ["search/repositories", "search/issues"]
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", str(7 * 24 * 3600)))
+
+SNAPSHOTS_SERVED = REGISTRY.counter(
+    "newsletter_snapshots_served_total", "Stale last-known-good newsletter data served while GitHub was degraded"
+)
+
+class NewsletterJobRequest(NewsletterRequest):
+    enhance: Optional[bool] = False
+    format: Literal["markdown", "html", "text", "json"] = "markdown"
+
+# Seconds between SSE keep-alive comments on a quiet job stream
+JOB_HEARTBEAT = 15.0
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+
+    # Label by route template, not raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    endpoint = route.path if route is not None else "unmatched"
+    REQUEST_LATENCY.labels(request.method, endpoint, str(response.status_code)).observe(
+        time.perf_counter() - started
+    )
+    return response
+
+TRACE_TTL_SECONDS = 600
+
+def _debug_authorized(request: Request) -> bool:
+    """Whether the request carries the configured DEBUG_TOKEN (never, if none is set)"""
+    token = request.headers.get("x-debug-token", "")
+    return bool(DEBUG_TOKEN) and secrets.compare_digest(token, DEBUG_TOKEN)
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Opt-in tracing: X-Profile header or ?profile= with 'trace' (or 1) or 'cpu'
+
+    CPU profiling samples stacks every millisecond, so it needs the debug token.
+    """
+    mode = (request.headers.get("X-Profile") or request.query_params.get("profile") or "").lower()
+    if mode not in ("1", "true", "trace", "cpu"):
+        return await call_next(request)
+    if mode == "cpu" and not _debug_authorized(request):
+        return JSONResponse({"detail": "CPU profiling requires X-Debug-Token"}, status_code=403)
+
+    profiler = SamplingProfiler() if mode == "cpu" else None
+    with start_trace(f"{request.method} {request.url.path}") as trace:
+        if profiler is not None:
+            profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            if profiler is not None:
+                trace.cpu_profile = profiler.stop()
+
+    # Stored in the shared backend so any worker can serve /traces/{id}
+    await github_adapter.backend.set_json(
+        f"trace:{trace.trace_id}",
+        {"chrome": trace.to_chrome(), "otel": trace.to_otel()},
+        TRACE_TTL_SECONDS
+    )
+    response.headers["X-Trace-Id"] = trace.trace_id
+    return response
+
+@app.get("/traces/{trace_id}")
+async def get_trace(request: Request, trace_id: str, format: str = "chrome"):
+    """Fetch a recorded trace as Chrome trace JSON or OTLP/JSON (format=otel)"""
+    # Traces carry span names and CPU stacks: same gate as /debug
+    if not _debug_authorized(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    stored = await github_adapter.backend.get_json(f"trace:{trace_id}")
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Trace not found or expired")
+    if format not in stored:
+        raise HTTPException(status_code=400, detail="format must be 'chrome' or 'otel'")
+    return stored[format]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/loop-blocks")
+async def loop_blocks(request: Request):
+    """Recent callbacks that blocked the event loop, with their stacks"""
+    # Stacks leak internals: without a configured, matching token the endpoint doesn't exist
+    if not _debug_authorized(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if loop_watchdog is None:
+        return []
+    return list(loop_watchdog.reports)
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    # Degraded: GitHub search breakers are open and newsletter data is served stale
+    degraded = await github_adapter.breakers.degraded(SEARCH_ENDPOINTS)
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "degraded_endpoints": degraded,
+        "timestamp": datetime.now().isoformat()
+    }
+
+async def _refresh_counts(repo: Repo):
+    """Enrichment for ranked repos: live counts from the repo endpoint instead of the search index"""
+    return await github_adapter.repo_stats(repo.full_name)
+
+def _newsletter_ranking(request: NewsletterRequest) -> TopK:
+    # Only repos still in the top K keep their (optional) detail lookup,
+    # evicted ones have it cancelled
+    return TopK(
+        request.max_repos if request.max_repos is not None else float("inf"),
+        key=lambda repo: repo.stars,
+        identity=lambda repo: repo.full_name,
+        enrich=_refresh_counts if request.enrich else None
+    )
+
+async def _assemble_newsletter_data(
+    request: NewsletterRequest,
+    ranking: TopK,
+    trending_repos: List[Repo],
+    discussions: List,
+    progress: Optional[Progress] = None
+) -> NewsletterData:
+    """Rank, enrich and summarize fetched records into a response"""
+    try:
+        # Every fetched repo feeds the window's aggregates, not just the ones returned
+        await stats_aggregator.ingest(request.days, trending_repos)
+        ranking.extend(trending_repos)  # no-op for repos already seen via on_batch
+        
+        with span("rank", offered=ranking.offered, evicted=ranking.evicted):
+            ranked = await ranking.results()
+    finally:
+        ranking.cancel()
+    if progress is not None:
+        await progress(2, 3, "ranked")
+    
+    # Copies, not in-place updates: batched requests share the fetched records
+    trending_repos = [
+        repo if details is None else replace(repo, stars=details.stars, forks=details.forks, updated_at=details.updated_at)
+        for repo, details in ranked
+    ]
+    discussions = discussions[:NEWSLETTER_DISCUSSIONS]
+    
+    # Weekly stats come from the aggregates; no extra GitHub calls
+    weekly_stats = {}
+    if request.include_stats and trending_repos:
+        with span("stats", days=request.days):
+            weekly_stats = await stats_aggregator.summary(request.days)
+    if progress is not None:
+        await progress(3, 3, "stats")
+    
+    with span("validate"):
+        return NewsletterData(
+            trending_repos=to_dicts(trending_repos),
+            discussions=to_dicts(discussions),
+            weekly_stats=weekly_stats,
+            generation_timestamp=datetime.now().isoformat()
+        )
+
+def _snapshot_key(request: NewsletterRequest) -> str:
+    return f"snapshot:newsletter-data:{request.days}:{request.max_repos}:{bool(request.include_stats)}"
+
+async def _snapshot(request: NewsletterRequest) -> Optional[NewsletterData]:
+    """The last good data for these parameters if a search breaker is open
+
+    Checked before fetching, so a degraded GitHub is answered from the
+    snapshot at once instead of after every search short-circuits (and
+    is paced) in turn. None while healthy or when there is no snapshot.
+    """
+    degraded = await github_adapter.breakers.degraded(SEARCH_ENDPOINTS)
+    if not degraded:
+        return None
+    snapshot = await github_adapter.backend.get_json(_snapshot_key(request))
+    if snapshot is None:
+        return None
+    logger.warning(f"GitHub degraded ({', '.join(degraded)}); serving snapshot from {snapshot['generation_timestamp']}")
+    SNAPSHOTS_SERVED.inc()
+    return NewsletterData(**{**snapshot, "stale": True, "snapshot_at": snapshot["generation_timestamp"]})
+
+async def _last_known_good(request: NewsletterRequest, data: NewsletterData) -> NewsletterData:
+    """The live data, or the last good snapshot if a breaker opened during the fetch
+
+    Healthy, non-empty responses are stored as the snapshot for their
+    request parameters. If GitHub is degraded and a snapshot exists it is
+    served instead, marked stale with the time it was taken; without one
+    the (likely thin) live data goes out as is.
+    """
+    degraded = await github_adapter.breakers.degraded(SEARCH_ENDPOINTS)
+    if not degraded:
+        if data.trending_repos:
+            await github_adapter.backend.set_json(_snapshot_key(request), data.model_dump(mode="json"), SNAPSHOT_TTL)
+        return data
+
+    snapshot = await _snapshot(request)
+    if snapshot is None:
+        logger.warning(f"GitHub degraded ({', '.join(degraded)}) and no snapshot to fall back on")
+        return data
+    return snapshot
+
+async def collect_newsletter_data(request: NewsletterRequest, progress: Optional[Progress] = None) -> NewsletterData:
+    """Everything a newsletter needs: ranked repos, discussions and weekly stats
+
+    progress, if given, is awaited as (done, total, message) after each stage.
+    While GitHub's search breakers are open the last known good data is
+    returned instead, marked stale.
+    """
+    snapshot = await _snapshot(request)
+    if snapshot is not None:
+        return snapshot
+
+    # Rank while searches stream in
+    ranking = _newsletter_ranking(request)
+    
+    # Fetch data concurrently; records are parsed once at the adapter boundary
+    trending_repos_task = github_adapter.trending_repos(request.days, request.incremental, on_batch=ranking.extend)
+    discussions_task = github_adapter.discussions(request.days, request.incremental)
+    
+    try:
+        with span("search"):
+            trending_repos, discussions = await asyncio.gather(
+                trending_repos_task,
+                discussions_task
+            )
+    except BaseException:
+        ranking.cancel()
+        raise
+    if progress is not None:
+        await progress(1, 3, "searched")
+    
+    data = await _assemble_newsletter_data(request, ranking, trending_repos, discussions, progress)
+    return await _last_known_good(request, data)
 
 @app.post("/generate-newsletter-data", response_model=NewsletterData)
 async def generate_newsletter_data(request: NewsletterRequest):
@@ -40,59 +334,374 @@ async def generate_newsletter_data(request: NewsletterRequest):
     """
     try:
         logger.info(f"Generating newsletter data for last {request.days} days")
+        newsletter_data = await collect_newsletter_data(request)
         
-        # Fetch data concurrently
-        trending_repos_task = github_adapter.get_trending_ai_repos(request.days)
-        discussions_task = github_adapter.get_ai_discussions(request.days)
+        # Already validated above; serialize once instead of letting FastAPI re-validate
+        with span("serialize"):
+            return JSONResponse(newsletter_data.model_dump(mode="json"))
         
-        trending_repos, discussions = await asyncio.gather(
-            trending_repos_task,
-            discussions_task
+    except Exception as e:
+        logger.error(f"Error generating newsletter data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _fetch_window(days: int, incremental: bool) -> Window:
+    return tuple(await asyncio.gather(
+        github_adapter.trending_repos(days, incremental),
+        github_adapter.discussions(days, incremental)
+    ))
+
+@app.post("/generate-newsletter-data/batch", response_model=NewsletterBatchData)
+async def generate_newsletter_data_batch(batch: NewsletterBatchRequest):
+    """Several newsletter requests answered from a shared set of GitHub searches
+
+    Windows are resolved widest first, so a 30-day search can serve the
+    7-day and 1-day sub-requests after filtering by created_at (see
+    SharedWindows); each sub-request is then ranked, enriched and
+    summarized on its own. Results come back in request order.
+    """
+    try:
+        snapshots = {i: await _snapshot(request) for i, request in enumerate(batch.requests)}
+        snapshots = {i: snapshot for i, snapshot in snapshots.items() if snapshot is not None}
+        windows = SharedWindows(_fetch_window)
+        fetched: Dict[int, Window] = {}
+        order = sorted(
+            (i for i in range(len(batch.requests)) if i not in snapshots),
+            key=lambda i: batch.requests[i].days, reverse=True
+        )
+        with span("search", requests=len(batch.requests)):
+            for i in order:
+                request = batch.requests[i]
+                fetched[i] = await windows.window(
+                    request.days,
+                    bool(request.incremental),
+                    request.max_repos if request.max_repos is not None else float("inf"),
+                    NEWSLETTER_DISCUSSIONS
+                )
+        logger.info(
+            f"Batch of {len(batch.requests)} newsletter requests: "
+            f"{windows.upstream} upstream window(s), {windows.shared} shared"
         )
         
-        # Limit results
-        trending_repos = trending_repos[:request.max_repos]
-        discussions = discussions[:10]
+        live = await asyncio.gather(*(
+            _assemble_newsletter_data(batch.requests[i], _newsletter_ranking(batch.requests[i]), *fetched[i])
+            for i in order
+        ))
+        for i, result in zip(order, live):
+            snapshots[i] = await _last_known_good(batch.requests[i], result)
+        results = [snapshots[i] for i in range(len(batch.requests))]
         
-        # Generate weekly stats if requested
-        weekly_stats = {}
-        if request.include_stats and trending_repos:
-            stats_tasks = [
-                github_adapter.get_repo_stats(repo["full_name"]) 
-                for repo in trending_repos[:5]
-            ]
-            detailed_repos = await asyncio.gather(*stats_tasks)
-            
-            weekly_stats = {
-                "total_stars": sum(repo.get("stars", 0) for repo in detailed_repos),
-                "total_forks": sum(repo.get("forks", 0) for repo in detailed_repos),
-                "languages": list(set(repo.get("language") for repo in detailed_repos if repo.get("language"))),
-                "top_repos": detailed_repos[:3]
-            }
-        
-        return NewsletterData(
-            trending_repos=trending_repos,
-            discussions=discussions,
-            weekly_stats=weekly_stats,
-            generation_timestamp=datetime.now().isoformat()
-        )
+        with span("serialize"):
+            return JSONResponse({
+                "results": [result.model_dump(mode="json") for result in results],
+                "upstream_fetches": windows.upstream,
+                "shared_fetches": windows.shared
+            })
         
     except Exception as e:
-        logger.error(f"Error generating newsletter data: {e}")
+        logger.error(f"Error generating batched newsletter data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+_enhancer = None
+
+def _newsletter_enhancer():
+    """Claude enhancement for jobs, through the client's prompt and fallback logic"""
+    global _enhancer
+    if _enhancer is None:
+        from client import MCPNewsletterClient
+        _enhancer = MCPNewsletterClient()
+    return _enhancer
+
+async def _newsletter_job(job: ProgressJob, request: NewsletterJobRequest) -> Dict:
+    """Search, rank, summarize, render and optionally enhance, publishing as it goes
+
+    Events: progress after each stage (searched, ranked, stats, rendered,
+    enhanced), render with the basic newsletter as soon as it exists, token
+    for each piece of enhanced text, then the result.
+    """
+    from newsletter import NewsletterGenerator
+
+    enhance = bool(request.enhance) and request.format == "markdown"
+    total = 5 if enhance else 4
+
+    async def progress(done: int, _total: int, stage: str):
+        job.publish("progress", {"stage": stage, "done": done, "total": total})
+
+    data = (await collect_newsletter_data(request, progress)).model_dump(mode="json")
+
+    text = NewsletterGenerator().generate_newsletter(data, request.format)
+    await progress(4, total, "rendered")
+    job.publish("render", {"format": request.format, "text": text})
+    if not enhance:
+        return {"format": request.format, "text": text, "enhanced": False}
+
+    enhanced = await _newsletter_enhancer()._enhance_with_claude(
+        text, data, on_text=lambda delta: job.publish("token", {"text": delta})
+    )
+    await progress(5, total, "enhanced")
+    # The client falls back to the basic newsletter when Claude fails
+    return {"format": request.format, "text": enhanced, "enhanced": enhanced != text}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: NewsletterJobRequest):
+    """Start a newsletter generation in the background; follow it at /jobs/{id}/events"""
+    try:
+        job = job_manager.submit("newsletter", lambda job: _newsletter_job(job, request))
+    except RuntimeError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(
+        {"job_id": job.id, "status": job.status, "events": f"/jobs/{job.id}/events"},
+        status_code=202
+    )
+
+def _job_or_404(job_id: str) -> ProgressJob:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found, expired or owned by another worker")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """A job's status, and its result once done"""
+    return _job_or_404(job_id).snapshot()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, after: int = 0):
+    """The job's events as server-sent events, from the start or after Last-Event-ID
+
+    Late subscribers get the events so far replayed first; the stream ends
+    after the result or error event. Quiet periods send keep-alive comments
+    so proxies don't time the connection out.
+    """
+    job = _job_or_404(job_id)
+    try:
+        after = int(request.headers.get("Last-Event-ID", after))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an event id")
+
+    async def frames():
+        async for event in job.subscribe(after, heartbeat=JOB_HEARTBEAT):
+            yield sse_format(event)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a running job; subscribers get an error event"""
+    job = _job_or_404(job_id)
+    return {"job_id": job.id, "cancelled": job_manager.cancel(job.id)}
+
+# Index of the most recent trending snapshot, rebuilt only when the snapshot changes
+_repo_index: Optional[tuple] = None
+
+def repo_index_for(repos: List[Dict]) -> RepoIndex:
+    global _repo_index
+    fingerprint = tuple((r.get("full_name"), r.get("updated_at"), r.get("stargazers_count")) for r in repos)
+    if _repo_index is None or _repo_index[0] != fingerprint:
+        _repo_index = (fingerprint, RepoIndex(repos))
+    return _repo_index[1]
+
 @app.get("/trending-repos")
-async def get_trending_repos(days: int = 7, limit: int = 10):
-    """Get trending AI repositories"""
-    repos = await github_adapter.get_trending_ai_repos(days)
+async def get_trending_repos(
+    days: int = 7,
+    limit: int = 10,
+    incremental: bool = False,
+    language: Optional[str] = None,
+    topic: Optional[str] = None,
+    owner: Optional[str] = None,
+    q: Optional[str] = None
+):
+    """Get trending AI repositories
+    
+    language, topic and owner take comma-separated alternatives and q
+    comma-separated keywords; different filters must all match.
+    """
+    repos = await github_adapter.get_trending_ai_repos(days, incremental)
+    await stats_aggregator.ingest(days, repos)
+    if language or topic or owner or q:
+        return repo_index_for(repos).select(repos, limit, language=language, topic=topic, owner=owner, keyword=q)
     return repos[:limit]
 
+def ndjson_response(items: AsyncIterator[Dict]) -> StreamingResponse:
+    """Stream items as newline-delimited JSON, one line per item
+
+    The generator is only advanced when the previous line has been handed
+    to the transport, which waits while the client isn't reading, so a slow
+    reader throttles upstream pagination instead of growing a buffer.
+    """
+    async def lines():
+        async with aclosing(items):
+            async for item in items:
+                yield json.dumps(item, separators=(",", ":")) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/trending-repos/stream")
+async def stream_trending_repos(days: int = 7, limit: int = 1000):
+    """Trending AI repositories as NDJSON, paginated on demand"""
+    return ndjson_response(github_adapter.iter_trending_repos(days, max_items=limit))
+
+@app.get("/ai-discussions/stream")
+async def stream_ai_discussions(days: int = 7, limit: int = 1000):
+    """AI discussions as NDJSON, paginated on demand"""
+    return ndjson_response(github_adapter.iter_ai_discussions(days, max_items=limit))
+
+@app.get("/weekly-stats")
+async def get_weekly_stats(days: int = 7, top: int = 3):
+    """Running weekly stats over the repositories of a days-long window"""
+    return await stats_aggregator.summary(days, top)
+
 @app.get("/ai-discussions") 
-async def get_ai_discussions(days: int = 7, limit: int = 10):
+async def get_ai_discussions(days: int = 7, limit: int = 10, incremental: bool = False):
     """Get trending AI discussions"""
-    discussions = await github_adapter.get_ai_discussions(days)
+    discussions = await github_adapter.get_ai_discussions(days, incremental)
     return discussions[:limit]
 
+# MCP over JSON-RPC: the same data as tools, for agent clients that keep a
+# session open (POST /mcp) or run the server as a subprocess (--stdio)
+mcp_server = MCPServer("ai-newsletter", app.version)
+
+MCP_SESSION_TTL = 3600
+
+DAYS = {"type": "integer", "description": "Days to look back", "default": 7}
+LIMIT = {"type": "integer", "description": "Maximum number of items", "default": 10}
+
+@mcp_server.tool(
+    "get_trending_repos",
+    "Trending AI repositories, optionally filtered; filters take comma-separated alternatives",
+    {
+        "days": DAYS,
+        "limit": LIMIT,
+        "language": {"type": "string"},
+        "topic": {"type": "string"},
+        "owner": {"type": "string"},
+        "q": {"type": "string", "description": "Keywords matched against name and description"}
+    }
+)
+async def trending_repos_tool(progress: Progress, days: int = 7, limit: int = 10, language: Optional[str] = None,
+                              topic: Optional[str] = None, owner: Optional[str] = None, q: Optional[str] = None):
+    return await get_trending_repos(days, limit, False, language, topic, owner, q)
+
+@mcp_server.tool("get_ai_discussions", "Trending AI issues and discussions", {"days": DAYS, "limit": LIMIT})
+async def discussions_tool(progress: Progress, days: int = 7, limit: int = 10):
+    return await get_ai_discussions(days, limit, False)
+
+@mcp_server.tool("get_weekly_stats", "Running weekly stats over the repositories of a days-long window",
+                 {"days": DAYS, "top": {"type": "integer", "default": 3}})
+async def weekly_stats_tool(progress: Progress, days: int = 7, top: int = 3):
+    return await get_weekly_stats(days, top)
+
+# Same defaults as the REST endpoints, so both transports return the same data
+MAX_REPOS_DEFAULT = NewsletterRequest.model_fields["max_repos"].default
+INCLUDE_STATS_DEFAULT = NewsletterRequest.model_fields["include_stats"].default
+
+NEWSLETTER_ARGUMENTS = {
+    "days": DAYS,
+    "max_repos": {"type": "integer", "default": MAX_REPOS_DEFAULT},
+    "include_stats": {"type": "boolean", "default": INCLUDE_STATS_DEFAULT}
+}
+
+@mcp_server.tool("generate_newsletter_data", "Ranked repos, discussions and weekly stats for a newsletter",
+                 NEWSLETTER_ARGUMENTS)
+async def newsletter_data_tool(progress: Progress, days: int = 7, max_repos: int = MAX_REPOS_DEFAULT,
+                               include_stats: bool = INCLUDE_STATS_DEFAULT):
+    request = NewsletterRequest(days=days, max_repos=max_repos, include_stats=include_stats)
+    return (await collect_newsletter_data(request, progress)).model_dump(mode="json")
+
+@mcp_server.tool(
+    "render_newsletter",
+    "The newsletter itself, rendered without Claude enhancement",
+    {**NEWSLETTER_ARGUMENTS, "format": {"type": "string", "enum": ["markdown", "html", "text", "json"], "default": "markdown"}}
+)
+async def render_newsletter_tool(progress: Progress, days: int = 7, max_repos: int = MAX_REPOS_DEFAULT,
+                                 include_stats: bool = INCLUDE_STATS_DEFAULT, format: str = "markdown"):
+    from newsletter import NewsletterGenerator
+
+    request = NewsletterRequest(days=days, max_repos=max_repos, include_stats=include_stats)
+    data = (await collect_newsletter_data(request, progress)).model_dump(mode="json")
+    return NewsletterGenerator().generate_newsletter(data, format)
+
+async def serve_mcp_stdio():
+    await serve_stdio(mcp_server)
+
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    """Streamable HTTP transport for MCP
+
+    initialize opens a session (Mcp-Session-Id response header, kept in the
+    shared backend so any worker can serve it); later posts must carry it.
+    Posts with only notifications get 202. Requests answer with JSON, or
+    with an SSE stream of progress notifications followed by the response
+    when the client accepts text/event-stream and asked for progress.
+    """
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        return JSONResponse(error_response(None, PARSE_ERROR, "Parse error"), status_code=400)
+
+    messages = payload if isinstance(payload, list) else [payload]
+    headers = {}
+    session_id = request.headers.get("Mcp-Session-Id")
+    if any(isinstance(m, dict) and m.get("method") == "initialize" for m in messages):
+        session_id = uuid.uuid4().hex
+        headers["Mcp-Session-Id"] = session_id
+    elif not session_id:
+        return JSONResponse(error_response(None, INVALID_REQUEST, "Missing Mcp-Session-Id header"), status_code=400)
+    elif await github_adapter.backend.get(f"mcp:session:{session_id}") is None:
+        return JSONResponse(error_response(None, INVALID_REQUEST, "Unknown or expired session"), status_code=404)
+    # Every use extends the session
+    await github_adapter.backend.set(f"mcp:session:{session_id}", "1", MCP_SESSION_TTL)
+
+    if not any(isinstance(m, dict) and "id" in m for m in messages):
+        await mcp_server.handle(payload)
+        return Response(status_code=202, headers=headers)
+
+    if "text/event-stream" not in request.headers.get("accept", "") or not any(map(progress_token, messages)):
+        return JSONResponse(await mcp_server.handle(payload), headers=headers)
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            response = await mcp_server.handle(payload, queue.put)
+            if response is not None:
+                await queue.put(response)
+        finally:
+            await queue.put(None)
+
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            while (message := await queue.get()) is not None:
+                yield sse_event(message)
+        finally:
+            # Client went away mid-call
+            task.cancel()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+@app.delete("/mcp")
+async def mcp_close_session(request: Request):
+    """End an MCP session"""
+    session_id = request.headers.get("Mcp-Session-Id")
+    if session_id:
+        await github_adapter.backend.delete(f"mcp:session:{session_id}")
+    return Response(status_code=204)
+
 if __name__ == "__main__":
+    import sys
+
+    # `server.py --stdio` serves MCP to a parent process instead of HTTP
+    if "--stdio" in sys.argv:
+        asyncio.run(serve_mcp_stdio())
+        sys.exit()
+
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    # Workers share caches and the GitHub budget through STATE_BACKEND_URL
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    port = int(os.getenv("PORT", "8000"))
+    uvicorn.run("server:app" if workers > 1 else app, host="0.0.0.0", port=port, workers=workers)
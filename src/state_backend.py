@@ -0,0 +1,336 @@
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_STATE_BACKEND_URL = "sqlite:///.newsletter_state/state.db"
+
+class LockTimeout(Exception):
+    """Raised when a single-flight lock could not be acquired in time"""
+
+class StateBackend(ABC):
+    """Key/value store shared by every worker: caches, budgets and locks
+
+    Values are strings; TTLs are in seconds. Subclasses implement the four
+    primitives below, the JSON and locking helpers are built on top of them.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_missing: bool = False) -> bool:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1) -> int:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    async def close(self):
+        pass
+
+    async def get_json(self, key: str) -> Any:
+        value = await self.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.set(key, json.dumps(value), ttl)
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = 30.0, timeout: float = 30.0, poll_interval: float = 0.05):
+        """Hold a cross-worker lock; the TTL frees it if the holder dies"""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+
+        # Poll with reads; only try to take the lock once it looks free
+        while await self.get(f"lock:{key}") is not None or \
+                not await self.set(f"lock:{key}", token, ttl, only_if_missing=True):
+            if time.monotonic() > deadline:
+                raise LockTimeout(f"Timed out waiting for lock {key}")
+            await asyncio.sleep(poll_interval)
+
+        try:
+            yield
+        finally:
+            # Only release our own lock, not one re-acquired after our TTL expired
+            if await self.get(f"lock:{key}") == token:
+                await self.delete(f"lock:{key}")
+
+class MemoryBackend(StateBackend):
+    """Per-process backend, used for tests and single-worker runs
+
+    Expired entries are hidden on read and swept every `sweep_every` writes,
+    so keys that are never read again don't pile up.
+    """
+
+    def __init__(self, sweep_every: int = 1000):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}
+        self.sweep_every = sweep_every
+        self._writes = 0
+
+    def _sweep(self):
+        self._writes += 1
+        if self._writes % self.sweep_every:
+            return
+        now = time.time()
+        for key in [key for key, (_, expires_at) in self._data.items() if expires_at is not None and expires_at <= now]:
+            del self._data[key]
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._live(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_missing: bool = False) -> bool:
+        if only_if_missing and self._live(key) is not None:
+            return False
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._sweep()
+        return True
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        current = self._live(key)
+        expires_at = self._data[key][1] if current is not None else None
+        value = int(current or 0) + amount
+        self._data[key] = (str(value), expires_at)
+        return value
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+class SQLiteBackend(StateBackend):
+    """Local-file backend shared by all workers on one host
+
+    sqlite3 calls block, and under write contention from other workers a
+    statement can wait on the database lock for up to `busy_timeout`
+    seconds, so they run on one dedicated thread (which also serialises
+    use of the connection) instead of on the event loop. Expired rows are
+    deleted every `sweep_every` writes so the file doesn't grow without bound.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0, sweep_every: int = 1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=busy_timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS kv_expires ON kv (expires_at)")
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-state")
+
+    async def _run(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._run(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_missing: bool = False) -> bool:
+        return await self._run(self._set, key, value, ttl, only_if_missing)
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self._run(self._incr, key, amount)
+
+    async def delete(self, key: str):
+        await self._run(self.conn.execute, "DELETE FROM kv WHERE key = ?", (key,))
+
+    async def close(self):
+        await self._run(self.conn.close)
+        self._executor.shutdown()
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _sweep(self, now: float):
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+
+    def _set(self, key: str, value: str, ttl: Optional[float], only_if_missing: bool) -> bool:
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        self._sweep(now)
+
+        if only_if_missing:
+            # Insert, or take over the row only if the previous holder expired
+            cursor = self.conn.execute(
+                """INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+                   WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?""",
+                (key, value, expires_at, now)
+            )
+            return cursor.rowcount > 0
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at)
+        )
+        return True
+
+    def _incr(self, key: str, amount: int) -> int:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM kv WHERE key = ? AND expires_at <= ?", (key, now))
+            self.conn.execute(
+                """INSERT INTO kv (key, value, expires_at) VALUES (?, ?, NULL)
+                   ON CONFLICT(key) DO UPDATE SET value = CAST(kv.value AS INTEGER) + ?""",
+                (key, str(amount), amount)
+            )
+            value = self.conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0]
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return int(value)
+
+class RedisBackend(StateBackend):
+    """Backend speaking the Redis protocol (RESP2) over one persistent connection
+
+    Works against Redis, Valkey, KeyDB or any stand-in implementing GET, SET
+    (NX/PX), INCRBY and DEL.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(*args: Any) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {payload.decode()}")
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(payload)
+            return None if count < 0 else [await self._read_reply() for _ in range(count)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._roundtrip("AUTH", self.password)
+        if self.db:
+            await self._roundtrip("SELECT", self.db)
+
+    async def _roundtrip(self, *args: Any) -> Any:
+        self._writer.write(self._encode(*args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def execute(self, *args: Any, idempotent: bool = True) -> Any:
+        """Run one command; idempotent ones are retried once on a fresh connection
+
+        A dropped connection may have lost only the reply, so commands that
+        must not apply twice (INCRBY, SET NX) are never re-sent.
+        """
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                await self._connect()
+            try:
+                return await self._roundtrip(*args)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                if not idempotent:
+                    self._writer.close()
+                    self._writer = None
+                    raise
+                # One reconnect attempt; a second failure propagates
+                await self._connect()
+                return await self._roundtrip(*args)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None, only_if_missing: bool = False) -> bool:
+        args: List[Any] = ["SET", key, value]
+        if ttl:
+            args += ["PX", int(ttl * 1000)]
+        if only_if_missing:
+            args.append("NX")
+        return await self.execute(*args, idempotent=not only_if_missing) == "OK"
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        return await self.execute("INCRBY", key, amount, idempotent=False)
+
+    async def delete(self, key: str):
+        await self.execute("DEL", key)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+def create_backend(url: Optional[str] = None) -> StateBackend:
+    """Build a backend from a URL: memory://, sqlite:///path or redis://host:port/db"""
+    url = url or os.getenv("STATE_BACKEND_URL", DEFAULT_STATE_BACKEND_URL)
+    parsed = urlparse(url)
+
+    if parsed.scheme == "memory":
+        return MemoryBackend()
+    if parsed.scheme == "sqlite":
+        # sqlite:///relative/path.db, sqlite:////absolute/path.db
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if parsed.scheme == "redis":
+        return RedisBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password
+        )
+
+    raise ValueError(f"Unsupported STATE_BACKEND_URL: {url}")
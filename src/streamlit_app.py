@@ -1,7 +1,6 @@
 
 import streamlit as st
 import asyncio
-from client import MCPNewsletterClient
 from datetime import datetime
 import os
 
@@ -14,6 +13,14 @@ st.set_page_config(
 st.title("🤖 AI Newsletter Generator")
 st.markdown("Generate AI newsletters using GitHub data via MCP server")
 
+@st.cache_resource
+def get_client(server_url: str):
+    # Streamlit re-runs this script on every interaction; import the client
+    # stack and build the client once, and only when a newsletter is requested
+    from client import MCPNewsletterClient
+    
+    return MCPNewsletterClient(server_url)
+
 # Sidebar configuration
 st.sidebar.header("⚙️ Configuration")
 
@@ -38,32 +45,51 @@ if st.button("🚀 Generate Newsletter", type="primary"):
     if not github_token or not anthropic_key:
         st.error("Please set required environment variables")
     else:
-        with st.spinner("Generating newsletter... This may take a minute."):
+        newsletter = None
+        with st.status("Generating newsletter...", expanded=True) as status:
             try:
-                # Run async function
-                client = MCPNewsletterClient(server_url)
-                newsletter = asyncio.run(client.generate_newsletter(
-                    days=days,
-                    enhance_with_claude=enhance_with_claude
-                ))
+                # The server runs the generation as a job and streams progress,
+                # the basic newsletter and then Claude's text as it is written
+                client = get_client(server_url)
+                preview = st.empty()
+                streamed = []
                 
-                # Display results
-                st.success("✅ Newsletter generated successfully!")
+                def show(event, data):
+                    if event == "progress":
+                        status.update(label=f"Generating newsletter... {data['stage']} ({data['done']}/{data['total']})")
+                    elif event == "render":
+                        preview.markdown(data["text"])
+                    elif event == "token":
+                        streamed.append(data["text"])
+                        preview.markdown("".join(streamed))
                 
-                # Show newsletter
-                st.markdown("### 📄 Generated Newsletter")
-                st.markdown(newsletter)
-                
-                # Download option
-                st.download_button(
-                    label="📥 Download Newsletter",
-                    data=newsletter,
-                    file_name=f"ai_newsletter_{datetime.now().strftime('%Y%m%d')}.md",
-                    mime="text/markdown"
-                )
+                newsletter = asyncio.run(client.generate_via_job(
+                    days=days,
+                    enhance_with_claude=enhance_with_claude,
+                    on_event=show
+                ))
+                preview.empty()
+                status.update(label="Newsletter generated", state="complete", expanded=False)
                 
             except Exception as e:
+                status.update(label="Generation failed", state="error")
                 st.error(f"❌ Error generating newsletter: {str(e)}")
+        
+        if newsletter is not None:
+            # Display results
+            st.success("✅ Newsletter generated successfully!")
+            
+            # Show newsletter
+            st.markdown("### 📄 Generated Newsletter")
+            st.markdown(newsletter)
+            
+            # Download option
+            st.download_button(
+                label="📥 Download Newsletter",
+                data=newsletter,
+                file_name=f"ai_newsletter_{datetime.now().strftime('%Y%m%d')}.md",
+                mime="text/markdown"
+            )
 
 # Test server connection
 st.header("🔧 Server Status")
@@ -86,3 +112,12 @@ st.markdown("""
    ```bash
    export GITHUB_TOKEN="your_github_token"
    export ANTHROPIC_API_KEY="your_anthropic_key"
+   ```
+
+2. **Start the MCP server:**
+   ```bash
+   python src/server.py
+   ```
+
+3. **Pick the look-back window and options in the sidebar, then click "Generate Newsletter".**
+""")
@@ -0,0 +1,178 @@
+
+import asyncio
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[int]] = ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+class Trace:
+    """Nested timing spans recorded for one profiled request"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Dict] = []
+        self.cpu_profile: Optional[Dict] = None
+        self._origin_ns = time.perf_counter_ns()
+        self._origin_wall_ns = time.time_ns()
+        self._task_rows: Dict[int, int] = {}
+
+    def _row(self) -> int:
+        """One timeline row per asyncio task so concurrent spans don't overlap"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return self._task_rows.setdefault(id(task), len(self._task_rows) + 1)
+
+    def to_chrome(self) -> Dict:
+        """Chrome trace event format (chrome://tracing, Perfetto, speedscope)"""
+        pid = os.getpid()
+        events = [
+            {
+                "name": s["name"],
+                "ph": "X",
+                "ts": (s["start_ns"] - self._origin_ns) / 1000,
+                "dur": (s["end_ns"] - s["start_ns"]) / 1000,
+                "pid": pid,
+                "tid": s["row"],
+                "args": {**s["attributes"], "span_id": s["span_id"], "parent_id": s["parent_id"]}
+            }
+            for s in self.spans
+        ]
+        document = {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace_id": self.trace_id}}
+        if self.cpu_profile is not None:
+            document["cpuProfile"] = self.cpu_profile
+        return document
+
+    def to_otel(self) -> Dict:
+        """OTLP/JSON export (resourceSpans), importable by OpenTelemetry collectors"""
+        offset = self._origin_wall_ns - self._origin_ns
+        spans = [
+            {
+                "traceId": self.trace_id,
+                "spanId": f"{s['span_id']:016x}",
+                "parentSpanId": f"{s['parent_id']:016x}" if s["parent_id"] else "",
+                "name": s["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(s["start_ns"] + offset),
+                "endTimeUnixNano": str(s["end_ns"] + offset),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}}
+                    for key, value in s["attributes"].items()
+                ]
+            }
+            for s in self.spans
+        ]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "ai-newsletter-mcp"}}]},
+                "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}]
+            }]
+        }
+
+@contextmanager
+def start_trace(name: str):
+    """Activate a trace for the current context; spans opened inside are recorded"""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record a timing span if a trace is active; a near-free no-op otherwise"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    span_id = next(_span_ids)
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    start_ns = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+        trace.spans.append({
+            "name": name,
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "start_ns": start_ns,
+            "end_ns": end_ns,
+            "row": trace._row(),
+            "attributes": attributes
+        })
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping an async function in a span named after it"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread
+
+    The result is a folded-stack histogram ("a;b;c" -> samples), the input
+    format of flamegraph.pl and speedscope. Everything running on the sampled
+    thread is captured, including other requests sharing the event loop.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.001, max_depth: int = 64):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return {
+            "interval_ms": self.interval * 1000,
+            "total_samples": sum(self.samples.values()),
+            "folded": dict(self.samples.most_common())
+        }
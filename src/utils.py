@@ -1,13 +1,12 @@
 
-## 🧪 Step 7: Utility Functions
-
-Create `src/utils.py`:
-
-```python
 import logging
 import sys
 from datetime import datetime
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+# Characters stripped from descriptions and discussion bodies: # * [ ] `
+MARKDOWN_STRIP_TABLE = str.maketrans("", "", "#*[]`")
 
 def setup_logging(level=logging.INFO) -> logging.Logger:
     """Setup logging configuration"""
@@ -38,17 +37,38 @@ def truncate_text(text: str, max_length: int = 150) -> str:
     
     return text[:max_length].rsplit(' ', 1)[0] + "..."
 
+def strip_markdown(text: str) -> str:
+    """Remove markdown emphasis, heading, link and code characters"""
+    return text.translate(MARKDOWN_STRIP_TABLE)
+
 def clean_repo_description(description: str) -> str:
     """Clean and format repository descriptions"""
     if not description:
         return "No description available"
     
-    # Remove common markdown and special characters
-    import re
-    cleaned = re.sub(r'[#\*\[\]`]', '', description)
-    cleaned = cleaned.strip()
-    
-    return truncate_text(cleaned, 200)
+    return _clean_description(description, 200)
+
+@lru_cache(maxsize=8192)
+def _clean_description(description: str, max_length: int) -> str:
+    # Memoized: the same repos recur across sections, variants and editions
+    return truncate_text(description.translate(MARKDOWN_STRIP_TABLE).strip(), max_length)
+
+def clean_descriptions(descriptions: Iterable[Optional[str]], max_length: int = 200) -> List[str]:
+    """Batch clean_repo_description: strip markdown and word-truncate a whole list"""
+    clean = _clean_description
+    return [
+        clean(description, max_length) if description else "No description available"
+        for description in descriptions
+    ]
+
+def strip_markdown_batch(texts: Iterable[str]) -> List[str]:
+    """Batch strip_markdown (plus whitespace trim) over a list of texts"""
+    table = MARKDOWN_STRIP_TABLE
+    return [text.translate(table).strip() for text in texts]
+
+def truncate_texts(texts: Iterable[Optional[str]], max_length: int = 150) -> List[str]:
+    """Batch truncate_text over a list of texts"""
+    return [truncate_text(text, max_length) for text in texts]
 
 def validate_github_data(repo_data: Dict) -> bool:
     """Validate that repository data has required fields"""
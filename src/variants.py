@@ -0,0 +1,159 @@
+
+import gc
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import REGISTRY
+from newsletter import NewsletterGenerator
+from repo_index import RepoIndex
+
+VARIANTS_RENDERED = REGISTRY.counter(
+    "newsletter_variants_rendered_total", "Per-subscriber newsletter variants rendered", ["mode"]
+)
+
+@dataclass(slots=True, frozen=True)
+class Variant:
+    """One subscriber's cut of the shared snapshot
+
+    Empty filters mean no filter. Within a filter the terms are
+    alternatives (any topic will do); all given filters must hold.
+    See RepoIndex for the matching rules.
+    """
+    id: str
+    languages: Tuple[str, ...] = ()
+    topics: Tuple[str, ...] = ()
+    max_repos: Optional[int] = None
+    max_discussions: Optional[int] = None
+    format: str = "markdown"
+    owners: Tuple[str, ...] = ()
+    keywords: Tuple[str, ...] = ()
+
+    @property
+    def filtered(self) -> bool:
+        return bool(self.languages or self.topics or self.owners or self.keywords)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Variant":
+        return cls(
+            str(data["id"]),
+            tuple(data.get("languages") or ()),
+            tuple(data.get("topics") or ()),
+            data.get("max_repos"),
+            data.get("max_discussions"),
+            data.get("format", "markdown"),
+            tuple(data.get("owners") or ()),
+            tuple(data.get("keywords") or ())
+        )
+
+def render_variant(
+    generator: NewsletterGenerator, snapshot: Dict, variant: Variant, index: Optional[RepoIndex] = None
+) -> str:
+    """Render one variant from an already parsed snapshot (see NewsletterGenerator._parse)
+
+    Pass the snapshot's RepoIndex when rendering many variants; without one
+    an index is built for this call.
+    """
+    repos = snapshot["trending_repos"]
+    if variant.filtered:
+        if index is None:
+            index = RepoIndex(repos)
+        repos = index.select(
+            repos, language=variant.languages, topic=variant.topics, owner=variant.owners, keyword=variant.keywords
+        )
+    discussions = snapshot["discussions"]
+
+    data = dict(snapshot)
+    data["trending_repos"] = repos[:variant.max_repos]
+    data["discussions"] = discussions[:variant.max_discussions]
+    return generator.generate_newsletter(data, variant.format)
+
+# Per-worker state. Under fork the workers inherit the parent's parsed
+# snapshot copy-on-write; under spawn it is pickled once per worker by the
+# pool initializer, never once per task.
+_worker_snapshot: Optional[Dict] = None
+_worker_index: Optional[RepoIndex] = None
+_worker_generator: Optional[NewsletterGenerator] = None
+
+def _init_worker(snapshot: Dict, index: RepoIndex):
+    global _worker_snapshot, _worker_index, _worker_generator
+    _worker_snapshot = snapshot
+    _worker_index = index
+    _worker_generator = NewsletterGenerator()
+
+def _render_chunk(variants: List[Variant]) -> List[Tuple[str, str]]:
+    return [
+        (variant.id, render_variant(_worker_generator, _worker_snapshot, variant, _worker_index))
+        for variant in variants
+    ]
+
+def _chunks(variants: Iterable[Variant], size: int) -> Iterator[List[Variant]]:
+    chunk = []
+    for variant in variants:
+        chunk.append(variant)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class VariantRenderer:
+    """Render many variants of one data snapshot across a process pool
+
+    The snapshot is parsed into records and indexed once, before the
+    workers start, and handed to them at pool start-up; tasks only carry
+    small Variant chunks in and rendered strings out. With workers=1 everything runs
+    in-process. Reuse one renderer for successive batches of the same
+    snapshot to keep the pool warm.
+    """
+
+    def __init__(self, data: Dict, workers: Optional[int] = None, chunksize: int = 64):
+        self.generator = NewsletterGenerator()
+        self.snapshot = self.generator._parse(data)
+        self.index = RepoIndex(self.snapshot["trending_repos"])
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            # Move everything allocated so far out of the collector's reach so
+            # GC passes in the children don't touch (and copy) the shared pages
+            gc.freeze()
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=context, initializer=_init_worker, initargs=(self.snapshot, self.index)
+            )
+        return self._pool
+
+    def render(self, variants: Iterable[Variant]) -> Iterator[Tuple[str, str]]:
+        """Yield (variant id, content) in input order"""
+        if self.workers == 1:
+            for variant in variants:
+                VARIANTS_RENDERED.labels("inline").inc()
+                yield variant.id, render_variant(self.generator, self.snapshot, variant, self.index)
+            return
+
+        for results in self._executor().map(_render_chunk, _chunks(variants, self.chunksize)):
+            VARIANTS_RENDERED.labels("pool").inc(len(results))
+            yield from results
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            gc.unfreeze()
+
+    def __enter__(self) -> "VariantRenderer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def render_batch(data: Dict, variants: Iterable[Variant], workers: Optional[int] = None, chunksize: int = 64) -> Dict[str, str]:
+    """Render every variant of one snapshot; returns {variant id: content}"""
+    with VariantRenderer(data, workers, chunksize) as renderer:
+        return dict(renderer.render(variants))
@@ -0,0 +1,56 @@
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from state_backend import StateBackend
+
+class WatermarkStore:
+    """Persist a high-water mark and the fetched window for each search query"""
+
+    def __init__(self, backend: StateBackend):
+        self.backend = backend
+
+    async def get(self, key: str) -> Dict:
+        """Return the stored state for a query key (empty dict if never fetched)"""
+        return await self.backend.get_json(f"watermark:{key}") or {}
+
+    async def put(self, key: str, state: Dict):
+        """Store the state for a query key"""
+        await self.backend.set_json(f"watermark:{key}", state)
+
+def parse_github_time(value: str) -> datetime:
+    """Parse GitHub's ISO timestamps (with trailing Z) into aware datetimes"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def needs_full_scan(state: Dict, window_start: datetime, refresh_after: timedelta) -> bool:
+    """Decide whether the stored window can be topped up or must be re-fetched"""
+    if not state.get("watermark") or not state.get("scanned_at"):
+        return True
+
+    # Watermark older than the window means the stored items are useless
+    if parse_github_time(state["watermark"]) < window_start:
+        return True
+
+    # Re-scan regularly so star/reaction counts of stored items stay fresh
+    scanned_at = parse_github_time(state["scanned_at"])
+    return datetime.now(timezone.utc) - scanned_at > refresh_after
+
+def merge_window(
+    stored: List[Dict],
+    fresh: List[Dict],
+    window_start: datetime,
+    sort_key: Callable[[Dict], int],
+    limit: int = 100
+) -> List[Dict]:
+    """Merge newly fetched items into the stored window, dropping expired ones"""
+    merged = {}
+    for item in stored + fresh:  # fresh copies overwrite stored ones
+        merged[item.get("id", item.get("html_url"))] = item
+
+    in_window = [
+        item for item in merged.values()
+        if item.get("created_at") and parse_github_time(item["created_at"]) >= window_start
+    ]
+    in_window.sort(key=sort_key, reverse=True)
+
+    return in_window[:limit]
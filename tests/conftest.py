@@ -0,0 +1,9 @@
+
+import os
+import sys
+
+# Modules in src/ import each other by bare name (from utils import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# Keep adapter caches and watermarks per-process so tests never share state
+os.environ["STATE_BACKEND_URL"] = "memory://"
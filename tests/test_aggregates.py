@@ -0,0 +1,103 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from src.aggregates import StatsAggregator, WindowedStats
+from src.state_backend import MemoryBackend
+
+
+def make_repo(name, stars, forks=0, language="Python"):
+    return {
+        "name": name,
+        "full_name": f"org/{name}",
+        "owner": {"login": "org"},
+        "stargazers_count": stars,
+        "forks_count": forks,
+        "language": language
+    }
+
+
+MONDAY = datetime(2025, 9, 8, 12, tzinfo=timezone.utc)
+
+
+class TestStatsAggregator:
+    """Test incremental weekly aggregates"""
+
+    def test_totals_and_breakdown(self):
+        aggregator = StatsAggregator()
+        aggregator.ingest([make_repo("a", 100, 10), make_repo("b", 50, 5, "Rust"), make_repo("c", 10, 1)], MONDAY)
+
+        stats = aggregator.summary()
+        assert stats["tracked_repos"] == 3
+        assert stats["total_stars"] == 160
+        assert stats["total_forks"] == 16
+        assert stats["languages"] == ["Python", "Rust"]
+        assert stats["language_breakdown"]["Python"] == {"repos": 2, "stars": 110, "forks": 11}
+        assert [r["name"] for r in stats["top_repos"]] == ["a", "b", "c"]
+        assert stats["top_repos"][0]["stars"] == 100
+        assert stats["percentiles"]["stars"] == {"p50": 50, "p90": 100, "p99": 100}
+        assert stats["growth"] is None
+
+    def test_upsert_applies_deltas(self):
+        aggregator = StatsAggregator()
+        aggregator.ingest([make_repo("a", 100), make_repo("b", 50)], MONDAY)
+        first = aggregator.summary()
+
+        assert aggregator.ingest([make_repo("a", 100)], MONDAY) == 0
+        assert aggregator.summary() is first  # unchanged snapshot keeps the cached summary
+
+        aggregator.ingest([make_repo("b", 150, language="Go")], MONDAY)
+        stats = aggregator.summary()
+        assert stats["total_stars"] == 250
+        assert stats["language_breakdown"] == {
+            "Go": {"repos": 1, "stars": 150, "forks": 0},
+            "Python": {"repos": 1, "stars": 100, "forks": 0}
+        }
+        assert stats["top_by"]["star_growth"][0] == {"full_name": "org/b", "star_growth": 100}
+
+    def test_week_rollover(self):
+        aggregator = StatsAggregator()
+        aggregator.ingest([make_repo("a", 100), make_repo("b", 50)], MONDAY)
+        aggregator.ingest([make_repo("a", 120)], MONDAY + timedelta(days=2))
+
+        aggregator.ingest([make_repo("a", 130)], MONDAY + timedelta(days=7))
+        stats = aggregator.summary()
+        assert stats["tracked_repos"] == 2
+        assert stats["growth"]["stars"] == (130 + 50) - (120 + 50)
+        assert stats["top_by"]["star_growth"][0] == {"full_name": "org/a", "star_growth": 10}
+
+        # b was not seen during the finished week and is dropped
+        aggregator.ingest([make_repo("a", 140)], MONDAY + timedelta(days=14))
+        assert aggregator.summary()["tracked_repos"] == 1
+
+    def test_retain_window(self):
+        aggregator = StatsAggregator()
+        aggregator.ingest([
+            {**make_repo("old", 100), "created_at": "2025-09-01T10:00:00Z"},
+            {**make_repo("new", 50), "created_at": "2025-09-07T10:00:00Z"},
+            make_repo("undated", 10)
+        ], MONDAY)
+
+        assert aggregator.retain_window(7, MONDAY) == 1
+        assert aggregator.retain_window(7, MONDAY) == 0      # same cutoff: no rescan
+        stats = aggregator.summary()
+        assert stats["tracked_repos"] == 2
+        assert stats["total_stars"] == 60
+
+
+class TestWindowedStats:
+    """Test per-window aggregates shared through the state backend"""
+
+    @pytest.mark.asyncio
+    async def test_workers_share_per_window_totals(self):
+        backend = MemoryBackend()
+        first, second = WindowedStats(backend), WindowedStats(backend)
+
+        await first.ingest(7, [make_repo("a", 100), make_repo("b", 50, language="Rust")], MONDAY)
+        await second.ingest(7, [make_repo("c", 10)], MONDAY)
+        await second.ingest(1, [make_repo("a", 100)], MONDAY)
+
+        # Both workers see both deltas, and the 1-day window only its own fetch
+        assert (await first.summary(7, now=MONDAY))["total_stars"] == 160
+        assert await first.summary(7, now=MONDAY) == await second.summary(7, now=MONDAY)
+        assert (await first.summary(1, now=MONDAY))["tracked_repos"] == 1
+        assert (await first.summary(30, now=MONDAY))["tracked_repos"] == 0
@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime
+
+from src.batching import SharedWindows, within_window
+from src.models import Discussion, Repo
+
+
+NOW = datetime(2025, 9, 30, 12, 0)
+
+
+def repo(name, created_at):
+    return Repo.coerce({"name": name, "full_name": f"org/{name}", "created_at": created_at})
+
+
+class TestWithinWindow:
+    """Test cutting a window out of a wider search"""
+
+    def test_matches_created_qualifier(self):
+        repos = [
+            repo("today", "2025-09-30T08:00:00Z"),
+            repo("edge", "2025-09-23T23:00:00Z"),     # created:>2025-09-23 excludes the cutoff day
+            repo("inside", "2025-09-24T00:00:00Z"),
+            repo("unknown", "")
+        ]
+        assert [r.name for r in within_window(repos, 7, NOW)] == ["today", "inside", "unknown"]
+
+
+class TestSharedWindows:
+    """Test which windows go upstream"""
+
+    @pytest.mark.asyncio
+    async def test_same_window_and_incremental_are_separate(self):
+        calls = []
+
+        async def fetch(days, incremental):
+            calls.append((days, incremental))
+            return [repo("a", "2025-09-29T00:00:00Z")], [Discussion.coerce({"title": "t", "created_at": "2025-09-29T00:00:00Z"})]
+
+        windows = SharedWindows(fetch, now=NOW)
+        await windows.window(30, False, 1, 1)
+        await windows.window(30, False, 5, 5)       # same window: always shared
+        await windows.window(7, False, 1, 1)        # cut from 30 days
+        await windows.window(7, True, 1, 1)         # incremental never shares with full fetches
+
+        assert calls == [(30, False), (7, True)]
+        assert (windows.upstream, windows.shared) == (2, 2)
@@ -0,0 +1,82 @@
+
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from github_simulator import SimulatorConfig, create_simulator
+from run import compare, percentile
+from startup import parse_importtime
+
+
+class TestGitHubSimulator:
+
+    @pytest.mark.asyncio
+    async def test_pagination_and_rate_limit_headers(self):
+        """Test the simulator paginates search results and counts down the budget"""
+        config = SimulatorConfig(latency_ms=0, jitter_ms=0, total_items=25, rate_limit=2)
+        transport = httpx.ASGITransport(app=create_simulator(config))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://sim") as client:
+            first = await client.get("/search/repositories", params={"q": "llm", "per_page": 10})
+            last = await client.get("/search/repositories", params={"q": "llm", "per_page": 10, "page": 3})
+            limited = await client.get("/repos/org1/ai-project-1")
+
+        assert len(first.json()["items"]) == 10
+        assert 'rel="next"' in first.headers["Link"]
+        assert len(last.json()["items"]) == 5
+        assert "Link" not in last.headers
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        assert limited.status_code == 403
+
+
+class TestBenchmarkReport:
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles"""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+    def test_compare_flags_regressions(self):
+        """Test baseline comparison on p95 and throughput"""
+        baseline = {"scenarios": {"render": {"p95_ms": 1.0, "throughput_per_s": 1000.0}}}
+        steady = {"scenarios": {"render": {"p95_ms": 1.1, "throughput_per_s": 950.0}}}
+        slower = {"scenarios": {"render": {"p95_ms": 2.0, "throughput_per_s": 500.0}}}
+
+        assert compare(steady, baseline, 0.25) == []
+        assert len(compare(slower, baseline, 0.25)) == 2
+
+
+class TestStartupBenchmark:
+
+    def test_parse_importtime(self):
+        """Test -X importtime lines are parsed with their nesting depth"""
+        stderr = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |     httpx._models",
+            "import time:      3000 |       3120 |   httpx",
+            "import time:       500 |       3620 | client",
+            "unrelated warning line"
+        ])
+
+        rows = parse_importtime(stderr)
+
+        assert [(r["module"], r["depth"], r["cumulative_us"]) for r in rows] == [
+            ("httpx._models", 2, 120), ("httpx", 1, 3120), ("client", 0, 3620)
+        ]
+
+    def test_client_import_stays_light(self):
+        """Test importing the client does not pull in the Anthropic SDK or httpx"""
+        import subprocess
+
+        src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+        code = "import sys, client; print(any(m in sys.modules for m in ('anthropic', 'httpx')))"
+        result = subprocess.run([sys.executable, "-c", code], cwd=src, capture_output=True, text=True)
+
+        assert result.stdout.strip() == "False"
+
@@ -0,0 +1,122 @@
+import gzip
+import json
+import time
+
+import httpx
+import pytest
+
+from src.cassette import Cassette, CassetteMiss
+from src.github_adapter import GitHubAdapter
+from src.state_backend import MemoryBackend
+
+
+def github(request: httpx.Request) -> httpx.Response:
+    """Stand-in for GitHub: echoes the path and query"""
+    github.calls += 1
+    return httpx.Response(
+        200,
+        json={"path": request.url.path, "q": request.url.params.get("q"), "call": github.calls},
+        headers={"X-RateLimit-Remaining": "4999"}
+    )
+
+
+async def record(path, *requests, handler=github):
+    github.calls = 0
+    cassette = Cassette(str(path), mode="record")
+    async with httpx.AsyncClient(transport=cassette.async_transport(httpx.MockTransport(handler))) as client:
+        responses = [await client.get(url, params=params) for url, params in requests]
+    return cassette, responses
+
+
+class TestCassette:
+    """Test recording and replaying HTTP traffic"""
+
+    @pytest.mark.asyncio
+    async def test_replay_matches_recording_offline(self, tmp_path):
+        path = tmp_path / "github.jsonl.gz"
+        _, recorded = await record(path, ("https://api.github.com/search/repositories", {"q": "llm", "sort": "stars"}))
+
+        with gzip.open(path, "rt") as f:
+            stored = [json.loads(line) for line in f]
+        assert len(stored) == 1
+        assert stored[0]["url"] == "https://api.github.com/search/repositories?q=llm&sort=stars"
+
+        cassette = Cassette(str(path), latency_scale=0)
+        async with httpx.AsyncClient(transport=cassette.async_transport()) as client:
+            # Parameter order doesn't matter
+            replayed = await client.get("https://api.github.com/search/repositories", params={"sort": "stars", "q": "llm"})
+
+        assert github.calls == 1
+        assert replayed.status_code == 200
+        assert replayed.json() == recorded[0].json()
+        assert replayed.headers["X-RateLimit-Remaining"] == "4999"
+
+    @pytest.mark.asyncio
+    async def test_repeats_drift_and_misses(self, tmp_path):
+        path = tmp_path / "github.jsonl.gz"
+        url = "https://api.github.com/search/issues"
+        await record(path, (url, {"q": "created:>2025-01-01"}), (url, {"q": "created:>2025-01-01"}))
+
+        cassette = Cassette(str(path), latency_scale=0)
+        async with httpx.AsyncClient(transport=cassette.async_transport()) as client:
+            calls = [(await client.get(url, params={"q": "created:>2025-01-01"})).json()["call"] for _ in range(3)]
+            drifted = await client.get(url, params={"q": "created:>2025-02-01"})
+            with pytest.raises(CassetteMiss):
+                await client.get("https://api.github.com/repos/org/unknown")
+
+        # Recorded order, then the last answer again
+        assert calls == [1, 2, 2]
+        assert drifted.json()["q"] == "created:>2025-01-01"
+
+    @pytest.mark.asyncio
+    async def test_latency_is_scaled(self, tmp_path):
+        path = tmp_path / "slow.jsonl.gz"
+        cassette, _ = await record(path, ("https://api.github.com/rate_limit", None))
+        cassette.interactions[0].elapsed = 0.2
+        cassette.save()
+
+        replay = Cassette(str(path), latency_scale=0.25)
+        async with httpx.AsyncClient(transport=replay.async_transport()) as client:
+            started = time.perf_counter()
+            await client.get("https://api.github.com/rate_limit")
+            elapsed = time.perf_counter() - started
+
+        assert 0.05 <= elapsed < 0.2
+
+    def test_sync_transport_matches_request_body(self, tmp_path):
+        path = str(tmp_path / "claude.jsonl.gz")
+
+        def claude(request):
+            return httpx.Response(200, json={"echo": json.loads(request.content)["prompt"]})
+
+        cassette = Cassette(path, mode="record")
+        with httpx.Client(transport=cassette.transport(httpx.MockTransport(claude))) as client:
+            for prompt in ("a", "b"):
+                client.post("https://api.anthropic.com/v1/messages", json={"prompt": prompt})
+
+        replay = Cassette(path, latency_scale=0)
+        with httpx.Client(transport=replay.transport()) as client:
+            answers = [client.post("https://api.anthropic.com/v1/messages", json={"prompt": p}).json()["echo"] for p in "ba"]
+
+        assert answers == ["b", "a"]
+
+    @pytest.mark.asyncio
+    async def test_adapter_replays_github(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GITHUB_API_URL", "https://api.github.com")
+        path = tmp_path / "github.jsonl.gz"
+        repo = {
+            "name": "agent", "full_name": "org/agent", "stargazers_count": 42, "forks_count": 3,
+            "language": "Python", "description": "Agents", "html_url": "https://github.com/org/agent",
+            "created_at": "2025-01-01T00:00:00Z", "updated_at": "2025-02-01T00:00:00Z"
+        }
+        await record(path, ("https://api.github.com/repos/org/agent", None), handler=lambda request: httpx.Response(200, json=repo))
+
+        adapter = GitHubAdapter(MemoryBackend(), cassette=Cassette(str(path), latency_scale=0))
+        stats = await adapter.get_repo_stats("org/agent")
+
+        assert stats["full_name"] == "org/agent"
+        assert stats["stars"] == 42
+
+    def test_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            Cassette(str(tmp_path / "x.jsonl.gz"), mode="live")
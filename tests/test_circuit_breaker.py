@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+
+from src.circuit_breaker import CLOSED, HALF_OPEN, OPEN, PROBE, CircuitBreaker
+from src.state_backend import MemoryBackend
+
+
+def make_breaker(backend=None, **settings):
+    settings = {"failure_threshold": 2, "slow_call_seconds": 1.0, "reset_timeout": 0.05, **settings}
+    return CircuitBreaker(backend or MemoryBackend(), "search/repositories", **settings)
+
+
+class TestCircuitBreaker:
+    """Test tripping, failing fast and half-open probing"""
+
+    @pytest.mark.asyncio
+    async def test_trips_after_consecutive_failures(self):
+        breaker = make_breaker()
+
+        await breaker.record(await breaker.acquire(), False, 0.1)
+        await breaker.record(await breaker.acquire(), True, 0.1)     # success resets the count
+        await breaker.record(await breaker.acquire(), False, 0.1)
+        assert await breaker.state() == CLOSED
+
+        # Slow calls count as failures
+        await breaker.record(await breaker.acquire(), True, 5.0)
+        assert await breaker.state() == OPEN
+        assert await breaker.acquire() is None
+
+    @pytest.mark.asyncio
+    async def test_single_probe_across_workers(self):
+        backend = MemoryBackend()
+        workers = [make_breaker(backend), make_breaker(backend)]
+        await workers[0].trip()
+        # The other worker sees the open state through the backend
+        assert await workers[1].acquire() is None
+
+        await asyncio.sleep(0.06)
+        assert await workers[1].state() == HALF_OPEN
+        admitted = [await worker.acquire() for worker in workers]
+        assert admitted == [PROBE, None]
+
+        # A failed probe re-opens at once
+        await workers[0].record(PROBE, False, 0.1)
+        assert await workers[1].state() == OPEN
+
+        await asyncio.sleep(0.06)
+        probe = await workers[1].acquire()
+        await workers[1].record(probe, True, 0.1)
+        assert await workers[0].state() == CLOSED
+        assert await workers[0].acquire() == CLOSED
@@ -11,8 +11,9 @@ class TestMCPNewsletterClient:
     @pytest.fixture
     def client(self):
         """Create test client instance"""
-        with patch('src.client.anthropic.Anthropic'):
-            return MCPNewsletterClient("http://test-server:8000")
+        # The Anthropic client is built lazily, so keep the patch active for the test
+        with patch('anthropic.Anthropic'):
+            yield MCPNewsletterClient("http://test-server:8000")
     
     @pytest.fixture
     def mock_server_response(self):
@@ -69,7 +70,7 @@ class TestMCPNewsletterClient:
             )
             
             # Test the fetch
-            result = await client._fetch_newsletter_data(7)
+            result = await client.fetch_newsletter_data(7)
             
             # Assertions
             assert result == mock_server_response
@@ -93,10 +94,37 @@ class TestMCPNewsletterClient:
             
             # Test error handling
             with pytest.raises(Exception) as exc_info:
-                await client._fetch_newsletter_data(7)
+                await client.fetch_newsletter_data(7)
             
             assert "MCP server error: 500" in str(exc_info.value)
     
+    def test_anthropic_client_is_created_on_first_use(self):
+        """Test the Anthropic SDK client is only constructed when Claude is actually used"""
+        with patch('anthropic.Anthropic') as mock_anthropic:
+            client = MCPNewsletterClient()
+            mock_anthropic.assert_not_called()
+            
+            assert client.anthropic_client is client.anthropic_client
+            mock_anthropic.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_stream_items_parses_ndjson_incrementally(self, client):
+        """Test the NDJSON consumer yields parsed items line by line"""
+        body = b'{"name": "a"}\n{"name": "b"}\n\n{"name": "c"}\n'
+        requests = []
+        
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, content=body, headers={"content-type": "application/x-ndjson"})
+        
+        real_client = httpx.AsyncClient
+        with patch('httpx.AsyncClient', lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)):
+            items = [item async for item in client.stream_trending_repos(days=3, limit=10)]
+        
+        assert [item["name"] for item in items] == ["a", "b", "c"]
+        assert requests[0].url.path == "/trending-repos/stream"
+        assert requests[0].url.params["limit"] == "10"
+    
     @pytest.mark.asyncio
     async def test_enhance_with_claude_success(self, client):
         """Test Claude enhancement functionality"""
@@ -120,7 +148,43 @@ class TestMCPNewsletterClient:
             # Check the call arguments
             call_args = mock_messages.create.call_args
             assert call_args[1]['model'] == "claude-3-sonnet-20240229"
-            assert call_args[1]['max_tokens'] == 4000
+            # Sized from the (empty) digest rather than a fixed 4000
+            assert call_args[1]['max_tokens'] == 512
+            prompt = call_args[1]['messages'][0]['content']
+            assert basic_newsletter not in prompt
+            assert "# Basic Newsletter" in prompt  # outline of the basic newsletter
+    
+    @pytest.mark.asyncio
+    async def test_enhance_with_claude_truncated_output(self, client):
+        """Test a response cut off at max_tokens falls back to the basic newsletter"""
+        mock_message = MagicMock(stop_reason="max_tokens")
+        mock_message.content = [MagicMock(text="# Enhanced but cut")]
+        
+        with patch.object(client.anthropic_client, 'messages') as mock_messages:
+            mock_messages.create.return_value = mock_message
+            
+            result = await client._enhance_with_claude("# Basic", {"trending_repos": []})
+        
+        assert result == "# Basic"
+    
+    @pytest.mark.asyncio
+    async def test_enhance_with_claude_streaming(self, client):
+        """Test enhanced text is handed to on_text as it streams in"""
+        final = MagicMock(stop_reason="end_turn")
+        final.content = [MagicMock(text="# Enhanced")]
+        stream = MagicMock(text_stream=iter(["# Enh", "anced"]))
+        stream.get_final_message.return_value = final
+        deltas = []
+        
+        with patch.object(client.anthropic_client, 'messages') as mock_messages:
+            mock_messages.stream.return_value.__enter__.return_value = stream
+            
+            result = await client._enhance_with_claude("# Basic", {"trending_repos": []}, on_text=deltas.append)
+            await asyncio.sleep(0)  # deltas are delivered through the event loop
+        
+        assert result == "# Enhanced"
+        assert deltas == ["# Enh", "anced"]
+        mock_messages.create.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_enhance_with_claude_failure(self, client):
@@ -145,7 +209,7 @@ class TestMCPNewsletterClient:
         enhanced_newsletter = "# Enhanced AI Newsletter\nFull content here"
         
         # Mock server response
-        with patch.object(client, '_fetch_newsletter_data') as mock_fetch:
+        with patch.object(client, 'fetch_newsletter_data') as mock_fetch:
             mock_fetch.return_value = mock_server_response
             
             # Mock Claude enhancement
@@ -162,7 +226,7 @@ class TestMCPNewsletterClient:
     async def test_generate_newsletter_without_enhancement(self, client, mock_server_response):
         """Test newsletter generation without Claude enhancement"""
         
-        with patch.object(client, '_fetch_newsletter_data') as mock_fetch:
+        with patch.object(client, 'fetch_newsletter_data') as mock_fetch:
             mock_fetch.return_value = mock_server_response
             
             # Mock newsletter generator
@@ -200,7 +264,7 @@ class TestNewsletterClientIntegration:
             "generation_timestamp": "2025-09-09T12:00:00Z"
         }
         
-        with patch('src.client.anthropic.Anthropic'):
+        with patch('anthropic.Anthropic'):
             client = MCPNewsletterClient()
             
             # Use real newsletter generator
@@ -211,6 +275,34 @@ class TestNewsletterClientIntegration:
             assert "testuser" in newsletter
 
 
+class TestLoadTest:
+    """Tests for the `client.py loadtest` helpers"""
+    
+    def test_parse_metrics(self):
+        """Test scraping samples from the server's /metrics page"""
+        from src.loadtest import parse_metrics
+        
+        text = """# HELP process_resident_memory_bytes Resident memory size in bytes
+# TYPE process_resident_memory_bytes gauge
+process_resident_memory_bytes 52428800
+http_request_duration_seconds_count{method="POST",endpoint="/generate-newsletter-data",status="200"} 12
+"""
+        samples = parse_metrics(text)
+        
+        assert samples["process_resident_memory_bytes"] == 52428800
+        assert samples['http_request_duration_seconds_count{method="POST",endpoint="/generate-newsletter-data",status="200"}'] == 12
+    
+    def test_saturation_detection(self):
+        """Test that a step breaching the SLO or error budget counts as saturated"""
+        from src.loadtest import LoadGenerator
+        
+        generator = LoadGenerator("http://test-server:8000", [7], [10], slo_p95_ms=1000, max_error_rate=0.01, timeout=5)
+        
+        assert not generator.is_saturated({"error_rate": 0.0, "p95_ms": 400})
+        assert generator.is_saturated({"error_rate": 0.0, "p95_ms": 1500})
+        assert generator.is_saturated({"error_rate": 0.05, "p95_ms": 400})
+
+
 # Fixtures for all tests
 @pytest.fixture
 def event_loop():
@@ -0,0 +1,91 @@
+import pytest
+import json
+
+from src.document import Document, Item, Link, Section, emit
+from src.newsletter import NewsletterGenerator
+
+
+@pytest.fixture
+def data():
+    return {
+        "trending_repos": [
+            {
+                "name": "awesome-ml",
+                "full_name": "mluser/awesome-ml",
+                "owner": {"login": "mluser"},
+                "description": "Fast <models> & more",
+                "html_url": "https://github.com/mluser/awesome-ml",
+                "stargazers_count": 2500,
+                "language": "Python"
+            }
+        ],
+        "discussions": [
+            {
+                "title": "Deploying models",
+                "body": "Use **batching** and `queues`",
+                "html_url": "https://github.com/user/repo/issues/456",
+                "repository_url": "https://api.github.com/repos/user/ai-deployment"
+            }
+        ],
+        "weekly_stats": {
+            "total_stars": 15000,
+            "total_forks": 3200,
+            "languages": ["Python", "Go"],
+            "top_repos": [{"name": "awesome-ml", "stars": 2500, "forks": 500, "language": "Python"}]
+        },
+        "generation_timestamp": "2025-09-09T12:00:00Z"
+    }
+
+
+class TestDocument:
+    """Test the intermediate document and its emitters"""
+
+    def test_document_holds_selected_and_cleaned_content(self, data):
+        document = NewsletterGenerator().build_document(data)
+
+        assert [s.key for s in document.sections] == ["header", "highlights", "tools", "discussions", "stats", "footer"]
+        highlights = document.sections[1]
+        assert highlights.items[0].stars == 2500
+        assert highlights.items[0].link.text == "mluser/awesome-ml"
+        assert highlights.items[0].link.url == "https://github.com/mluser/awesome-ml"
+        assert document.sections[2].empty == "No new tools discovered this week."
+        assert document.sections[3].items[0].text == "Use batching and queues"
+        assert document.sections[4].table.rows == [("awesome-ml", 2500, 500, "Python")]
+
+    def test_markdown_matches_section_generators(self, data):
+        generator = NewsletterGenerator()
+        sections = [
+            generator._generate_header(data), generator._generate_highlights(data),
+            generator._generate_tools_section(data), generator._generate_discussions(data),
+            generator._generate_stats(data), generator._generate_footer(data)
+        ]
+
+        assert generator.generate_newsletter(data) == "\n\n---\n\n".join(sections)
+
+    def test_html_escapes_content(self, data):
+        page = NewsletterGenerator().generate_newsletter(data, "html")
+
+        assert page.startswith("<!DOCTYPE html>")
+        assert "Fast &lt;models&gt; &amp; more" in page
+        assert '<a href="https://github.com/mluser/awesome-ml">awesome-ml</a>' in page
+        assert "<td>2,500</td>" in page
+        assert "**" not in page
+
+    def test_json_and_text_formats(self, data):
+        formats = NewsletterGenerator().generate_formats(data, ["json", "text"])
+
+        feed = json.loads(formats["json"])
+        assert feed["generation_timestamp"] == "2025-09-09T12:00:00Z"
+        assert feed["sections"][1]["items"][0]["link"]["url"] == "https://github.com/mluser/awesome-ml"
+        assert "- awesome-ml (by mluser, 2,500 stars)" in formats["text"]
+        assert "- Total Stars Tracked: 15,000" in formats["text"]
+
+    def test_failing_section_is_skipped(self):
+        document = Document([
+            Section("highlights", "Highlights", items=[Item("x", "y", Link("x", "#"), byline="o", stars="many")]),
+            Section("generic", "Other", items=[Item("z", "", Link("z", "https://z"))])
+        ])
+
+        assert emit(document) == "## Other\n\n- [z](https://z)"
+        with pytest.raises(ValueError):
+            emit(document, "pdf")
@@ -0,0 +1,110 @@
+import pytest
+import re
+from unittest.mock import MagicMock, patch
+
+from src.client import MCPNewsletterClient
+from src.editions import assemble, diff_edition
+from src.newsletter import NewsletterGenerator
+from src.state_backend import MemoryBackend
+
+
+def make_data(stars=(500, 400, 300, 200), descriptions=None):
+    return {
+        "trending_repos": [
+            {"name": f"repo-{i}", "full_name": f"org/repo-{i}", "owner": {"login": "org"},
+             "description": (descriptions or {}).get(i, f"Repo {i}"), "html_url": f"https://github.com/org/repo-{i}",
+             "stargazers_count": count, "language": "Python"}
+            for i, count in enumerate(stars)
+        ],
+        "discussions": [{"title": "Evals", "body": "How?", "html_url": "https://github.com/org/x/issues/1"}],
+        "weekly_stats": {"total_stars": sum(stars), "total_forks": 0, "languages": ["Python"]},
+        "generation_timestamp": "2025-09-09T12:00:00Z"
+    }
+
+
+def echo_upper(**kwargs):
+    """Stand-in for Claude: uppercases every entry it is sent"""
+    entries = re.findall(r'<entry id="([^"]+)">\n(.*?)\n</entry>', kwargs["messages"][0]["content"], re.S)
+    message = MagicMock(stop_reason="end_turn")
+    message.content = [MagicMock(text="".join(f'<entry id="{key}">{body.upper()}</entry>' for key, body in entries))]
+    return message
+
+
+class TestEditionDiff:
+    """Test item-level reuse between editions"""
+
+    def test_first_edition_matches_basic_newsletter(self):
+        generator = NewsletterGenerator()
+        document = generator.build_document(make_data())
+        diff = diff_edition(document, {}, enhance=False)
+
+        assert diff.reused == 0 and diff.stale == []
+        assert assemble(document, diff, enhanced=False) == generator.generate_newsletter(make_data())
+
+    def test_only_changed_items_are_stale(self):
+        generator = NewsletterGenerator()
+        first = diff_edition(generator.build_document(make_data()), {})
+        first.enhanced = {key: f"ENHANCED {key} ⭐ {first.stars[key]} stars" for key in first.stale}
+        stored = {
+            key: {"markdown": first.fragments[key], "enhanced": first.enhanced[key], "stars": first.stars[key]}
+            for key in first.fragments
+        }
+
+        # A new star count is an update of the same item: nothing to re-enhance
+        counts = diff_edition(generator.build_document(make_data(stars=(500, 450, 300, 200))), stored)
+        updated = next(key for key in counts.fragments if "450" in counts.fragments[key])
+        assert (counts.reused, counts.updated, counts.removed, counts.stale) == (5, 1, 0, [])
+        assert counts.enhanced[updated].endswith("⭐ 450 stars")
+
+        # A fragment that doesn't spell the old count out can't be patched
+        reworded = {key: {**entry, "enhanced": f"ENHANCED {key} ⭐ 0.4k stars"} for key, entry in stored.items()}
+        counts = diff_edition(generator.build_document(make_data(stars=(500, 450, 300, 200))), reworded)
+        assert counts.stale == [updated] and updated not in counts.enhanced
+
+        second = diff_edition(generator.build_document(make_data(descriptions={1: "Rewritten"})), stored)
+
+        assert len(first.stale) == 5
+        assert second.reused == 4 and second.removed == 1  # repo-1 changed, the old version dropped
+        assert len(second.stale) == 1
+        assert "Rewritten" in second.fragments[second.stale[0]]
+
+
+class TestClientEditions:
+    """Test the client reuses enhanced fragments across runs"""
+
+    @pytest.fixture
+    def client(self):
+        with patch('anthropic.Anthropic'):
+            client = MCPNewsletterClient("http://test-server:8000")
+            client.state_backend = MemoryBackend()
+            client.anthropic_client.messages.create.side_effect = echo_upper
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_rerun_reenhances_only_changes(self, client):
+        create = client.anthropic_client.messages.create
+
+        first = await client.generate_edition(make_data(), "daily")
+        again = await client.generate_edition(make_data(), "daily")
+        recounted = await client.generate_edition(make_data(stars=(500, 450, 300, 200)), "daily")
+        changed = await client.generate_edition(make_data(descriptions={1: "Rewritten"}), "daily")
+
+        assert "### 🚀 **REPO-0 BY ORG**" in first
+        assert "# 🤖 AI Weekly Newsletter" in first  # header is not enhanced
+        assert again == first
+        assert "REPO-1" in recounted and "450" in recounted
+        assert create.call_count == 2  # neither the identical rerun nor the new star counts made a call
+        assert len(re.findall(r'<entry id="[0-9a-f]+">', create.call_args.kwargs["messages"][0]["content"])) == 1
+        assert "REWRITTEN" in changed
+
+    @pytest.mark.asyncio
+    async def test_failed_enhancement_is_retried_next_run(self, client):
+        create = client.anthropic_client.messages.create
+        create.side_effect = Exception("API Error")
+
+        basic = await client.generate_edition(make_data(), "daily")
+        create.side_effect = echo_upper
+        enhanced = await client.generate_edition(make_data(), "daily")
+
+        assert basic == NewsletterGenerator().generate_newsletter(make_data())
+        assert "REPO-0" in enhanced
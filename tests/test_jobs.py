@@ -0,0 +1,117 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from src.client import MCPNewsletterClient
+from src.jobs import JobManager, parse_sse, sse_format
+
+
+REPOS = [
+    {"name": "agent", "full_name": "org/agent", "owner": {"login": "org"}, "description": "LLM agent",
+     "html_url": "https://github.com/org/agent", "stargazers_count": 900, "language": "Python"}
+]
+
+
+class TestProgressJob:
+    """Test the event log and its subscribers"""
+
+    @pytest.mark.asyncio
+    async def test_live_late_and_resumed_subscribers(self):
+        manager = JobManager()
+        release = asyncio.Event()
+
+        async def work(job):
+            job.publish("progress", {"stage": "searched"})
+            await release.wait()
+            job.publish("token", {"text": "Hi"})
+            return {"text": "Hi"}
+
+        job = manager.submit("test", work)
+
+        async def collect(after=0):
+            return [(event["id"], event["event"]) async for event in job.subscribe(after)]
+
+        live = asyncio.create_task(collect())
+        await asyncio.sleep(0)
+        release.set()
+        assert await live == [(1, "progress"), (2, "token"), (3, "result")]
+        assert await collect() == await live
+        assert await collect(after=2) == [(3, "result")]
+        assert job.snapshot()["status"] == "done"
+
+    @pytest.mark.asyncio
+    async def test_failure_cancel_and_heartbeat(self):
+        manager = JobManager(max_running=1)
+
+        async def fail(job):
+            raise ValueError("no data")
+
+        failed = manager.submit("test", fail)
+        await failed.task
+        assert [e["event"] for e in failed.events] == ["error"]
+        assert failed.snapshot()["error"] == "no data"
+
+        slow = manager.submit("test", lambda job: asyncio.sleep(10))
+        with pytest.raises(RuntimeError):
+            manager.submit("test", fail)
+
+        frames = slow.subscribe(heartbeat=0.01)
+        assert await frames.__anext__() is None
+        assert manager.cancel(slow.id)
+        assert (await frames.__anext__())["data"] == {"message": "cancelled"}
+        assert slow.status == "cancelled"
+
+    @pytest.mark.asyncio
+    async def test_sse_round_trip(self):
+        async def lines():
+            for frame in (sse_format(None), sse_format({"id": 1, "event": "token", "data": {"text": "a\nb"}})):
+                for line in frame.split("\n"):
+                    yield line
+
+        assert [pair async for pair in parse_sse(lines())] == [("token", {"text": "a\nb"})]
+
+
+class TestJobEndpoints:
+    """Test submitting a newsletter job and following it over SSE"""
+
+    @pytest.mark.asyncio
+    async def test_client_follows_job(self):
+        from src import server
+        from src.aggregates import WindowedStats
+        from src.state_backend import MemoryBackend
+
+        async def enhance(text, data, on_text=None):
+            for delta in ("# Better", " newsletter"):
+                on_text(delta)
+            return "# Better newsletter"
+
+        enhancer = MCPNewsletterClient()
+        enhancer._enhance_with_claude = enhance
+
+        real_client = httpx.AsyncClient
+        events = []
+        with patch('src.server.stats_aggregator', WindowedStats(MemoryBackend())), \
+             patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=REPOS)), \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=[])), \
+             patch('src.server._enhancer', enhancer), \
+             patch('httpx.AsyncClient', lambda **kwargs: real_client(transport=httpx.ASGITransport(app=server.app), **kwargs)):
+            client = MCPNewsletterClient("http://test")
+            newsletter = await client.generate_via_job(days=7, on_event=lambda event, data: events.append((event, data)))
+
+            async with real_client(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as http:
+                missing = await http.get("/jobs/nope")
+                invalid = await http.post("/jobs", json={"format": "pdf"})
+
+        assert newsletter == "# Better newsletter"
+        assert [data["stage"] for event, data in events if event == "progress"] == [
+            "searched", "ranked", "stats", "rendered", "enhanced"
+        ]
+        kinds = [event for event, _ in events]
+        # The basic newsletter arrives before any enhanced text
+        assert kinds.index("render") < kinds.index("token")
+        assert "agent" in next(data["text"] for event, data in events if event == "render")
+        assert kinds[-1] == "result"
+        assert missing.status_code == 404
+        assert invalid.status_code == 422
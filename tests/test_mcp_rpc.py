@@ -0,0 +1,211 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from src.mcp_rpc import INVALID_PARAMS, METHOD_NOT_FOUND, PARSE_ERROR, MCPHttpSession, MCPServer, serve_stream
+from src.server import app, github_adapter
+
+
+def make_server():
+    server = MCPServer("test", "0.1")
+
+    @server.tool("add", "Add two numbers", {"a": {"type": "integer"}, "b": {"type": "integer"}}, required=["a", "b"])
+    async def add(progress, a, b):
+        await progress(1, 2, "halfway")
+        await progress(2, 2)
+        return {"sum": a + b}
+
+    @server.tool("fail", "Always raises")
+    async def fail(progress):
+        raise RuntimeError("boom")
+
+    return server
+
+
+def call(id, name, arguments, token=None):
+    params = {"name": name, "arguments": arguments}
+    if token is not None:
+        params["_meta"] = {"progressToken": token}
+    return {"jsonrpc": "2.0", "id": id, "method": "tools/call", "params": params}
+
+
+REPOS = [
+    {"name": "agent", "full_name": "org/agent", "owner": {"login": "org"}, "description": "LLM agent",
+     "html_url": "https://github.com/org/agent", "stargazers_count": 900, "language": "Python"}
+]
+
+
+class TestMCPServer:
+    """Test JSON-RPC dispatch"""
+
+    @pytest.mark.asyncio
+    async def test_initialize_and_list(self):
+        server = make_server()
+        response = await server.handle({
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {"protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "t"}}
+        })
+        assert response["result"]["protocolVersion"] == "2024-11-05"
+        assert "tools" in response["result"]["capabilities"]
+
+        tools = (await server.handle({"jsonrpc": "2.0", "id": 2, "method": "tools/list"}))["result"]["tools"]
+        assert [tool["name"] for tool in tools] == ["add", "fail"]
+        assert tools[0]["inputSchema"]["required"] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_batch_keeps_order_and_skips_notifications(self):
+        server = make_server()
+        responses = await server.handle([
+            call(1, "add", {"a": 1, "b": 2}),
+            {"jsonrpc": "2.0", "method": "notifications/initialized"},
+            {"jsonrpc": "2.0", "id": 2, "method": "nope"},
+            call(3, "add", {"a": 1}),
+            call(4, "add", {"a": 1, "b": "2"}),
+            call(5, "fail", {}),
+            {"jsonrpc": "2.0", "id": 6, "method": "ping"}
+        ])
+
+        assert [r["id"] for r in responses] == [1, 2, 3, 4, 5, 6]
+        assert responses[0]["result"]["structuredContent"] == {"sum": 3}
+        assert responses[1]["error"]["code"] == METHOD_NOT_FOUND
+        assert responses[2]["error"]["code"] == INVALID_PARAMS
+        assert responses[3]["error"]["code"] == INVALID_PARAMS
+        # Tool failures are results, not protocol errors
+        assert responses[4]["result"]["isError"] is True
+        assert responses[5]["result"] == {}
+
+    @pytest.mark.asyncio
+    async def test_progress_notifications(self):
+        server = make_server()
+        sent = []
+
+        async def notify(message):
+            sent.append(message)
+
+        await server.handle(call(1, "add", {"a": 1, "b": 1}), notify)
+        assert sent == []
+
+        await server.handle(call(2, "add", {"a": 1, "b": 1}, token="t"), notify)
+        assert [m["params"] for m in sent] == [
+            {"progressToken": "t", "progress": 1, "total": 2, "message": "halfway"},
+            {"progressToken": "t", "progress": 2, "total": 2}
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stdio_stream(self):
+        reader = asyncio.StreamReader()
+        lines = [call(1, "add", {"a": 2, "b": 3}, token=1), {"jsonrpc": "2.0", "id": 2, "method": "ping"}]
+        reader.feed_data(b"".join(json.dumps(line).encode() + b"\n" for line in lines) + b"not json\n")
+        reader.feed_eof()
+        written = []
+
+        async def write(data):
+            written.append(json.loads(data))
+
+        await serve_stream(make_server(), reader, write)
+
+        responses = {m["id"]: m for m in written if "id" in m}
+        assert responses[1]["result"]["structuredContent"] == {"sum": 5}
+        assert responses[2]["result"] == {}
+        assert responses[None]["error"]["code"] == PARSE_ERROR
+        assert sum(m.get("method") == "notifications/progress" for m in written) == 2
+
+
+class TestMCPHttp:
+    """Test the streamable HTTP transport against the app"""
+
+    def session(self):
+        http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        return MCPHttpSession("http://test/mcp", http)
+
+    @pytest.mark.asyncio
+    async def test_session_tools_and_batch(self):
+        session = self.session()
+        with patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=REPOS)) as trending, \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=[])):
+            repos = await session.call_tool("get_trending_repos", {"q": "agent"})
+            session_id = session.session_id
+            batch = await session.call_tools([
+                ("get_trending_repos", {"language": "Rust"}),
+                ("get_ai_discussions", {"limit": 5})
+            ])
+            await session.close()
+
+        assert session_id
+        assert [r["full_name"] for r in repos] == ["org/agent"]
+        assert batch == [[], []]
+        assert trending.await_count == 2
+
+        # The closed session is gone
+        response = await httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test").post(
+            "/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "ping"}, headers={"Mcp-Session-Id": session_id}
+        )
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_expired_session_is_reopened(self):
+        session = self.session()
+        handshakes = 0
+        initialize = session._initialize
+
+        async def flaky_initialize():
+            nonlocal handshakes
+            handshakes += 1
+            if handshakes == 1:
+                raise httpx.ConnectError("server restarting")
+            await initialize()
+
+        with patch.object(session, "_initialize", flaky_initialize), \
+             patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=REPOS)):
+            # A failed handshake isn't cached: the next call tries again
+            with pytest.raises(httpx.ConnectError):
+                await session.call_tool("get_trending_repos", {})
+            await session.call_tool("get_trending_repos", {})
+            first_id = session.session_id
+
+            # The server forgets the session (TTL ran out): re-initialize and resend once
+            await github_adapter.backend.delete(f"mcp:session:{first_id}")
+            repos = await session.call_tool("get_trending_repos", {})
+            await session.close()
+
+        assert handshakes == 3
+        assert session.session_id != first_id
+        assert [r["full_name"] for r in repos] == ["org/agent"]
+
+    @pytest.mark.asyncio
+    async def test_progress_over_sse(self):
+        session = self.session()
+        updates = []
+        with patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=REPOS)), \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=[])):
+            text = await session.call_tool("render_newsletter", {"format": "text"}, on_progress=updates.append)
+            await session.close()
+
+        assert "agent" in text
+        assert [u["message"] for u in updates] == ["searched", "ranked", "stats"]
+
+    @pytest.mark.asyncio
+    async def test_newsletter_defaults_match_rest(self):
+        repos = [{**REPOS[0], "name": f"agent-{i}", "full_name": f"org/agent-{i}", "stargazers_count": 900 - i}
+                 for i in range(20)]
+        session = self.session()
+        with patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=repos)), \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=[])):
+            over_mcp = await session.call_tool("generate_newsletter_data", {})
+            await session.close()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                over_rest = (await http.post("/generate-newsletter-data", json={})).json()
+
+        assert len(over_mcp["trending_repos"]) == len(over_rest["trending_repos"]) == 10
+
+    @pytest.mark.asyncio
+    async def test_requires_session(self):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            response = await http.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "ping"})
+            malformed = await http.post("/mcp", content=b"{", headers={"Content-Type": "application/json"})
+
+        assert response.status_code == 400
+        assert malformed.json()["error"]["code"] == PARSE_ERROR
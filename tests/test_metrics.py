@@ -0,0 +1,46 @@
+
+import pytest
+
+from src.metrics import Registry
+
+
+class TestMetricsRegistry:
+
+    def test_counter_and_gauge_rendering(self):
+        """Test labelled counters and gauges in the text exposition format"""
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests", ["endpoint", "status"])
+        remaining = registry.gauge("budget_remaining", "Budget", ["resource"])
+
+        requests.labels("search", "200").inc()
+        requests.labels("search", "200").inc(2)
+        remaining.labels("core").set(4999)
+
+        output = registry.render()
+        assert "# TYPE requests_total counter" in output
+        assert 'requests_total{endpoint="search",status="200"} 3' in output
+        assert 'budget_remaining{resource="core"} 4999' in output
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram bucket counts, sum and count"""
+        registry = Registry()
+        latency = registry.histogram("latency_seconds", "Latency", ["endpoint"], buckets=(0.1, 1.0))
+
+        child = latency.labels("repos")
+        for value in (0.05, 0.5, 0.7, 3.0):
+            child.observe(value)
+
+        output = registry.render()
+        assert 'latency_seconds_bucket{endpoint="repos",le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{endpoint="repos",le="1.0"} 3' in output
+        assert 'latency_seconds_bucket{endpoint="repos",le="+Inf"} 4' in output
+        assert 'latency_seconds_count{endpoint="repos"} 4' in output
+        assert 'latency_seconds_sum{endpoint="repos"} 4.25' in output
+
+    def test_function_gauge_and_reregistration(self):
+        """Test callback gauges and that re-registering returns the same metric"""
+        registry = Registry()
+        gauge = registry.gauge("ratio", "Ratio", function=lambda: 0.5)
+
+        assert registry.gauge("ratio", "Ratio") is gauge
+        assert "ratio 0.5" in registry.render()
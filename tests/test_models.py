@@ -0,0 +1,94 @@
+import pytest
+
+from src.models import Discussion, Repo, RepoStats, to_dicts
+from src.newsletter import NewsletterGenerator
+
+
+GITHUB_REPO = {
+    "id": 1,
+    "name": "ai-framework",
+    "full_name": "ai-org/ai-framework",
+    "owner": {"login": "ai-org", "id": 7},
+    "html_url": "https://github.com/ai-org/ai-framework",
+    "description": None,
+    "stargazers_count": 1500,
+    "forks_count": 300,
+    "language": "Python",
+    "topics": ["llm"],
+    "created_at": "2025-09-01T10:00:00Z",
+    "updated_at": "2025-09-08T10:00:00Z",
+    "watchers_count": 1500
+}
+
+
+class TestModels:
+    """Test slotted records parsed from GitHub JSON"""
+
+    def test_repo_from_github_resolves_defaults(self):
+        repo = Repo.from_github(GITHUB_REPO)
+
+        assert repo.owner == "ai-org"
+        assert repo.stars == 1500
+        assert repo.description == "No description available"
+        assert not hasattr(repo, "__dict__")
+
+        sparse = Repo.from_github({"name": "x"})
+        assert sparse.owner == "Unknown"
+        assert sparse.html_url == "#"
+        assert sparse.stars == 0
+
+    def test_repo_round_trip(self):
+        repo = Repo.from_github(GITHUB_REPO)
+        assert Repo.from_github(repo.to_dict()) == repo
+        assert Repo.coerce(repo) is repo
+
+    def test_unmodeled_github_fields_pass_through(self):
+        from dataclasses import replace
+
+        enriched = replace(Repo.from_github(GITHUB_REPO), stars=1600).to_dict()
+        assert enriched["watchers_count"] == 1500
+        assert enriched["owner"] == {"login": "ai-org", "id": 7}
+        assert enriched["stargazers_count"] == 1600
+        assert "watchers_count" not in Repo.from_github(GITHUB_REPO).to_dict(extra=False)
+
+        issue = {"title": "Issue", "number": 12, "user": {"login": "dev"}, "reactions": {"total_count": 3}}
+        assert Discussion.from_github(issue).to_dict()["reactions"] == {"total_count": 3}
+
+    def test_discussion_repo_name(self):
+        discussion = Discussion.from_github({
+            "title": "Issue", "repository_url": "https://api.github.com/repos/org/project"
+        })
+        assert discussion.repo_name == "project"
+        assert discussion.body == "No description"
+        assert Discussion.from_github({}).repo_name == "Unknown"
+
+    def test_repo_stats(self):
+        stats = RepoStats.from_github(GITHUB_REPO)
+        assert stats.stars == 1500
+        assert stats.url == GITHUB_REPO["html_url"]
+        assert RepoStats.coerce(stats.to_dict()) == stats
+        assert RepoStats.coerce({}) is None
+        assert to_dicts([stats, None]) == [stats.to_dict(), {}]
+
+        with pytest.raises(KeyError):
+            RepoStats.from_github({"name": "incomplete"})
+
+    def test_newsletter_renders_records_like_dicts(self):
+        generator = NewsletterGenerator()
+        repos = [dict(GITHUB_REPO, name=f"repo-{i}", description=f"Repo {i}") for i in range(6)]
+        discussions = [{
+            "title": "Discussion", "body": "**Bold** body", "html_url": "https://github.com/o/r/issues/1",
+            "repository_url": "https://api.github.com/repos/o/r"
+        }]
+        stats = {"total_stars": 10, "total_forks": 2, "languages": ["Python"],
+                 "top_repos": [RepoStats.from_github(GITHUB_REPO).to_dict(), {}]}
+        data = {"trending_repos": repos, "discussions": discussions, "weekly_stats": stats,
+                "generation_timestamp": "2025-09-09T12:00:00Z"}
+        records = {
+            **data,
+            "trending_repos": [Repo.from_github(r) for r in repos],
+            "discussions": [Discussion.from_github(d) for d in discussions],
+            "weekly_stats": {**stats, "top_repos": [RepoStats.coerce(r) for r in stats["top_repos"]]}
+        }
+
+        assert generator.generate_newsletter(records) == generator.generate_newsletter(data)
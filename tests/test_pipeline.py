@@ -0,0 +1,185 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import sqlite3
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+from src.pipeline import JobQueue, JobSpec, PipelineDaemon
+
+
+def make_client(render=None):
+    client = MagicMock()
+    client.fetch_newsletter_data = AsyncMock(return_value={"trending_repos": [], "discussions": []})
+    client.newsletter_generator.generate_newsletter = MagicMock(side_effect=render or (lambda data: "# Basic"))
+    client.request_enhancement = AsyncMock(return_value="# Enhanced")
+    return client
+
+
+@pytest_asyncio.fixture
+async def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "pipeline.db"))
+    yield queue
+    await queue.close()
+
+
+class TestJobQueue:
+    """Test the persistent job queue"""
+
+    @pytest.mark.asyncio
+    async def test_claim_in_schedule_order(self, queue):
+        later = await queue.enqueue(JobSpec("later"), run_at=time.time() + 3600)
+        first = await queue.enqueue(JobSpec("first"), run_at=time.time() - 10)
+        second = await queue.enqueue(JobSpec("second"))
+
+        assert (await queue.claim()).id == first
+        assert (await queue.claim()).id == second
+        assert await queue.claim() is None
+        assert (await queue.get(later)).status == "queued"
+        assert (await queue.get(first)).status == "running"
+
+    @pytest.mark.asyncio
+    async def test_jobs_and_artifacts_survive_reopen(self, tmp_path):
+        path = str(tmp_path / "pipeline.db")
+        queue = JobQueue(path)
+        job_id = await queue.enqueue(JobSpec("weekly", days=14, enhance=False))
+        await queue.claim()
+        await queue.save_artifact(job_id, "fetch", {"trending_repos": [1]})
+        await queue.close()
+
+        reopened = JobQueue(path)
+        assert await reopened.recover() == 1
+        job = await reopened.claim()
+        assert job.spec == JobSpec("weekly", days=14, enhance=False)
+        assert job.attempts == 2
+        assert await reopened.artifact(job_id, "fetch") == {"trending_repos": [1]}
+        await reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_recover_only_takes_expired_leases(self, queue):
+        live = await queue.enqueue(JobSpec("live"))
+        dead = await queue.enqueue(JobSpec("dead"))
+        await queue.claim()
+        await queue.claim()
+        queue.conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 600, dead))
+
+        assert await queue.recover(lease=120) == 1
+        assert (await queue.get(live)).status == "running"
+        assert (await queue.get(dead)).status == "queued"
+
+    @pytest.mark.asyncio
+    async def test_lock_wait_does_not_block_the_loop(self, tmp_path):
+        path = str(tmp_path / "pipeline.db")
+        queue = JobQueue(path)
+        await queue.enqueue(JobSpec("weekly"))
+        # Another daemon holds the write lock
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+
+        claim = asyncio.create_task(queue.claim())
+        await asyncio.sleep(0.05)
+        assert not claim.done()  # still waiting on the lock, off the loop
+
+        other.execute("COMMIT")
+        other.close()
+        assert (await claim).spec.name == "weekly"
+        await queue.close()
+
+
+class TestPipelineDaemon:
+    """Test stage execution, checkpoints and retries"""
+
+    @pytest.mark.asyncio
+    async def test_runs_all_stages_and_writes_output(self, queue, tmp_path):
+        client = make_client()
+        job_id = await queue.enqueue(JobSpec("weekly", output=str(tmp_path / "out" / "{name}.md")))
+
+        await PipelineDaemon(queue, client).run(until_idle=True)
+
+        job = await queue.get(job_id)
+        assert job.status == "done"
+        assert job.result == str(tmp_path / "out" / "weekly.md")
+        assert (tmp_path / "out" / "weekly.md").read_text() == "# Enhanced"
+        client.request_enhancement.assert_awaited_once_with("# Basic", {"trending_repos": [], "discussions": []})
+        assert await queue.artifact(job_id, "fetch") is None  # checkpoints are dropped once done
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_checkpointed_stages(self, queue, tmp_path):
+        client = make_client()
+        job_id = await queue.enqueue(JobSpec("weekly", output=str(tmp_path / "weekly.md")))
+        await queue.claim()
+        await queue.save_artifact(job_id, "fetch", {"trending_repos": ["cached"]})
+        await queue.save_artifact(job_id, "render", "# Checkpointed")
+        # The daemon that claimed it died: its lease ran out long ago
+        queue.conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time() - 600, job_id))
+
+        await PipelineDaemon(queue, client).run(until_idle=True)
+
+        client.fetch_newsletter_data.assert_not_awaited()
+        client.newsletter_generator.generate_newsletter.assert_not_called()
+        client.request_enhancement.assert_awaited_once_with("# Checkpointed", {"trending_repos": ["cached"]})
+        assert (await queue.get(job_id)).status == "done"
+
+    @pytest.mark.asyncio
+    async def test_failure_retries_then_fails(self, queue):
+        client = make_client()
+        client.fetch_newsletter_data.side_effect = Exception("MCP server error: 502")
+        job_id = await queue.enqueue(JobSpec("weekly", enhance=False))
+        daemon = PipelineDaemon(queue, client, max_attempts=2, retry_delay=0)
+
+        await daemon.run(until_idle=True)
+
+        job = await queue.get(job_id)
+        assert job.status == "failed"
+        assert job.attempts == 2
+        assert "502" in job.error
+
+    @pytest.mark.asyncio
+    async def test_enhance_failures_retry_before_falling_back(self, queue):
+        client = make_client()
+        client.request_enhancement.side_effect = Exception("overloaded")
+        job_id = await queue.enqueue(JobSpec("weekly"))
+
+        await PipelineDaemon(queue, client, max_attempts=3, retry_delay=0).run(until_idle=True)
+
+        job = await queue.get(job_id)
+        assert client.request_enhancement.await_count == 3
+        assert (job.status, job.attempts) == ("done", 3)
+
+        client.request_enhancement.side_effect = [Exception("overloaded"), "# Enhanced"]
+        retried = await queue.enqueue(JobSpec("retried"))
+        await PipelineDaemon(queue, client, max_attempts=3, retry_delay=0).run(until_idle=True)
+        assert (await queue.get(retried)).attempts == 2
+
+    @pytest.mark.asyncio
+    async def test_stage_limits_bound_concurrency(self, queue):
+        active = peak = 0
+
+        async def fetch(days):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {}
+
+        client = make_client()
+        client.fetch_newsletter_data.side_effect = fetch
+        for i in range(6):
+            await queue.enqueue(JobSpec(f"variant-{i}", enhance=False))
+
+        await PipelineDaemon(queue, client, workers=6, limits={"fetch": 2}).run(until_idle=True)
+
+        assert peak == 2
+        assert client.newsletter_generator.generate_newsletter.call_count == 6
+
+    @pytest.mark.asyncio
+    async def test_recurring_job_is_rescheduled(self, queue):
+        run_at = time.time() - 1
+        await queue.enqueue(JobSpec("daily", enhance=False, interval=86400), run_at=run_at)
+
+        await PipelineDaemon(queue, make_client()).run(until_idle=True)
+
+        queued = await queue.list("queued")
+        assert len(queued) == 1
+        assert queued[0].run_at == pytest.approx(run_at + 86400)
@@ -0,0 +1,70 @@
+import pytest
+
+from src.prompts import PromptBuilder, estimate_tokens, outline_of
+
+
+def make_repo(i, description="A library for agents"):
+    return {
+        "name": f"repo-{i}",
+        "full_name": f"org/repo-{i}",
+        "owner": {"login": "org"},
+        "description": description,
+        "stargazers_count": 1000 - i,
+        "language": "Python"
+    }
+
+
+@pytest.fixture
+def data():
+    return {
+        "trending_repos": [make_repo(i) for i in range(10)] + [make_repo(0)],
+        "discussions": [
+            {"title": "Eval **harness**", "body": "Use `pytest` and [docs](url)",
+             "html_url": "https://github.com/org/repo-1/issues/42"},
+            {"title": "Eval **harness**", "body": "duplicate", "html_url": "https://github.com/org/repo-1/issues/42"}
+        ],
+        "weekly_stats": {"total_stars": 9000, "total_forks": 10, "languages": ["Python"],
+                         "top_repos": [{"name": "repo-0", "stars": 1000, "forks": 5}]},
+        "generation_timestamp": "2025-09-09T12:00:00Z"
+    }
+
+
+class TestPromptBuilder:
+    """Test the token-budgeted digest prompt"""
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("hello world") == 4
+        assert estimate_tokens("1000★ | Python") == 2 + 1 + 1 + 2
+
+    def test_digest_is_deduped_and_trimmed(self, data):
+        prompt = PromptBuilder().build(data, ["# Title", "## Highlights"])
+
+        assert prompt.text.count("org/repo-0 |") == 1
+        assert prompt.repos == 8  # only what the newsletter shows
+        assert prompt.discussions == 1
+        assert "org/repo-1#42 | Eval harness | Use pytest and docs(url)" in prompt.text
+        assert "## Highlights" in prompt.text
+        assert "Stats: stars=9000 forks=10 languages=Python top=repo-0(1000★/5f)" in prompt.text
+        assert prompt.input_tokens == estimate_tokens(prompt.text)
+
+    def test_budget_drops_lowest_priority_lines(self, data):
+        full = PromptBuilder().build(data)
+        tight = PromptBuilder(budget=full.input_tokens - 60).build(data)
+
+        assert tight.input_tokens <= full.input_tokens - 60
+        assert "Stats:" not in tight.text and tight.repos < full.repos
+        assert "org/repo-0 |" in tight.text and "org/repo-1#42" in tight.text  # highlights and discussions kept
+        assert tight.max_tokens < full.max_tokens
+
+    def test_max_tokens_follows_content(self, data):
+        empty = PromptBuilder().build({})
+        capped = PromptBuilder(max_output_tokens=600).build(data)
+
+        assert empty.max_tokens == 512
+        assert capped.max_tokens == 600
+
+    def test_outline_of(self):
+        markdown = "# Title\n*date*\n\n---\n\n## One\n### Sub\ntext\n## Two"
+
+        assert outline_of(markdown) == ["# Title", "## One", "## Two"]
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from src.ranking import TopK
+
+
+def by_score(items):
+    return TopK(3, key=lambda item: item[1], identity=lambda item: item[0])
+
+
+class TestTopK:
+    """Test bounded top-k selection and enrichment lifecycle"""
+
+    def test_keeps_best_k_in_order(self):
+        ranking = by_score(None)
+        ranking.extend([("a", 5), ("b", 9), ("c", 1), ("d", 7), ("e", 3)])
+
+        assert ranking.items() == [("b", 9), ("d", 7), ("a", 5)]
+        assert ranking.offered == 5
+        assert ranking.evicted == 1
+
+    def test_ties_and_duplicates_keep_first(self):
+        ranking = by_score(None)
+        ranking.extend([("a", 5), ("b", 5), ("a", 100), ("c", 5), ("d", 5)])
+
+        assert ranking.items() == [("a", 5), ("b", 5), ("c", 5)]
+
+    @pytest.mark.asyncio
+    async def test_evicted_items_have_enrichment_cancelled(self):
+        started, finished = [], []
+
+        async def enrich(item):
+            started.append(item[0])
+            await asyncio.sleep(0.01)
+            finished.append(item[0])
+            return item[1] * 10
+
+        ranking = TopK(2, key=lambda item: item[1], identity=lambda item: item[0], enrich=enrich)
+        ranking.extend([("a", 1), ("b", 2)])
+        await asyncio.sleep(0)  # let the first lookups start
+        ranking.extend([("c", 3), ("d", 4)])
+
+        results = await ranking.results()
+
+        assert results == [(("d", 4), 40), (("c", 3), 30)]
+        assert sorted(finished) == ["c", "d"]
+        assert sorted(started) == ["a", "b", "c", "d"]
+
+    @pytest.mark.asyncio
+    async def test_non_speculative_enriches_only_survivors(self):
+        calls = []
+
+        async def enrich(item):
+            calls.append(item[0])
+            if item[0] == "b":
+                raise RuntimeError("upstream failure")
+            return "details"
+
+        ranking = TopK(2, key=lambda item: item[1], identity=lambda item: item[0],
+                       enrich=enrich, speculative=False)
+        ranking.extend([("a", 1), ("b", 5), ("c", 3)])
+
+        results = await ranking.results()
+
+        assert sorted(calls) == ["b", "c"]
+        assert results == [(("b", 5), None), (("c", 3), "details")]
@@ -0,0 +1,52 @@
+import pytest
+
+from src.repo_index import RepoIndex, tokenize
+
+
+@pytest.fixture
+def repos():
+    return [
+        {"name": "agent-kit", "owner": {"login": "acme"}, "description": "Agents for LLM apps",
+         "language": "Python", "topics": ["agents", "llm"]},
+        {"name": "fast-infer", "owner": {"login": "zeta"}, "description": "Fine-tuning and inference server",
+         "language": "Rust", "topics": ["inference"]},
+        {"name": "py-infer", "owner": {"login": "Acme"}, "description": None,
+         "language": "Python", "topics": ["inference", "llm"]},
+        {"name": "notes", "owner": {"login": "solo"}, "description": "", "language": None, "topics": []}
+    ]
+
+
+class TestRepoIndex:
+    """Test posting-list filtering"""
+
+    def test_no_filters_match_everything(self, repos):
+        index = RepoIndex(repos)
+
+        assert len(index) == 4
+        assert index.select(repos) == repos
+        assert index.select(repos, limit=2) == repos[:2]
+
+    def test_or_within_and_across_fields(self, repos):
+        index = RepoIndex(repos)
+        names = lambda **filters: [r["name"] for r in index.select(repos, **filters)]
+
+        assert names(language="python") == ["agent-kit", "py-infer"]
+        assert names(topic=["agents", "inference"]) == ["agent-kit", "fast-infer", "py-infer"]
+        assert names(topic="inference", language="Python,Go") == ["py-infer"]
+        assert names(owner="ACME") == ["agent-kit", "py-infer"]
+        assert names(topic="llm", owner="zeta") == []
+        assert names(language="Haskell") == []
+
+    def test_keywords(self, repos):
+        index = RepoIndex(repos)
+        names = lambda **filters: [r["name"] for r in index.select(repos, **filters)]
+
+        assert names(keyword="infer") == ["fast-infer", "py-infer"]  # name tokens are indexed
+        assert names(keyword="fine-tuning") == ["fast-infer"]
+        assert names(keyword="llm server") == []  # every token of a keyword must appear
+        assert names(keyword=["llm", "server"]) == ["agent-kit", "fast-infer"]
+
+    def test_positions(self):
+        assert RepoIndex.positions(0b101001) == [0, 3, 5]
+        assert RepoIndex.positions(0b101001, limit=2) == [0, 3]
+        assert tokenize("Fine-Tuning LLMs!") == ["fine", "tuning", "llms"]
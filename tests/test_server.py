@@ -1,6 +1,8 @@
 
 import pytest
 import asyncio
+import json
+import time
 from fastapi.testclient import TestClient
 from unittest.mock import AsyncMock, patch, MagicMock
 import httpx
@@ -50,6 +52,16 @@ class TestMCPServer:
         assert data["status"] == "healthy"
         assert "timestamp" in data
     
+    def test_metrics_endpoint(self, client):
+        """Test Prometheus metrics exposition"""
+        client.get("/health")
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'http_request_duration_seconds_count{method="GET",endpoint="/health",status="200"}' in response.text
+        assert "process_resident_memory_bytes" in response.text
+    
     @patch('src.server.github_adapter.get_trending_ai_repos')
     @patch('src.server.github_adapter.get_ai_discussions')
     @patch('src.server.github_adapter.get_repo_stats')
@@ -90,6 +102,84 @@ class TestMCPServer:
         assert len(data["trending_repos"]) >= 1
         assert data["trending_repos"][0]["name"] == "ai-framework"
     
+    def test_weekly_stats_cover_all_fetched_repos(self, client):
+        """Test weekly stats come from the aggregates over every fetched repo, without per-repo calls"""
+        from src.aggregates import WindowedStats
+        from src.state_backend import MemoryBackend
+        
+        repos = [
+            {"name": f"repo-{i}", "full_name": f"org/repo-{i}", "owner": {"login": "org"},
+             "stargazers_count": 100 * (i + 1), "forks_count": i, "language": "Python" if i % 2 else "Rust"}
+            for i in range(8)
+        ]
+        stats_mock = AsyncMock()
+        with patch('src.server.stats_aggregator', WindowedStats(MemoryBackend())), \
+             patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=repos)), \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=[])), \
+             patch('src.server.github_adapter.get_repo_stats', stats_mock):
+            
+            data = client.post("/generate-newsletter-data", json={"days": 7, "max_repos": 3}).json()
+            weekly = client.get("/weekly-stats").json()
+            other_window = client.get("/weekly-stats?days=1").json()
+        
+        stats_mock.assert_not_called()
+        assert len(data["trending_repos"]) == 3
+        assert data["weekly_stats"]["tracked_repos"] == 8
+        assert data["weekly_stats"]["total_stars"] == sum(r["stargazers_count"] for r in repos)
+        assert data["weekly_stats"]["top_repos"][0]["name"] == "repo-7"
+        assert weekly == data["weekly_stats"]
+        assert other_window["tracked_repos"] == 0
+    
+    def test_ranked_repos_enrich_only_final_top_k(self, client):
+        """Test repos are ranked by stars and only the final top K get detail lookups"""
+        repos = [
+            {"name": f"repo-{i}", "full_name": f"org/repo-{i}", "owner": {"login": "org"}, "stargazers_count": stars}
+            for i, stars in enumerate([10, 500, 30, 900, 20])
+        ]
+        
+        async def repo_stats(full_name):
+            return {"name": full_name.split("/")[1], "full_name": full_name, "stars": 1000, "forks": 7}
+        
+        stats_mock = AsyncMock(side_effect=repo_stats)
+        with patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=repos)), \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=[])), \
+             patch('src.server.github_adapter.get_repo_stats', stats_mock):
+            
+            data = client.post("/generate-newsletter-data", json={"max_repos": 2, "enrich": True}).json()
+        
+        assert [r["name"] for r in data["trending_repos"]] == ["repo-3", "repo-1"]
+        assert sorted(call.args[0] for call in stats_mock.call_args_list) == ["org/repo-1", "org/repo-3"]
+        assert data["trending_repos"][0]["forks_count"] == 7
+    
+    def test_profiled_request_returns_trace(self, client, mock_github_data):
+        """Test opt-in profiling records nested spans retrievable by trace id"""
+        with patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=mock_github_data["trending_repos"])), \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=mock_github_data["discussions"])), \
+             patch('src.server.github_adapter.get_repo_stats', AsyncMock(return_value={"name": "ai-framework", "stars": 1})):
+            
+            debug = {"X-Debug-Token": "s3cret"}
+            with patch('src.server.DEBUG_TOKEN', "s3cret"):
+                anonymous = client.post("/generate-newsletter-data?profile=cpu", json={"days": 7})
+                response = client.post("/generate-newsletter-data?profile=cpu", json={"days": 7}, headers=debug)
+        
+        assert anonymous.status_code == 403
+        assert response.status_code == 200
+        trace_id = response.headers["X-Trace-Id"]
+        
+        with patch('src.server.DEBUG_TOKEN', "s3cret"):
+            assert client.get(f"/traces/{trace_id}").status_code == 404
+            chrome = client.get(f"/traces/{trace_id}", headers=debug).json()
+            otel = client.get(f"/traces/{trace_id}?format=otel", headers=debug).json()
+        names = {event["name"] for event in chrome["traceEvents"]}
+        assert {"POST /generate-newsletter-data", "search", "stats", "validate", "serialize"} <= names
+        assert "folded" in chrome["cpuProfile"]
+        
+        spans = otel["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert all(span["traceId"] == trace_id for span in spans)
+        
+        # Requests without the flag are not traced
+        assert "X-Trace-Id" not in client.get("/health").headers
+    
     def test_generate_newsletter_data_validation(self, client):
         """Test request validation"""
         # Test with invalid data types
@@ -129,6 +219,149 @@ class TestMCPServer:
         assert len(data) >= 1
         assert data[0]["name"] == "ai-framework"
     
+    def test_trending_repos_filters(self, client):
+        """Test language/topic/owner/keyword filters on the trending endpoint"""
+        from src.aggregates import WindowedStats
+        from src.state_backend import MemoryBackend
+
+        repos = [
+            {"name": "agent-kit", "full_name": "acme/agent-kit", "owner": {"login": "acme"},
+             "description": "Agents for LLM apps", "language": "Python", "topics": ["agents", "llm"]},
+            {"name": "fast-infer", "full_name": "zeta/fast-infer", "owner": {"login": "zeta"},
+             "description": "Inference server", "language": "Rust", "topics": ["inference"]},
+            {"name": "py-infer", "full_name": "acme/py-infer", "owner": {"login": "acme"},
+             "description": "Inference in Python", "language": "Python", "topics": ["inference", "llm"]}
+        ]
+        with patch('src.server.stats_aggregator', WindowedStats(MemoryBackend())), \
+             patch('src.server.github_adapter.get_trending_ai_repos', AsyncMock(return_value=repos)):
+            by_topic = client.get("/trending-repos?topic=llm&language=python").json()
+            by_owner = client.get("/trending-repos?owner=acme&q=inference").json()
+            either = client.get("/trending-repos?topic=agents,inference&limit=2").json()
+
+        assert [r["name"] for r in by_topic] == ["agent-kit", "py-infer"]
+        assert [r["name"] for r in by_owner] == ["py-infer"]
+        assert [r["name"] for r in either] == ["agent-kit", "fast-infer"]
+
+    def test_generate_newsletter_data_batch(self, client):
+        """Test narrower windows are cut from wider searches when they still cover the request"""
+        from datetime import datetime, timedelta
+        from src.aggregates import WindowedStats
+        from src.state_backend import MemoryBackend
+
+        now = datetime.now()
+        repos = [
+            {"name": f"repo-{i}", "full_name": f"org/repo-{i}", "owner": {"login": "org"},
+             "html_url": f"https://github.com/org/repo-{i}", "stargazers_count": 1000 - i,
+             "created_at": (now - timedelta(days=2 * i)).strftime("%Y-%m-%dT%H:%M:%SZ")}
+            for i in range(12)
+        ]
+        discussions = [
+            {"title": f"Issue {i}", "html_url": f"https://github.com/org/x/issues/{i}",
+             "created_at": now.strftime("%Y-%m-%dT%H:%M:%SZ")}
+            for i in range(12)
+        ]
+        trending = AsyncMock(return_value=repos)
+        with patch('src.server.stats_aggregator', WindowedStats(MemoryBackend())), \
+             patch('src.server.github_adapter.get_trending_ai_repos', trending), \
+             patch('src.server.github_adapter.get_ai_discussions', AsyncMock(return_value=discussions)):
+            response = client.post("/generate-newsletter-data/batch", json={"requests": [
+                {"days": 7, "max_repos": 3},
+                {"days": 30, "max_repos": 5},
+                {"days": 1, "max_repos": 1},
+                {"days": 7, "max_repos": 10}
+            ]})
+            empty = client.post("/generate-newsletter-data/batch", json={"requests": []})
+            null_days = client.post("/generate-newsletter-data/batch", json={"requests": [
+                {"days": 7}, {"days": None}
+            ]})
+            zero_days = client.post("/generate-newsletter-data/batch", json={"requests": [{"days": 0}]})
+
+        assert response.status_code == 200
+        data = response.json()
+        # 30 days is fetched; 7 days with 10 repos isn't covered by it (only 4
+        # of its repos fall in the window) and gets its own search, which then
+        # serves the 1-day request
+        assert [c.args[0] for c in trending.await_args_list] == [30, 7]
+        assert (data["upstream_fetches"], data["shared_fetches"]) == (2, 2)
+        assert [[r["name"] for r in result["trending_repos"]] for result in data["results"][:3]] == [
+            ["repo-0", "repo-1", "repo-2"],
+            ["repo-0", "repo-1", "repo-2", "repo-3", "repo-4"],
+            ["repo-0"]
+        ]
+        assert len(data["results"][3]["trending_repos"]) == 10
+        assert all(len(result["discussions"]) == 10 for result in data["results"])
+        assert empty.status_code == 422
+        assert null_days.status_code == zero_days.status_code == 422
+
+    def test_snapshot_served_while_github_is_down(self, client):
+        """Test an open search breaker fails fast and serves the last good data marked stale"""
+        from src.aggregates import WindowedStats
+        from src.state_backend import MemoryBackend
+        from src.circuit_breaker import CircuitBreakers
+
+        calls = {"search/repositories": 0, "search/issues": 0}
+        healthy = True
+
+        def handler(request):
+            endpoint = request.url.path.strip("/")
+            calls[endpoint] += 1
+            if not healthy:
+                return httpx.Response(502)
+            if endpoint == "search/repositories":
+                return httpx.Response(200, json={"items": [
+                    {"name": "agent", "full_name": "org/agent", "owner": {"login": "org"},
+                     "html_url": "https://github.com/org/agent", "stargazers_count": 900}
+                ]})
+            return httpx.Response(200, json={"items": []})
+
+        breakers = CircuitBreakers(github_adapter.backend, failure_threshold=2, reset_timeout=60)
+        with patch('src.server.stats_aggregator', WindowedStats(MemoryBackend())), \
+             patch.object(github_adapter, 'breakers', breakers), \
+             patch.object(github_adapter, 'cache_ttl', 0), \
+             patch.object(github_adapter, 'request_interval', 0), \
+             patch.object(github_adapter, 'base_url', "https://github.test"), \
+             patch.object(github_adapter, '_client', lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            live = client.post("/generate-newsletter-data", json={"days": 3, "max_repos": 4}).json()
+            healthy = False
+            degraded = client.post("/generate-newsletter-data", json={"days": 3, "max_repos": 4}).json()
+            searches = dict(calls)
+            # Served before any search is attempted, so pacing between searches doesn't apply
+            github_adapter.request_interval = 5
+            started = time.perf_counter()
+            again = client.post("/generate-newsletter-data", json={"days": 3, "max_repos": 4}).json()
+            elapsed = time.perf_counter() - started
+            health = client.get("/health").json()
+
+        assert live["stale"] is False
+        assert degraded["stale"] is True
+        assert degraded["snapshot_at"] == live["generation_timestamp"]
+        assert degraded["trending_repos"] == live["trending_repos"]
+        # Open breaker: no more calls to GitHub
+        assert calls == searches
+        assert again["stale"] is True
+        assert elapsed < 1
+        assert health["status"] == "degraded"
+        assert "search/repositories" in health["degraded_endpoints"]
+
+    def test_trending_repos_stream_endpoint(self, client):
+        """Test NDJSON streaming yields one JSON object per line"""
+        closed = []
+        
+        async def iter_repos(days, max_items):
+            try:
+                for i in range(max_items):
+                    yield {"name": f"repo-{i}", "stargazers_count": i}
+            finally:
+                closed.append(True)
+        
+        with patch('src.server.github_adapter.iter_trending_repos', iter_repos):
+            with client.stream("GET", "/trending-repos/stream?limit=3") as response:
+                assert response.headers["content-type"].startswith("application/x-ndjson")
+                lines = [line for line in response.iter_lines() if line]
+        
+        assert [json.loads(line)["name"] for line in lines] == ["repo-0", "repo-1", "repo-2"]
+        assert closed == [True]
+    
     @patch('src.server.github_adapter.get_ai_discussions')
     def test_ai_discussions_endpoint(self, mock_discussions, client, mock_github_data):
         """Test direct discussions endpoint"""
@@ -244,6 +477,141 @@ class TestGitHubAdapterIntegration:
             repos = await adapter.get_trending_ai_repos(7)
             assert repos == []
 
+    @pytest.mark.asyncio
+    async def test_adapter_paginates_lazily(self):
+        """Test streaming iterators request further pages only as items are consumed"""
+        from src.state_backend import MemoryBackend
+        
+        adapter = GitHubAdapter(MemoryBackend())
+        pages = {
+            1: {"total_count": 150, "items": [{"id": i} for i in range(100)]},
+            2: {"total_count": 150, "items": [{"id": i} for i in range(100, 150)]}
+        }
+        
+        async def get(url, params=None, **kwargs):
+            return MagicMock(status_code=200, headers={}, json=MagicMock(return_value=pages[params["page"]]))
+        
+        with patch('httpx.AsyncClient') as mock_client, patch('asyncio.sleep'):
+            mock_get = AsyncMock(side_effect=get)
+            mock_client.return_value.__aenter__.return_value.get = mock_get
+            
+            stream = adapter.iter_ai_discussions(7, max_items=1000)
+            first = [await stream.__anext__() for _ in range(100)]
+            assert mock_get.call_count == 1
+            rest = [item async for item in stream]
+            assert mock_get.call_count == 2
+            
+            limited = [item async for item in adapter.iter_ai_discussions(7, max_items=120)]
+        
+        assert [item["id"] for item in first + rest] == list(range(150))
+        assert len(limited) == 120
+    
+    @pytest.mark.asyncio
+    async def test_adapter_incremental_fetch_uses_watermark(self):
+        """Test incremental mode only asks for items newer than the watermark"""
+        from src.state_backend import MemoryBackend
+        from datetime import datetime, timezone
+
+        adapter = GitHubAdapter(MemoryBackend())
+        adapter.cache_ttl = 0
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        first_page = {"items": [{
+            "id": 1, "name": "old-repo", "full_name": "user/old-repo",
+            "stargazers_count": 50, "created_at": today
+        }]}
+        second_page = {"items": [{
+            "id": 2, "name": "new-repo", "full_name": "user/new-repo",
+            "stargazers_count": 80, "created_at": today
+        }]}
+
+        with patch('httpx.AsyncClient') as mock_client, \
+             patch('asyncio.sleep'):
+            mock_get = AsyncMock()
+            mock_client.return_value.__aenter__.return_value.get = mock_get
+
+            mock_get.return_value = MagicMock(status_code=200, json=MagicMock(return_value=first_page))
+            await adapter.get_ai_discussions(7, incremental=True)
+            key = f"{adapter.base_url}/search/issues?q=AI OR ML OR 'machine learning' type:issue&sort=reactions&days=7"
+            watermark = (await adapter.watermarks.get(key))["watermark"]
+
+            mock_get.return_value = MagicMock(status_code=200, json=MagicMock(return_value=second_page))
+            discussions = await adapter.get_ai_discussions(7, incremental=True)
+
+        second_params = mock_get.call_args[1]["params"]
+        assert f"created:>={watermark}" in second_params["q"]
+        # Top-ups walk everything created since the last run, not the top page by reactions
+        assert second_params["sort"] == "created"
+        assert {d["name"] for d in discussions} == {"old-repo", "new-repo"}
+
+        # Once the counts are stale the window is re-scanned by reactions
+        state = await adapter.watermarks.get(key)
+        state["scanned_at"] = "2000-01-01T00:00:00Z"
+        await adapter.watermarks.put(key, state)
+        with patch('httpx.AsyncClient') as mock_client, \
+             patch('asyncio.sleep'):
+            mock_get = AsyncMock(return_value=MagicMock(status_code=200, json=MagicMock(return_value=second_page)))
+            mock_client.return_value.__aenter__.return_value.get = mock_get
+            discussions = await adapter.get_ai_discussions(7, incremental=True)
+
+        assert mock_get.call_args[1]["params"]["sort"] == "reactions"
+        assert [d["name"] for d in discussions] == ["new-repo"]
+
+        # A wider window is scanned in full, not topped up from the 7-day one
+        with patch('httpx.AsyncClient') as mock_client, \
+             patch('asyncio.sleep'):
+            mock_get = AsyncMock(return_value=MagicMock(status_code=200, json=MagicMock(return_value=first_page)))
+            mock_client.return_value.__aenter__.return_value.get = mock_get
+            await adapter.get_ai_discussions(30, incremental=True)
+
+        wide_params = mock_get.call_args[1]["params"]
+        assert wide_params["sort"] == "reactions"
+        assert "created:>=" not in wide_params["q"]
+
+
+class TestLoopWatchdog:
+    """Tests for event-loop lag measurement and blocking-call capture"""
+    
+    @pytest.mark.asyncio
+    async def test_reports_blocking_callback_stack(self):
+        """Test that a callback blocking the loop is reported with its stack"""
+        import time
+        from src.loop_watchdog import LoopWatchdog
+        
+        watchdog = LoopWatchdog(threshold=0.05, interval=0.01)
+        watchdog.start()
+        
+        await asyncio.sleep(0.05)
+        
+        def blocking_render_step():
+            time.sleep(0.3)
+        
+        blocking_render_step()
+        await asyncio.sleep(0.05)
+        await watchdog.stop()
+        
+        assert len(watchdog.reports) == 1
+        report = watchdog.reports[0]
+        assert report["blocked_for_ms"] >= 50
+        assert any("blocking_render_step" in line for line in report["stack"])
+        assert report["task"] is not None
+        assert max(watchdog.samples) >= 0.2
+
+    def test_opt_in_and_debug_endpoint_needs_token(self, monkeypatch):
+        """Test the watchdog is off by default and its stacks are only served with the debug token"""
+        from src.loop_watchdog import LoopWatchdog
+
+        monkeypatch.delenv("LOOP_WATCHDOG", raising=False)
+        assert LoopWatchdog.from_env() is None
+
+        client = TestClient(app)
+        with patch('src.server.DEBUG_TOKEN', None):
+            assert client.get("/debug/loop-blocks").status_code == 404
+        with patch('src.server.DEBUG_TOKEN', "s3cret"):
+            assert client.get("/debug/loop-blocks", headers={"X-Debug-Token": "wrong"}).status_code == 404
+            response = client.get("/debug/loop-blocks", headers={"X-Debug-Token": "s3cret"})
+        assert response.status_code == 200
+
 
 class TestServerConfiguration:
     """Test server configuration and setup"""
@@ -0,0 +1,234 @@
+
+import pytest
+import pytest_asyncio
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.state_backend import MemoryBackend, SQLiteBackend, RedisBackend, create_backend
+from src.github_adapter import GitHubAdapter
+
+
+class FakeRedisServer:
+    """Minimal RESP server standing in for Redis (GET, SET NX/PX, INCRBY, DEL)"""
+
+    def __init__(self):
+        self.data = {}
+        # Commands applied once but answered by dropping the connection
+        self.drop_replies = set()
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def _live(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            self.data.pop(key)
+            return None
+        return value
+
+    async def _handle(self, reader, writer):
+        while True:
+            header = await reader.readline()
+            if not header:
+                break
+            args = []
+            for _ in range(int(header[1:-2])):
+                length = int((await reader.readline())[1:-2])
+                args.append((await reader.readexactly(length + 2))[:-2].decode())
+            reply = self._dispatch(args)
+            if args[0].upper() in self.drop_replies:
+                self.drop_replies.discard(args[0].upper())
+                break
+            writer.write(reply)
+            await writer.drain()
+        writer.close()
+
+    def _dispatch(self, args):
+        command = args[0].upper()
+        if command == "GET":
+            value = self._live(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value.encode())
+        if command == "SET":
+            options = [a.upper() for a in args[3:]]
+            if "NX" in options and self._live(args[1]) is not None:
+                return b"$-1\r\n"
+            expires_at = None
+            if "PX" in options:
+                expires_at = time.time() + int(args[3 + options.index("PX") + 1]) / 1000
+            self.data[args[1]] = (args[2], expires_at)
+            return b"+OK\r\n"
+        if command == "INCRBY":
+            _, expires_at = self.data.get(args[1], (None, None))
+            value = int(self._live(args[1]) or 0) + int(args[2])
+            self.data[args[1]] = (str(value), expires_at)
+            return b":%d\r\n" % value
+        if command == "DEL":
+            return b":%d\r\n" % (self.data.pop(args[1], None) is not None)
+        return b"-ERR unknown command\r\n"
+
+
+@pytest_asyncio.fixture
+async def redis_backend():
+    server = FakeRedisServer()
+    await server.start()
+    backend = RedisBackend(port=server.port)
+    yield backend
+    await backend.close()
+    await server.stop()
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "redis"])
+async def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryBackend()
+    elif request.param == "sqlite":
+        yield SQLiteBackend(str(tmp_path / "state.db"))
+    else:
+        server = FakeRedisServer()
+        await server.start()
+        redis = RedisBackend(port=server.port)
+        yield redis
+        await redis.close()
+        await server.stop()
+
+
+class TestStateBackends:
+
+    @pytest.mark.asyncio
+    async def test_get_set_and_expiry(self, backend):
+        """Test values round-trip and expire after their TTL"""
+        await backend.set("key", "value")
+        await backend.set("short", "lived", ttl=0.05)
+
+        assert await backend.get("key") == "value"
+        assert await backend.get("short") == "lived"
+
+        await asyncio.sleep(0.1)
+        assert await backend.get("short") is None
+        assert await backend.get("missing") is None
+
+    @pytest.mark.asyncio
+    async def test_set_only_if_missing(self, backend):
+        """Test NX semantics used by the single-flight lock"""
+        assert await backend.set("lock", "a", ttl=5, only_if_missing=True)
+        assert not await backend.set("lock", "b", ttl=5, only_if_missing=True)
+        assert await backend.get("lock") == "a"
+
+    @pytest.mark.asyncio
+    async def test_incr(self, backend):
+        """Test shared counters used for the rate-limit budget"""
+        assert await backend.incr("budget", 5) == 5
+        assert await backend.incr("budget", -1) == 4
+
+    @pytest.mark.asyncio
+    async def test_lock_is_exclusive(self, backend):
+        """Test that only one holder is inside the lock at a time"""
+        inside = []
+
+        async def worker(n):
+            async with backend.lock("job", poll_interval=0.01):
+                inside.append(n)
+                assert len(inside) == 1
+                await asyncio.sleep(0.02)
+                inside.remove(n)
+
+        await asyncio.gather(*(worker(n) for n in range(3)))
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_swept(self, tmp_path):
+        """Test expired keys are deleted, not just hidden, once enough writes went by"""
+        memory = MemoryBackend(sweep_every=3)
+        sqlite = SQLiteBackend(str(tmp_path / "state.db"), sweep_every=3)
+        for backend in (memory, sqlite):
+            await backend.set("cache:old", "x", ttl=0.01)
+            await asyncio.sleep(0.02)
+            await backend.set("a", "1")
+            await backend.set("b", "2")
+
+        assert "cache:old" not in memory._data
+        assert sqlite.conn.execute("SELECT key FROM kv ORDER BY key").fetchall() == [("a",), ("b",)]
+        await sqlite.close()
+
+    def test_create_backend_from_url(self, tmp_path):
+        """Test backend selection from STATE_BACKEND_URL-style URLs"""
+        assert isinstance(create_backend("memory://"), MemoryBackend)
+        assert isinstance(create_backend(f"sqlite:///{tmp_path}/state.db"), SQLiteBackend)
+
+        redis = create_backend("redis://cache:6380/2")
+        assert isinstance(redis, RedisBackend)
+        assert (redis.host, redis.port, redis.db) == ("cache", 6380, 2)
+
+        with pytest.raises(ValueError):
+            create_backend("mongodb://nope")
+
+
+class TestRedisReconnect:
+
+    @pytest.mark.asyncio
+    async def test_only_idempotent_commands_are_resent(self):
+        """Test a lost INCRBY reply surfaces instead of double-counting"""
+        server = FakeRedisServer()
+        await server.start()
+        redis = RedisBackend(port=server.port)
+        try:
+            await redis.set("budget", "5")
+
+            server.drop_replies.add("INCRBY")
+            with pytest.raises(ConnectionError):
+                await redis.incr("budget", -1)
+            assert await redis.get("budget") == "4"
+
+            server.drop_replies.add("GET")
+            assert await redis.get("budget") == "4"
+        finally:
+            await redis.close()
+            await server.stop()
+
+
+class TestSharedAdapterState:
+
+    @pytest.mark.asyncio
+    async def test_workers_share_cache_without_duplicate_calls(self, tmp_path):
+        """Test that concurrent workers on one backend make a single upstream call"""
+        workers = [GitHubAdapter(SQLiteBackend(str(tmp_path / "state.db"))) for _ in range(4)]
+
+        mock_response = MagicMock(status_code=200, headers={})
+        mock_response.json.return_value = {"name": "repo", "full_name": "org/repo", "stargazers_count": 1,
+                                           "forks_count": 0, "language": "Python", "description": "",
+                                           "html_url": "", "created_at": "", "updated_at": ""}
+
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return mock_response
+
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_get = AsyncMock(side_effect=slow_get)
+            mock_client.return_value.__aenter__.return_value.get = mock_get
+
+            results = await asyncio.gather(*(w.get_repo_stats("org/repo") for w in workers))
+
+        assert mock_get.call_count == 1
+        assert all(r["full_name"] == "org/repo" for r in results)
+
+    @pytest.mark.asyncio
+    async def test_exhausted_budget_skips_upstream(self, redis_backend):
+        """Test that workers stop calling GitHub once the shared budget is spent"""
+        adapter = GitHubAdapter(redis_backend)
+        await redis_backend.set("ratelimit:core", "0", ttl=60)
+        await redis_backend.set("ratelimit:core:reset", str(int(time.time()) + 60), ttl=60)
+
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_get = AsyncMock()
+            mock_client.return_value.__aenter__.return_value.get = mock_get
+
+            assert await adapter.get_repo_stats("org/repo") == {}
+
+        mock_get.assert_not_called()
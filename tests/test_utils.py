@@ -0,0 +1,39 @@
+import re
+
+from src.utils import (
+    clean_descriptions,
+    clean_repo_description,
+    strip_markdown,
+    strip_markdown_batch,
+    truncate_text,
+    truncate_texts
+)
+
+
+class TestTextCleaning:
+    """Batch text helpers must match the per-item functions"""
+
+    def test_strip_markdown_matches_regex(self):
+        text = "## Title with **bold**, `code` and [link](url) #tag"
+        assert strip_markdown(text) == re.sub(r'[#\*\[\]`]', '', text)
+
+    def test_clean_descriptions_matches_per_item(self):
+        descriptions = [
+            "Repository with **bold** and `code` and [links](url)",
+            None,
+            "",
+            "word " * 60,
+            "Repository with **bold** and `code` and [links](url)"
+        ]
+        expected = [clean_repo_description(d) for d in descriptions]
+
+        assert clean_descriptions(descriptions) == expected
+        assert expected[1] == expected[2] == "No description available"
+        assert expected[3].endswith("...")
+
+    def test_strip_markdown_batch_trims_whitespace(self):
+        assert strip_markdown_batch(["  **a**  ", "# b"]) == ["a", "b"]
+
+    def test_truncate_texts_matches_per_item(self):
+        texts = ["short", None, "a long sentence " * 20]
+        assert truncate_texts(texts, 40) == [truncate_text(t, 40) for t in texts]
@@ -0,0 +1,66 @@
+import pytest
+
+from src.newsletter import NewsletterGenerator
+from src.variants import Variant, VariantRenderer, render_batch
+
+
+def make_repo(name, language, topics):
+    return {
+        "name": name,
+        "full_name": f"org/{name}",
+        "owner": {"login": "org"},
+        "html_url": f"https://github.com/org/{name}",
+        "description": f"{name} description",
+        "stargazers_count": 100,
+        "language": language,
+        "topics": topics
+    }
+
+
+@pytest.fixture
+def data():
+    return {
+        "trending_repos": [
+            make_repo("py-agents", "Python", ["agents"]),
+            make_repo("rs-infer", "Rust", ["inference"]),
+            make_repo("py-vision", "Python", ["vision", "inference"])
+        ],
+        "discussions": [{"title": f"Discussion {i}", "body": "text", "html_url": "#"} for i in range(4)],
+        "weekly_stats": {"total_stars": 300, "total_forks": 0, "languages": ["Python", "Rust"]},
+        "generation_timestamp": "2025-09-09T12:00:00Z"
+    }
+
+
+class TestVariants:
+    """Test per-subscriber variant rendering"""
+
+    def test_filters_and_limits(self, data):
+        results = render_batch(data, [
+            Variant("python", languages=("Python",)),
+            Variant("inference", topics=("inference",), max_discussions=1, format="text")
+        ], workers=1)
+
+        assert "py-agents" in results["python"] and "py-vision" in results["python"]
+        assert "rs-infer" not in results["python"]
+        assert "rs-infer" in results["inference"] and "py-agents" not in results["inference"]
+        assert "Discussion 0" in results["inference"] and "Discussion 1" not in results["inference"]
+
+    def test_unfiltered_variant_matches_plain_render(self, data):
+        results = render_batch(data, [Variant("all")], workers=1)
+
+        assert results["all"] == NewsletterGenerator().generate_newsletter(data)
+
+    def test_pool_matches_inline(self, data):
+        variants = [Variant(str(i), languages=(("Python",), ("Rust",), ())[i % 3], format=("markdown", "html")[i % 2])
+                    for i in range(20)]
+
+        with VariantRenderer(data, workers=2, chunksize=3) as renderer:
+            pooled = list(renderer.render(variants))
+
+        assert [variant_id for variant_id, _ in pooled] == [v.id for v in variants]
+        assert dict(pooled) == render_batch(data, variants, workers=1)
+
+    def test_from_dict(self):
+        variant = Variant.from_dict({"id": 7, "languages": ["Go"], "max_repos": 5})
+
+        assert variant == Variant("7", ("Go",), (), 5, None, "markdown")